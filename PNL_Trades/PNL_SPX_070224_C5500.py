@@ -4,9 +4,6 @@ curr = os.getcwd()
 curr = os.path.dirname(curr)
 sys.path.append(curr)
 import pandas as pd
-import yfinance as yf
-import holidays
-import pytz
 from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QLabel, QLineEdit, QComboBox, QPushButton, QGridLayout, QFrame, QWidget, QHBoxLayout, QSizePolicy
 from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QMovie
@@ -14,28 +11,25 @@ import matplotlib.pyplot as plt
 import mplcursors
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
-from datetime import datetime
 
 from realPrice.IndexPnl import main, get_option_chain, calls_and_puts
 from realPrice.realOption import getIndexOption
 
 from tools.stylesheet import stylesheet
+from tools.pnl_tools import index_delta_scale, pnl_frame
+from tools.tradeBook import position_key
+from tools.tradeLedger import shared_book
 from tools.pnl_creations import pnl_create_input_field as create_input_field, create_combo_box
-
-# Dummy DataFrame to hold trade data
-trades_df = pd.DataFrame(columns=[
-    'trade_date', 'symbol', 'strike', 'expiration', 'stock_trade_price', 'effective_delta',
-    'call_trade_price', 'call_action_type', 'num_call_contracts', 'put_trade_price',
-    'put_action_type', 'num_put_contracts', 'stock_close_price', 'call_close_price',
-    'put_close_price', 'daily_pnl', 'change'
-])
+from tools.tradingCalendar import trading_calendar
 
 class OptionPNLApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self.initUI()
         self.setStyleSheet(stylesheet)
-        self.trades = trades_df.copy()
+        # Rows computed in earlier sessions come back from trades.db
+        self.trades = shared_book()
+        self.update_plot()
     
     def initUI(self):
         self.setWindowTitle("Index Option PNL Tracker")
@@ -111,25 +105,8 @@ class OptionPNLApp(QMainWindow):
         self.show()
 
 
-    def calculate_pnl(self, call_action, put_action, NC, C_0, C_t, NP, P_0, P_t, effectice_delta, trade_price, current_price):
-        if call_action == "sell" and put_action == "sell":
-            return (NC * (C_0 - C_t) + NP * (P_0 - P_t) + 100 * effectice_delta * (current_price - trade_price)) * 100
-        elif call_action == "sell" and put_action == "buy":
-            return (NC * (C_0 - C_t) + NP * (P_t - P_0) + effectice_delta * (current_price - trade_price)) * 100
-        elif call_action == "buy" and put_action == "sell":
-            return (NC * (C_t - C_0) + NP * (P_0 - P_t) + effectice_delta * (current_price - trade_price)) * 100
-        elif call_action == "buy" and put_action == "buy":
-            return (NC * (C_t - C_0) + NP * (P_t - P_0) + effectice_delta * (current_price - trade_price)) * 100
-        else:
-            return 0  
-
     def market_open(self):
-        today = datetime.now()  
-        eastern = pytz.timezone('US/Eastern')
-        current_time_et = datetime.now(eastern).time()
-        market_open = datetime.strptime("09:30", "%H:%M").time()
-        market_close = datetime.strptime("16:00", "%H:%M").time()
-        return market_open <= current_time_et <= market_close and today.weekday() < 5 and today not in holidays.US() 
+        return trading_calendar().is_open()
     
     def add_trade(self):
         # Show the loading spinner
@@ -171,14 +148,15 @@ class OptionPNLApp(QMainWindow):
 
         # Proceed with updating trades and calculating PNL
         if option_data is not None and not option_data.empty:
-            for _, row in option_data.iterrows():
-                daily_pnl = self.calculate_pnl(call_action_type, put_action_type,
-                                            num_call_contracts, call_trade_price, row['call_close_price'],
-                                            num_put_contracts, put_trade_price, row['put_close_price'],
-                                            effective_delta, stock_trade_price, row['stock_close_price'])
-                daily_pnl = round(daily_pnl, 2)
-                investment = ((num_call_contracts * call_trade_price) + (num_put_contracts * put_trade_price)) * 100
-                change = round(daily_pnl / investment * 100, 2)
+            delta_scale = index_delta_scale(call_action_type, put_action_type)
+            option_data = pnl_frame(option_data, call_action_type, put_action_type,
+                                    num_call_contracts, call_trade_price,
+                                    num_put_contracts, put_trade_price,
+                                    effective_delta, stock_trade_price, delta_scale=delta_scale)
+            new_trades = []
+            for row in option_data.to_dict('records'):
+                daily_pnl = row['daily_pnl']
+                change = row['change']
                 new_trade = {
                     'trade_date': row['date'].strftime('%Y-%m-%d'),
                     'symbol': symbol,
@@ -199,37 +177,10 @@ class OptionPNLApp(QMainWindow):
                     'change': change
                 }
 
-                # Check if the trade already exists in the DataFrame
-                exists = self.trades[
-                    (self.trades['trade_date'] == new_trade['trade_date']) &
-                    (self.trades['symbol'] == new_trade['symbol']) &
-                    (self.trades['strike'] == new_trade['strike']) &
-                    (self.trades['expiration'] == new_trade['expiration']) &
-                    (self.trades['stock_trade_price'] == new_trade['stock_trade_price']) &
-                    (self.trades['effective_delta'] == new_trade['effective_delta']) &
-                    (self.trades['call_trade_price'] == new_trade['call_trade_price']) &
-                    (self.trades['call_action_type'] == new_trade['call_action_type']) &
-                    (self.trades['num_call_contracts'] == new_trade['num_call_contracts']) &
-                    (self.trades['put_trade_price'] == new_trade['put_trade_price']) &
-                    (self.trades['put_action_type'] == new_trade['put_action_type']) &
-                    (self.trades['num_put_contracts'] == new_trade['num_put_contracts']) 
-                    # (self.trades['stock_close_price'] == new_trade['stock_close_price']) &
-                    # (self.trades['call_close_price'] == new_trade['call_close_price']) &
-                    # (self.trades['put_close_price'] == new_trade['put_close_price']) &
-                    # (self.trades['daily_pnl'] == new_trade['daily_pnl']) &
-                    # (self.trades['change'] == new_trade['change'])
-                ]
-                
-                
-                if not exists.empty:     
-                    self.trades = self.trades.drop(exists.index)
-                    print("Trade already exists. Skipping duplicate entry.")
-                    continue
-
-                # Add the new trade to the DataFrame
-                new_df = pd.DataFrame([new_trade])
-                self.trades = pd.concat([self.trades, new_df], ignore_index=True)
-                print('the data frame is:', self.trades)
+                new_trades.append(new_trade)
+            replaced = self.trades.extend(new_trades)
+            if replaced:
+                print(f"Updated {replaced} existing row(s) for this trade.")
 
             self.update_plot()
             self.status_label.setText("Trade added successfully!")
@@ -249,18 +200,13 @@ class OptionPNLApp(QMainWindow):
         trade_price = float(self.stock_trade_price_input.input_field.text())
         effective_delta = float(self.effective_delta_input.input_field.text())
 
-        filtered_data = self.trades[
-            (self.trades['symbol'] == symbol) &
-            (self.trades['strike'] == strike) &
-            (self.trades['expiration'] == expiration) &
-            (self.trades['trade_date'] >= input_date) &
-            (self.trades['call_action_type'] == call_action_type) &
-            (self.trades['put_action_type'] == put_action_type) &
-            (self.trades['num_call_contracts'] == num_call_contracts) &
-            (self.trades['num_put_contracts'] == num_put_contracts) &
-            (self.trades['stock_trade_price'] == trade_price) &
-            (self.trades['effective_delta'] == effective_delta)     
-        ]
+        key = position_key({
+            'symbol': symbol, 'strike': strike, 'expiration': expiration,
+            'call_action_type': call_action_type, 'put_action_type': put_action_type,
+            'num_call_contracts': num_call_contracts, 'num_put_contracts': num_put_contracts,
+            'stock_trade_price': trade_price, 'effective_delta': effective_delta,
+        })
+        filtered_data = self.trades.series(key, start_date=input_date)
         
 
         if not filtered_data.empty:
@@ -0,0 +1,369 @@
+'''
+Micro-benchmarks for the pricing, implied-vol, payoff and PnL kernels.
+
+    python benchmarks/bench.py                    run everything and print a table
+    python benchmarks/bench.py bls pnl            only benchmarks whose name contains one of the words
+    python benchmarks/bench.py --json out.json    also write the results as JSON ('-' for stdout)
+    python benchmarks/bench.py --check            exit 1 if a kernel is slower than its baseline
+    python benchmarks/bench.py --update           store this run as the new baselines
+
+Every benchmark is timed the way timeit does it: the call is looped until one
+run takes at least --min-time, and the median and fastest per-call times over
+--repeat runs are reported. With --rounds N that whole measurement is done N
+times and the median of each figure is kept; --update uses 3 rounds. Inputs are
+synthetic and seeded, nothing touches the network.
+
+benchmarks/baselines.json keeps the times of a reference run together with the
+time of a fixed pure-Python/numpy calibration loop on that machine. --check
+scales the baselines by how much slower or faster the calibration loop runs
+here, then flags every kernel whose fastest run exceeds its scaled baseline by
+more than its tolerance: --tolerance (0.5 = 50%), or the kernel's own
+'tolerance' in baselines.json. The fastest run is compared because it is the
+least disturbed by whatever else the machine is doing. A kernel the
+calibration loop does not represent (large broadcasts of exp/log/ndtr whose
+speed moves with memory bandwidth) carries a wider tolerance there; --update
+keeps those tolerances.
+'''
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+
+from tools.BsCal import BlackScholes
+from tools.payoff import straddle_legs, butterfly_legs, condor_legs, solve_payoff, evaluate_payoff, horizon_payoff
+from tools.pnl_tools import calculate_pnl, straddle_pnl, pnl_frame
+from realPrice.OptionPnl import initialize_df, build_history
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+CHAIN_SIZE = 500
+HISTORY_DAYS = 2520  # ten years of sessions
+HISTORY_YEARS = 5
+
+# name: setup() returning the zero-argument callable to time
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def synthetic_chain(n=CHAIN_SIZE):
+    rng = np.random.default_rng(0)
+    flags = np.where(np.arange(n) % 2, 'c', 'p')
+    strikes = np.linspace(50, 150, n)
+    vols = rng.uniform(0.15, 0.6, n)
+    return flags, 100.0, strikes, 30 / 365, 0.05, vols
+
+
+@benchmark('bls.price.scalar')
+def bench_price_scalar():
+    bs = BlackScholes()
+    return lambda: bs.blsprice('c', 100.0, 105.0, 30 / 365, 0.05, 0.25)
+
+
+@benchmark('bls.price.chain')
+def bench_price_chain():
+    bs = BlackScholes()
+    flags, S, X, T, r, v = synthetic_chain()
+    return lambda: bs.blsprice(flags, S, X, T, r, v)
+
+
+@benchmark('bls.delta.scalar')
+def bench_delta_scalar():
+    bs = BlackScholes()
+    return lambda: bs.blsdelta('p', 100.0, 95.0, 30 / 365, 0.05, 0.25)
+
+
+@benchmark('bls.delta.chain')
+def bench_delta_chain():
+    bs = BlackScholes()
+    flags, S, X, T, r, v = synthetic_chain()
+    return lambda: bs.blsdelta(flags, S, X, T, r, v)
+
+
+@benchmark('bls.impv.scalar')
+def bench_impv_scalar():
+    bs = BlackScholes()
+    price = bs.blsprice('c', 100.0, 105.0, 30 / 365, 0.05, 0.32)
+    return lambda: bs.blsimpv('c', 100.0, 105.0, 30 / 365, 0.05, price, 0.2)
+
+
+@benchmark('bls.impv.chain')
+def bench_impv_chain():
+    bs = BlackScholes()
+    flags, S, X, T, r, v = synthetic_chain()
+    prices = bs.blsprice(flags, S, X, T, r, v)
+    return lambda: bs.blsimpv(flags, S, X, T, r, prices, 0.2)
+
+
+def profile_legs():
+    return {
+        'straddle': straddle_legs('Buy Call-Sell Put', 100, 2, 1, 4.2, 3.9, 0.55, -0.45),
+        'butterfly': butterfly_legs('Call', [90, 100, 110], [12.1, 5.2, 1.8], [1.0, 4.8, 11.2], [0.8, 0.5, 0.2]),
+        'condor': condor_legs('Long Call', [85, 95, 105, 115], [16.0, 8.4, 3.1, 0.9], [0.6, 2.9, 7.7, 15.4],
+                              [0.9, 0.7, 0.35, 0.12]),
+    }
+
+
+@benchmark('payoff.breakeven')
+def bench_breakeven():
+    strategies = list(profile_legs().values())
+
+    def run():
+        for legs in strategies:
+            solve_payoff(legs, 100.0)
+    return run
+
+
+@benchmark('payoff.curve')
+def bench_payoff_curve():
+    strategies = list(profile_legs().values())
+
+    def run():
+        for legs in strategies:
+            evaluate_payoff(legs, 60.0, 140.0, 100.0)
+    return run
+
+
+@benchmark('payoff.horizons')
+def bench_horizons():
+    legs = profile_legs()['condor']
+    S_grid = np.linspace(60.0, 140.0, 800)
+    elapsed = np.linspace(0, 30, 6)
+    return lambda: horizon_payoff(legs, S_grid, 100.0, 30, elapsed, 0.05, 0.3)
+
+
+def synthetic_history(days=HISTORY_DAYS):
+    rng = np.random.default_rng(1)
+    dates = pd.bdate_range(end=datetime.now().date(), periods=days)
+    stock = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+    return pd.DataFrame({
+        'date': dates.date,
+        'call_close_price': np.abs(stock - 100) + rng.uniform(1, 3, days),
+        'put_close_price': np.abs(100 - stock) + rng.uniform(1, 3, days),
+        'stock_close_price': stock.round(2),
+    })
+
+
+@benchmark('pnl.calculate_pnl')
+def bench_calculate_pnl():
+    history = synthetic_history()
+    rows = list(zip(history['call_close_price'], history['put_close_price'], history['stock_close_price']))
+
+    def run():
+        return [calculate_pnl('buy', 'sell', 2, 4.2, C_t, 1, 3.9, P_t, -0.1, 100.0, S_t) for C_t, P_t, S_t in rows]
+    return run
+
+
+@benchmark('pnl.straddle_pnl')
+def bench_straddle_pnl():
+    history = synthetic_history()
+    C_t, P_t, S_t = (history[col].to_numpy() for col in ('call_close_price', 'put_close_price', 'stock_close_price'))
+    return lambda: straddle_pnl('buy', 'sell', 2, 4.2, C_t, 1, 3.9, P_t, -0.1, 100.0, S_t)
+
+
+@benchmark('pnl.pnl_frame')
+def bench_pnl_frame():
+    history = synthetic_history()
+    return lambda: pnl_frame(history, 'buy', 'sell', 2, 4.2, 1, 3.9, -0.1, 100.0)
+
+
+def trade_date(years=HISTORY_YEARS):
+    return (datetime.now().date() - timedelta(days=365 * years)).isoformat()
+
+
+@benchmark('history.initialize_df')
+def bench_initialize_df():
+    start = trade_date()
+    return lambda: initialize_df(start)
+
+
+@benchmark('history.build_history')
+def bench_build_history():
+    start = trade_date()
+    history = synthetic_history(HISTORY_YEARS * 252)
+    # Polygon leaves gaps on days a contract did not trade
+    call_data = history[['date', 'call_close_price']].rename(columns={'call_close_price': 'c'}).iloc[::3]
+    put_data = history[['date', 'put_close_price']].rename(columns={'put_close_price': 'c'}).iloc[1::2]
+    call_data = call_data.assign(date=call_data['date'].astype(str))
+    put_data = put_data.assign(date=put_data['date'].astype(str))
+    stock_prices = history[['date', 'stock_close_price']]
+    return lambda: build_history(call_data, put_data, stock_prices, start, (4.0, 3.5, 101.0))
+
+
+def calibrate():
+    '''Milliseconds for a fixed mix of interpreter and numpy work, used to compare machines.'''
+    values = np.random.default_rng(2).normal(size=20000)
+
+    def run():
+        total = 0.0
+        for i in range(20000):
+            total += i * 0.5
+        np.sort(values)
+        return total
+    # Fastest run, like the kernels are compared: the scale factor must not carry the noise of this loop
+    return measure(run, repeat=7)['min'] * 1000
+
+
+def measure(fn, repeat=5, min_time=0.05):
+    '''timeit-style: loop count so one run lasts min_time, then per-call times over `repeat` runs.'''
+    # Kernels that print (blsprice) still pay for formatting, but the table stays readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+        loops = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+            loops *= 10 if elapsed < min_time / 10 else 2
+        runs = [elapsed / loops]
+        for _ in range(repeat - 1):
+            start = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            runs.append((time.perf_counter() - start) / loops)
+    return {'median': statistics.median(runs), 'min': min(runs), 'loops': loops, 'repeat': repeat}
+
+
+def measure_rounds(fn, rounds, repeat=5, min_time=0.05):
+    '''measure() `rounds` times; the median of each figure, so one disturbed round does not set the result.'''
+    results = [measure(fn, repeat, min_time) for _ in range(rounds)]
+    summary = {key: statistics.median(result[key] for result in results) for key in ('median', 'min')}
+    return dict(summary, loops=results[0]['loops'], repeat=repeat, rounds=rounds)
+
+
+def machine():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+    }
+
+
+def load_baselines(path=BASELINES):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def format_time(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the pricing, IV, payoff and PnL kernels.')
+    parser.add_argument('filters', nargs='*', help='only run benchmarks whose name contains one of these')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='timed runs per benchmark')
+    parser.add_argument('--rounds', type=int, help='independent measurements per benchmark (default 1, 3 with --update)')
+    parser.add_argument('--min-time', type=float, default=0.05, help='minimum seconds per timed run')
+    parser.add_argument('--json', metavar='PATH', help="write the results as JSON ('-' for stdout)")
+    parser.add_argument('--check', action='store_true', help='compare with the baselines and fail on a regression')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help="allowed slowdown over the scaled baseline, unless the kernel's baseline sets its own")
+    parser.add_argument('--update', action='store_true', help='write this run to the baselines file')
+    parser.add_argument('--baselines', default=BASELINES, help='baselines file')
+    args = parser.parse_args(argv)
+    rounds = args.rounds or (3 if args.update else 1)
+
+    names = [name for name in BENCHMARKS if not args.filters or any(word in name for word in args.filters)]
+    if not names:
+        parser.error(f"no benchmark matches {' '.join(args.filters)}; known: {', '.join(BENCHMARKS)}")
+
+    baselines = load_baselines(args.baselines)
+    if args.check and baselines is None:
+        parser.error(f"no baselines at {args.baselines}; record them with --update first")
+    calibration = calibrate()
+    scale = calibration / baselines['calibration_ms'] if baselines else 1.0
+    reference = baselines['results'] if baselines else {}
+
+    out = sys.stderr if args.json == '-' else sys.stdout
+    print(f"{'benchmark':<24}{'median':>12}{'min':>12}{'baseline':>12}{'ratio':>8}{'allowed':>9}", file=out)
+    results = {}
+    regressions = []
+    for name in names:
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn = BENCHMARKS[name]()
+        result = measure_rounds(fn, rounds, args.repeat, args.min_time)
+        results[name] = result
+        line = f"{name:<24}{format_time(result['median']):>12}{format_time(result['min']):>12}"
+        if name in reference:
+            # Fastest run against the baseline's fastest run
+            expected = reference[name]['min'] * scale
+            tolerance = reference[name].get('tolerance', args.tolerance)
+            result['ratio'] = result['min'] / expected
+            slower = result['ratio'] > 1 + tolerance
+            if slower:
+                regressions.append(name)
+            line += f"{format_time(expected):>12}{result['ratio']:>8.2f}{1 + tolerance:>9.2f}{'  SLOWER' if slower else ''}"
+        print(line, file=out)
+    if baselines:
+        print(f"baselines scaled by {scale:.2f} (calibration {calibration:.1f} ms here, "
+              f"{baselines['calibration_ms']:.1f} ms on the reference machine)", file=out)
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'machine': machine(),
+        'calibration_ms': calibration,
+        'baseline_scale': scale,
+        'tolerance': args.tolerance,
+        'results': results,
+        'regressions': regressions,
+    }
+    if args.json == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.update:
+        recorded = {name: {'median': result['median'], 'min': result['min']} for name, result in results.items()}
+        if baselines and args.filters:
+            # A partial run only replaces its own entries, rescaled to the stored calibration
+            kept = {name: entry for name, entry in reference.items() if name not in recorded}
+            recorded = dict(kept, **{name: {key: value / scale for key, value in entry.items()}
+                                     for name, entry in recorded.items()})
+            calibration = baselines['calibration_ms']
+        for name, entry in recorded.items():
+            if 'tolerance' in reference.get(name, {}):
+                entry['tolerance'] = reference[name]['tolerance']
+        with open(args.baselines, 'w') as f:
+            json.dump({'created': report['created'], 'machine': report['machine'], 'calibration_ms': calibration,
+                       'results': dict(sorted(recorded.items()))}, f, indent=2)
+            f.write('\n')
+        print(f"baselines written to {args.baselines}", file=out)
+
+    if args.check and regressions:
+        print(f"slower than baseline: {', '.join(regressions)}", file=out)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,27 +2,24 @@ import sys
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QSlider, QWidget, QVBoxLayout,
                              QHBoxLayout, QLabel, QLineEdit, QComboBox, QPushButton,
                              QGridLayout, QFrame, QSizePolicy, QDateEdit)
-from PyQt5.QtCore import (Qt, QThread, pyqtSignal, QDate)
+from PyQt5.QtCore import (Qt, QThread, pyqtSignal)
 from PyQt5.QtGui import QFont
-from datetime import date, datetime
-from scipy.stats import norm
-import numpy as np
-import pytz
-import holidays
-import logging
-
-from realPrice.realStock import get_realtime_stock_price
-from realPrice.realOption import get_realtime_option_price, calls_or_puts
+from datetime import datetime
+
 from tools.stylesheet import stylesheet
+from tools.tracing import traced
+from tools.diagnostics import install_diagnostics
 from tools.creations import create_input_field, create_date_field
 from tools.BsCal import BlackScholes
 from tools.BsFetch import FetchStockThread, FetchOptionThread
+from tools.tradingCalendar import trading_calendar
 
 
 class OptionStrategyVisualizer(QMainWindow):
     def __init__(self):
         super().__init__()
         self.initUI()
+        install_diagnostics(self)
         self.setStyleSheet(stylesheet)
 
     def initUI(self):
@@ -39,6 +36,7 @@ class OptionStrategyVisualizer(QMainWindow):
         self.symbol_input = create_input_field('Symbol', 'AAPL')
         curr = datetime.now().strftime('%Y-%m-%d-%H-%M') 
         self.today_date = create_input_field('Today', curr)
+        self.today_date.input_field.editingFinished.connect(self.update_calculation_based_on_date)
         self.date_input = create_date_field('Maturity', '2024-07-19')
         self.date_input.input_field.dateChanged.connect(self.update_calculation_based_on_date)
         self.x_input = create_input_field('Strike', '210')
@@ -118,6 +116,7 @@ class OptionStrategyVisualizer(QMainWindow):
         self.show()
         self.calculate_T_days(self.date_input.input_field.text())
   
+    @traced('blackScholes.fetch_data')
     def fetch_data(self):
         company = self.symbol_input.input_field.text()
         date = self.date_input.input_field.text()
@@ -153,8 +152,7 @@ class OptionStrategyVisualizer(QMainWindow):
             call_premium = float(self.call_premium_input.input_field.text())
             put_premium = float(self.put_premium_input.input_field.text())
 
-            impvC = BlackScholes().blsimpv('c', stock_price, strike, T, r, call_premium, sigma)
-            impvP = BlackScholes().blsimpv('p', stock_price, strike, T, r, put_premium, sigma)
+            impvC, impvP = BlackScholes().blsimpv(['c', 'p'], stock_price, strike, T, r, [call_premium, put_premium], sigma)
 
             self.impvC_input.input_field.setText("{:.2f}".format(impvC) if impvC is not None else "NA")
             self.impvP_input.input_field.setText("{:.2f}".format(impvP) if impvP is not None else "NA")
@@ -165,8 +163,9 @@ class OptionStrategyVisualizer(QMainWindow):
             put_ask = self.put_ask_input.input_field.text()
             put_bid = self.put_bid_input.input_field.text()
 
-            call_price = BlackScholes().blsprice('c', stock_price, strike, T, r, sigma)
-            put_price = BlackScholes().blsprice('p', stock_price, strike, T, r, sigma)
+            greeks = BlackScholes().blsgreeks(['c', 'p'], stock_price, strike, T, r, sigma)
+            call_price, put_price = greeks['price']
+            call_delta, put_delta = greeks['delta']
 
             # Check if values are not 'NA' before converting and comparing
             if call_ask != 'NA' and call_price > float(call_ask):
@@ -186,8 +185,6 @@ class OptionStrategyVisualizer(QMainWindow):
             self.call_price_input.input_field.setText("{:.2f}".format(call_price))
             self.put_price_input.input_field.setText("{:.2f}".format(put_price))
 
-            call_delta = BlackScholes().blsdelta('c', stock_price, strike, T, r, sigma)
-            put_delta = BlackScholes().blsdelta('p', stock_price, strike, T, r, sigma)
             self.call_delta_input.input_field.setText("{:.2f}".format(call_delta))
             self.put_delta_input.input_field.setText("{:.2f}".format(put_delta))
         else:
@@ -233,7 +230,7 @@ class OptionStrategyVisualizer(QMainWindow):
         strike = float(self.x_input.input_field.text())
 
         if hasattr(self, 'option_fetch_thread'):
-            self.option_fetch_thread.terminate()
+            self.option_fetch_thread.cancel()
 
         self.option_fetch_thread = FetchOptionThread(company, date, strike)
         self.option_fetch_thread.data_fetched.connect(self.fill_premium_inputs)
@@ -267,11 +264,20 @@ class OptionStrategyVisualizer(QMainWindow):
         maturity_date = self.date_input.input_field.text()
         self.calculate_T_days(maturity_date)
 
+    def today(self):
+        '''The Today field ('yyyy-MM-dd-HH-mm', or only the date) as a local datetime.'''
+        text = self.today_date.input_field.text().strip()
+        try:
+            return datetime.strptime(text, '%Y-%m-%d-%H-%M')
+        except ValueError:
+            return datetime.strptime(text[:10], '%Y-%m-%d')
+
     def calculate_T_days(self, maturity_date):
-        today_date = self.today_date.input_field.text()[:10]
-        calcT = QDate.fromString(today_date, "yyyy-MM-dd").daysTo(QDate.fromString(maturity_date, "yyyy-MM-dd"))
-        if datetime.now().hour >= 14:  # adjust for market close times if relevant
-            calcT -= 1
+        # Calendar days from Today to expiry, one less once that day's session (16:00 ET, 13:00 on early closes) is over
+        try:
+            calcT = trading_calendar().days_to_expiry(maturity_date.strip(), now=self.today())
+        except ValueError:
+            calcT = "NA"
         self.calcT_input.input_field.setText(str(calcT))
 
 if __name__ == '__main__':
@@ -0,0 +1,95 @@
+'''
+Startup budget for every GUI entry point.
+
+Each entry point is imported in a fresh interpreter, then its window is built,
+shown and given one event-loop pass. The best of a few runs is compared with
+the budget below, and the script fails when an entry point is over budget or
+when importing it already loaded one of the DEFERRED libraries, which are
+meant to load on first use through tools/lazy.py.
+
+    python import_budget.py [-n 3] [entry ...]
+
+Without a display the windows are created on Qt's offscreen platform.
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+DEFERRED = ('yfinance', 'pandas', 'QuantLib', 'scipy.stats', 'mplcursors', 'requests')
+
+# module: (window class, import budget in seconds, import + first shown window budget in seconds)
+ENTRY_POINTS = {
+    'pnl': ('OptionPNLApp', 0.8, 0.9),
+    'pnl_index': ('OptionPNLApp', 0.8, 0.9),
+    'pnl_history': ('OptionPNLApp', 0.8, 0.9),
+    'blackScholes': ('OptionStrategyVisualizer', 0.4, 0.5),
+    'appProfile': ('OptionStrategyVisualizer', 0.9, 1.0),
+    'appProfile2X': ('OptionStrategyVisualizer', 0.9, 1.0),
+    'appProfileIndex': ('OptionStrategyVisualizer', 0.9, 1.0),
+    'appProfilePast': ('OptionStrategyVisualizer', 0.9, 1.0),
+    'butterfly': ('OptionStrategyVisualizer', 0.9, 1.0),
+    'condor': ('OptionStrategyVisualizer', 0.9, 1.0),
+    'spread': ('OptionStrategyVisualizer', 0.9, 1.0),
+}
+
+PROBE = '''
+import importlib, json, os, sys, time
+start = time.perf_counter()
+module = importlib.import_module(sys.argv[1])
+imported = time.perf_counter()
+loaded = [name for name in json.loads(sys.argv[3]) if name in sys.modules]
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv[:1])
+window = getattr(module, sys.argv[2])()
+window.show()
+app.processEvents()
+shown = time.perf_counter()
+print(json.dumps({'import': imported - start, 'window': shown - start, 'loaded': loaded}), flush=True)
+os._exit(0)
+'''
+
+
+def measure(module, window_class):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.path.join(ROOT, 'profiles')]))
+    if not env.get('DISPLAY') and not env.get('WAYLAND_DISPLAY'):
+        env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    result = subprocess.run([sys.executable, '-c', PROBE, module, window_class, json.dumps(DEFERRED)],
+                            cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f'exit code {result.returncode}')
+    return json.loads(lines[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check import and first-window time of every entry point.')
+    parser.add_argument('entries', nargs='*', default=list(ENTRY_POINTS), help='entry points to measure')
+    parser.add_argument('-n', '--runs', type=int, default=3, help='runs per entry point; the best one counts')
+    args = parser.parse_args(argv)
+
+    failed = False
+    print(f"{'entry point':<16}{'import':>8}{'budget':>8}{'window':>8}{'budget':>8}  deferred loaded")
+    for name in args.entries:
+        window_class, import_budget, window_budget = ENTRY_POINTS[name]
+        try:
+            runs = [measure(name, window_class) for _ in range(args.runs)]
+        except Exception as e:
+            print(f"{name:<16}failed: {e}")
+            failed = True
+            continue
+        imported = min(run['import'] for run in runs)
+        shown = min(run['window'] for run in runs)
+        loaded = sorted({module for run in runs for module in run['loaded']})
+        over = imported > import_budget or shown > window_budget or loaded
+        failed = failed or bool(over)
+        print(f"{name:<16}{imported:>8.2f}{import_budget:>8.2f}{shown:>8.2f}{window_budget:>8.2f}  "
+              f"{', '.join(loaded) or '-'}{'  OVER' if over else ''}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
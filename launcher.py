@@ -0,0 +1,152 @@
+'''
+One process for every tool.
+
+Opens the PnL, Black-Scholes and profile windows (and the per-trade scripts in
+PNL_Trades/) on demand inside a single QApplication, so they share the option
+chain cache, the in-flight request table, the fetch worker pool and the trade
+book instead of each cold-starting its own copy. A tool's module is imported
+the first time it is opened; the launcher also imports the main tools in the
+background while it sits idle, so opening one is close to instant.
+
+    python launcher.py [tool ...]       e.g. python launcher.py condor pnl
+
+Tools named on the command line are opened straight away.
+'''
+import glob
+import importlib
+import os
+import sys
+from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QGridLayout, QLabel, QPushButton, QComboBox
+from PyQt5.QtCore import Qt, QTimer
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+for folder in (ROOT, os.path.join(ROOT, 'profiles'), os.path.join(ROOT, 'PNL_Trades')):
+    if folder not in sys.path:
+        sys.path.append(folder)
+
+from tools.stylesheet import stylesheet
+from tools.diagnostics import install_diagnostics, toggle_diagnostics
+
+# (section, button label, module, window class)
+TOOLS = [
+    ('PnL', 'PnL', 'pnl', 'OptionPNLApp'),
+    ('PnL', 'Index PnL', 'pnl_index', 'OptionPNLApp'),
+    ('PnL', 'PnL History', 'pnl_history', 'OptionPNLApp'),
+    ('Pricing', 'Black-Scholes', 'blackScholes', 'OptionStrategyVisualizer'),
+    ('Profiles', 'Profile', 'appProfile', 'OptionStrategyVisualizer'),
+    ('Profiles', 'Profile 2X', 'appProfile2X', 'OptionStrategyVisualizer'),
+    ('Profiles', 'Index Profile', 'appProfileIndex', 'OptionStrategyVisualizer'),
+    ('Profiles', 'Past Profile', 'appProfilePast', 'OptionStrategyVisualizer'),
+    ('Profiles', 'Butterfly', 'butterfly', 'OptionStrategyVisualizer'),
+    ('Profiles', 'Condor', 'condor', 'OptionStrategyVisualizer'),
+    ('Profiles', 'Spread', 'spread', 'OptionStrategyVisualizer'),
+]
+
+
+def trade_scripts():
+    return sorted(os.path.splitext(os.path.basename(path))[0] for path in glob.glob(os.path.join(ROOT, 'PNL_Trades', 'PNL_*.py')))
+
+
+def window_class(module):
+    for _, _, name, class_name in TOOLS:
+        if name == module:
+            return class_name
+    if module in trade_scripts():
+        return 'OptionPNLApp'
+    raise KeyError(module)
+
+
+class Launcher(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.windows = []
+        self.initUI()
+        install_diagnostics(self)
+        self.setStyleSheet(stylesheet)
+        self.show()
+
+        # Import the main tools one per idle event-loop pass, so the launcher stays responsive
+        self.warm_up = [module for _, _, module, _ in TOOLS]
+        self.warm_timer = QTimer(self)
+        self.warm_timer.timeout.connect(self.import_next)
+        self.warm_timer.start(0)
+
+    def initUI(self):
+        self.setWindowTitle("Options Toolkit")
+        self.setGeometry(100, 100, 420, 360)
+        central_widget = QWidget(self)
+        self.setCentralWidget(central_widget)
+        layout = QGridLayout(central_widget)
+
+        row = 0
+        section = None
+        for tool_section, label, module, _ in TOOLS:
+            if tool_section != section:
+                section = tool_section
+                layout.addWidget(QLabel(section), row, 0, 1, 2)
+                row += 1
+                column = 0
+            button = QPushButton(label)
+            button.clicked.connect(lambda checked, module=module: self.open_tool(module))
+            layout.addWidget(button, row, column)
+            column += 1
+            if column == 2:
+                row, column = row + 1, 0
+        if column:
+            row += 1
+
+        self.trade_combo = QComboBox()
+        self.trade_combo.addItems(trade_scripts())
+        open_trade = QPushButton('Open Trade')
+        open_trade.clicked.connect(lambda: self.open_tool(self.trade_combo.currentText()))
+        layout.addWidget(QLabel('Trades'), row, 0, 1, 2)
+        layout.addWidget(self.trade_combo, row + 1, 0)
+        layout.addWidget(open_trade, row + 1, 1)
+
+        # Spans from every open tool land in one process-wide buffer, so this dock shows them all
+        diagnostics = QPushButton('Diagnostics')
+        diagnostics.clicked.connect(lambda: toggle_diagnostics(self))
+        layout.addWidget(diagnostics, row + 2, 0, 1, 2)
+
+    def import_next(self):
+        if not self.warm_up:
+            self.warm_timer.stop()
+            return
+        module = self.warm_up.pop(0)
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            print(f"Could not import {module}: {e}")
+
+    def open_tool(self, module):
+        if not module:
+            return None
+        try:
+            window = getattr(importlib.import_module(module), window_class(module))()
+        except Exception as e:
+            print(f"Could not open {module}: {e}")
+            return None
+        window.setAttribute(Qt.WA_DeleteOnClose)
+        window.destroyed.connect(lambda _=None, window=window: self.forget(window))
+        self.windows.append(window)
+        window.show()
+        window.raise_()
+        return window
+
+    def forget(self, window):
+        if window in self.windows:
+            self.windows.remove(window)
+
+    def terminate_threads(self):
+        for window in self.windows:
+            if hasattr(window, 'terminate_threads'):
+                window.terminate_threads()
+
+
+if __name__ == '__main__':
+    app = QApplication(sys.argv)
+    launcher = Launcher()
+    app.aboutToQuit.connect(launcher.terminate_threads)
+    for name in sys.argv[1:]:
+        launcher.open_tool(name)
+    sys.exit(app.exec_())
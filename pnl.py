@@ -1,40 +1,44 @@
+import os
 import sys
-import pandas as pd
-import yfinance as yf
-import holidays
-import pytz
 from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QLabel, QLineEdit, QComboBox, QPushButton, QGridLayout, QFrame, QWidget, QHBoxLayout, QSizePolicy
-from PyQt5.QtCore import Qt, QSize
+from PyQt5.QtCore import Qt, QSize, QTimer
 from PyQt5.QtGui import QMovie
-import matplotlib.pyplot as plt
-import mplcursors
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
-from datetime import datetime
 
 from realPrice.OptionPnl import main, calls_or_puts
-from realPrice.realOption import get_realtime_option_price
+from realPrice.realOption import get_realtime_option_price, get_position_quote
 
 from tools.stylesheet import stylesheet
+from tools.tracing import note, traced
+from tools.workerPool import PooledCall
+from tools.diagnostics import install_diagnostics
 from tools.pnl_creations import pnl_create_input_field as create_input_field, create_combo_box
-from tools.pnl_tools import calculate_pnl, market_open
+from tools.pnl_tools import pnl_frame, market_open, stored_history, update_latest
+from tools.tradeBook import position_key
+from tools.tradeLedger import shared_book
+from tools.lazy import lazy_import
 
-
-# Dummy DataFrame to hold trade data
-trades_df = pd.DataFrame(columns=[
-    'trade_date', 'symbol', 'strike', 'expiration', 'stock_trade_price', 'effective_delta',
-    'call_trade_price', 'call_action_type', 'num_call_contracts', 'put_trade_price',
-    'put_action_type', 'num_put_contracts', 'stock_close_price', 'call_close_price',
-    'put_close_price', 'daily_pnl', 'change'
-])
+pd = lazy_import('pandas')
+mplcursors = lazy_import('mplcursors')
 
 
 class OptionPNLApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self.initUI()
+        install_diagnostics(self)
         self.setStyleSheet(stylesheet)
-        self.trades = trades_df.copy()
+        # Rows computed in earlier sessions come back from trades.db
+        self.trades = shared_book()
+        self.update_plot()
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(int(float(os.environ.get('PNL_REFRESH_SECONDS', 60)) * 1000))
+        self.refresh_timer.timeout.connect(self.refresh_position)
+        self.position = None
+        self.refresh_fetch = None
     
     def initUI(self):
         self.setWindowTitle("Option PNL Tracker")
@@ -93,7 +97,7 @@ class OptionPNLApp(QMainWindow):
         grid_layout.addWidget(control_panel, 0, 0)
 
         # Right-side plot
-        self.figure = plt.Figure()
+        self.figure = Figure()
         self.canvas = FigureCanvas(self.figure)
         self.canvas.setMinimumSize(800, 600)
         grid_layout.addWidget(self.canvas, 0, 1)
@@ -105,51 +109,109 @@ class OptionPNLApp(QMainWindow):
         self.show()
 
 
+    def read_position(self):
+        '''The position typed into the form; raises ValueError while a number field does not parse.'''
+        return {
+            'trade_date': self.trade_date_input.input_field.text(),
+            'symbol': self.symbol_input.input_field.text(),
+            'strike': float(self.strike_input.input_field.text()),
+            'expiration': self.expiration_input.input_field.text(),
+            'stock_trade_price': float(self.stock_trade_price_input.input_field.text()),
+            'call_trade_price': float(self.call_trade_price_input.input_field.text()),
+            'put_trade_price': float(self.put_trade_price_input.input_field.text()),
+            'effective_delta': float(self.effective_delta_input.input_field.text()),
+            'num_call_contracts': int(self.num_call_contracts_input.input_field.text()),
+            'num_put_contracts': int(self.num_put_contracts_input.input_field.text()),
+            'call_action_type': self.call_action_type_input.combo_box.currentText(),
+            'put_action_type': self.put_action_type_input.combo_box.currentText(),
+        }
+
+    @traced('pnl.add_trade')
     def add_trade(self):
         # Show the loading spinner
         self.loading_spinner.show()
         self.status_label.setText("Adding trade...")
-        
-        # Get input values
-        trade_date = self.trade_date_input.input_field.text()
-        symbol = self.symbol_input.input_field.text()
-        strike = float(self.strike_input.input_field.text())
-        expiration = self.expiration_input.input_field.text()
-        stock_trade_price = float(self.stock_trade_price_input.input_field.text())
-        call_trade_price = float(self.call_trade_price_input.input_field.text())
-        put_trade_price = float(self.put_trade_price_input.input_field.text())
-        effective_delta = float(self.effective_delta_input.input_field.text())
-        num_call_contracts = int(self.num_call_contracts_input.input_field.text())
-        num_put_contracts = int(self.num_put_contracts_input.input_field.text())
-        call_action_type = self.call_action_type_input.combo_box.currentText()
-        put_action_type = self.put_action_type_input.combo_box.currentText()
 
-        # Fetch historical data
-        option_data = main(symbol, expiration, strike, trade_date)
+        # A new position replaces the one being refreshed
+        self.refresh_timer.stop()
+        if self.refresh_fetch is not None:
+            self.refresh_fetch.cancel()
+        position = self.read_position()
+        if self.price_position(position):
+            # The timer keeps this position live, whatever is typed into the form afterwards
+            self.position = position
+            self.update_plot()
+            self.status_label.setText("Trade added successfully!")
+            self.loading_spinner.hide()
+            self.refresh_timer.start()
 
-        if option_data is None or option_data.empty:
-            print("No data found or unable to retrieve data.")
-            return
+    def price_position(self, position):
+        '''Prices `position` up to today into the trade book; False when no data came back.'''
+        return self.store_history(position, self.fetch_history(position))
 
-        # Fetch real-time data if market is open
-        if market_open():
-            options = calls_or_puts(symbol, expiration, strike)
-            if options and len(options) == 2:
-                call_close_price, call_ask_price, call_bid_price = get_realtime_option_price(options[0])
-                put_close_price, put_ask_price, put_bid_price = get_realtime_option_price(options[1])
-                option_data.at[option_data.index[-1], 'call_close_price'] = call_ask_price if call_action_type == "sell" else call_bid_price
-                option_data.at[option_data.index[-1], 'put_close_price'] = put_ask_price if put_action_type == "sell" else put_bid_price
+    def fetch_history(self, position):
+        '''
+        [date, call, put, stock] closes of `position` with today's mark last, or None.
+        Only reads the book and the network, so the refresh timer runs it on the fetch pool.
+        '''
+        trade_date = position['trade_date']
+        symbol = position['symbol']
+        strike = position['strike']
+        expiration = position['expiration']
+        call_action_type = position['call_action_type']
+        put_action_type = position['put_action_type']
+
+        key = position_key(position)
+        option_data = stored_history(self.trades, key, trade_date)
+        if option_data is not None:
+            # History up to the last session is already in the book; only today's row is re-priced
+            quote = get_position_quote(symbol, expiration, strike)
+            if quote is None:
+                note("Unable to refresh the latest quote.")
+                return None
+            option_data = update_latest(option_data, quote, call_action_type, put_action_type, live=market_open())
+        else:
+            # Fetch historical data
+            option_data = main(symbol, expiration, strike, trade_date)
+
+            if option_data is None or option_data.empty:
+                note("No data found or unable to retrieve data.")
+                return None
+
+            # Fetch real-time data if market is open
+            if market_open():
+                options = calls_or_puts(symbol, expiration, strike)
+                if options and len(options) == 2:
+                    call_close_price, call_ask_price, call_bid_price = get_realtime_option_price(options[0])
+                    put_close_price, put_ask_price, put_bid_price = get_realtime_option_price(options[1])
+                    option_data.at[option_data.index[-1], 'call_close_price'] = call_ask_price if call_action_type == "sell" else call_bid_price
+                    option_data.at[option_data.index[-1], 'put_close_price'] = put_ask_price if put_action_type == "sell" else put_bid_price
+        return option_data
+
+    def store_history(self, position, option_data):
+        '''Upserts the PnL of fetched closes into the trade book; False when there are none.'''
+        symbol = position['symbol']
+        strike = position['strike']
+        expiration = position['expiration']
+        stock_trade_price = position['stock_trade_price']
+        call_trade_price = position['call_trade_price']
+        put_trade_price = position['put_trade_price']
+        effective_delta = position['effective_delta']
+        num_call_contracts = position['num_call_contracts']
+        num_put_contracts = position['num_put_contracts']
+        call_action_type = position['call_action_type']
+        put_action_type = position['put_action_type']
 
         # Proceed with updating trades and calculating PNL
         if option_data is not None and not option_data.empty:
-            for _, row in option_data.iterrows():
-                daily_pnl = calculate_pnl(call_action_type, put_action_type,
-                                            num_call_contracts, call_trade_price, row['call_close_price'],
-                                            num_put_contracts, put_trade_price, row['put_close_price'],
-                                            effective_delta, stock_trade_price, row['stock_close_price'])
-                daily_pnl = round(daily_pnl, 2)
-                investment = ((num_call_contracts * call_trade_price) + (num_put_contracts * put_trade_price)) * 100
-                change = round(daily_pnl / investment * 100, 2)
+            option_data = pnl_frame(option_data, call_action_type, put_action_type,
+                                    num_call_contracts, call_trade_price,
+                                    num_put_contracts, put_trade_price,
+                                    effective_delta, stock_trade_price)
+            new_trades = []
+            for row in option_data.to_dict('records'):
+                daily_pnl = row['daily_pnl']
+                change = row['change']
                 new_trade = {
                     'trade_date': row['date'].strftime('%Y-%m-%d'),
                     'symbol': symbol,
@@ -170,39 +232,40 @@ class OptionPNLApp(QMainWindow):
                     'change': change
                 }
 
-                # Check if the trade already exists in the DataFrame
-                exists = self.trades[
-                    (self.trades['trade_date'] == new_trade['trade_date']) &
-                    (self.trades['symbol'] == new_trade['symbol']) &
-                    (self.trades['strike'] == new_trade['strike']) &
-                    (self.trades['expiration'] == new_trade['expiration']) &
-                    (self.trades['stock_trade_price'] == new_trade['stock_trade_price']) &
-                    (self.trades['effective_delta'] == new_trade['effective_delta']) &
-                    (self.trades['call_trade_price'] == new_trade['call_trade_price']) &
-                    (self.trades['call_action_type'] == new_trade['call_action_type']) &
-                    (self.trades['num_call_contracts'] == new_trade['num_call_contracts']) &
-                    (self.trades['put_trade_price'] == new_trade['put_trade_price']) &
-                    (self.trades['put_action_type'] == new_trade['put_action_type']) &
-                    (self.trades['num_put_contracts'] == new_trade['num_put_contracts']) 
-                ]
-                
-                
-                if not exists.empty:     
-                    self.trades = self.trades.drop(exists.index)
-                    print("Trade already exists. Skipping duplicate entry.")
-                    continue
-
-                # Add the new trade to the DataFrame
-                new_df = pd.DataFrame([new_trade])
-                self.trades = pd.concat([self.trades, new_df], ignore_index=True)
+                new_trades.append(new_trade)
+            replaced = self.trades.extend(new_trades)
+            if replaced:
+                note(f"Updated {replaced} existing row(s) for this trade.", replaced=replaced)
+            return True
+        note("No data found or unable to retrieve data.")
+        return False
 
-            
+    @traced('pnl.refresh_position')
+    def refresh_position(self):
+        # Only today's row of the tracked position is re-priced, on the fetch pool
+        if self.position is None or not market_open():
+            return
+        if self.refresh_fetch is not None and self.refresh_fetch.isRunning():
+            return
+        position = self.position
+        self.refresh_fetch = PooledCall(lambda: (position, self.fetch_history(position)))
+        self.refresh_fetch.data_fetched.connect(self.apply_refresh, Qt.QueuedConnection)
+        self.refresh_fetch.start()
+
+    @traced('pnl.apply_refresh')
+    def apply_refresh(self, result):
+        position, option_data = result
+        # Dropped if another trade was added while the quote was in flight
+        if position is not self.position or not self.store_history(position, option_data):
+            return
+        try:
+            showing = self.read_position() == self.position
+        except ValueError:
+            showing = False
+        if showing:
             self.update_plot()
-            self.status_label.setText("Trade added successfully!")
-            self.loading_spinner.hide()
-        else:
-            print("No data found or unable to retrieve data.")
 
+    @traced('pnl.update_plot')
     def update_plot(self):
         input_date = self.trade_date_input.input_field.text()
         symbol = self.symbol_input.input_field.text()
@@ -215,18 +278,17 @@ class OptionPNLApp(QMainWindow):
         trade_price = float(self.stock_trade_price_input.input_field.text())
         effective_delta = float(self.effective_delta_input.input_field.text())
 
-        filtered_data = self.trades[
-            (self.trades['symbol'] == symbol) &
-            (self.trades['strike'] == strike) &
-            (self.trades['expiration'] == expiration) &
-            (self.trades['trade_date'] >= input_date) &
-            (self.trades['call_action_type'] == call_action_type) &
-            (self.trades['put_action_type'] == put_action_type) &
-            (self.trades['num_call_contracts'] == num_call_contracts) &
-            (self.trades['num_put_contracts'] == num_put_contracts) &
-            (self.trades['stock_trade_price'] == trade_price) &
-            (self.trades['effective_delta'] == effective_delta)     
-        ]
+        key = position_key({
+            'symbol': symbol, 'strike': strike, 'expiration': expiration,
+            'call_action_type': call_action_type, 'put_action_type': put_action_type,
+            'num_call_contracts': num_call_contracts, 'num_put_contracts': num_put_contracts,
+            'stock_trade_price': trade_price, 'effective_delta': effective_delta,
+        })
+        if not self.trades.dates(key, start_date=input_date):
+            # Nothing stored yet (e.g. the first draw at startup): no need to load pandas for it
+            print("No data to display for selected filters.")
+            return
+        filtered_data = self.trades.series(key, start_date=input_date)
         
 
         if not filtered_data.empty:
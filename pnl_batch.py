@@ -0,0 +1,193 @@
+'''
+Headless PnL for a whole book of straddle/strangle-style positions.
+
+Reads every position from a trades file (PNL_Trades/trades.csv by default, or a
+.yaml/.yml list with the same fields) and revalues all of them in one process:
+option chains, underlying histories and spot prices are fetched once per
+underlying, option bars once per contract, and all of it concurrently. The daily
+PnL series of the whole book is written as one CSV.
+
+    python pnl_batch.py [trades.csv] [-o pnl_book.csv] [--ledger]
+'''
+import argparse
+import os
+import sys
+from datetime import datetime
+import pandas as pd
+
+from realPrice.chainCache import option_chain
+from realPrice.fetchPool import fetch_all
+from realPrice.realStock import get_realtime_stock_price
+from realPrice.OptionPnl import build_history, get_historical_data, get_stock_price
+from tools.pnl_tools import index_delta_scale, pnl_frame
+from tools.tradeBook import COLUMNS
+from tools.tradeLedger import TradeLedger
+
+DEFAULT_TRADES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'PNL_Trades', 'trades.csv')
+
+FIELDS = {
+    'name': str, 'symbol': str, 'trade_date': str, 'strike': float, 'expiration': str,
+    'stock_trade_price': float, 'effective_delta': float,
+    'call_action_type': str, 'num_call_contracts': int, 'call_trade_price': float,
+    'put_action_type': str, 'num_put_contracts': int, 'put_trade_price': float,
+}
+
+
+def load_trades(path):
+    if path.endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            sys.exit("Reading a YAML trades file needs PyYAML: pip install pyyaml")
+        with open(path) as f:
+            trades = pd.DataFrame(yaml.safe_load(f))
+    else:
+        trades = pd.read_csv(path, dtype=str)
+
+    missing = [field for field in FIELDS if field not in trades.columns]
+    if missing:
+        sys.exit(f"{path} is missing column(s): {', '.join(missing)}")
+    trades = trades[list(FIELDS)].copy()
+    for field, kind in FIELDS.items():
+        trades[field] = trades[field].astype(str).str.strip() if kind is str else trades[field].astype(float).astype(kind)
+    return trades
+
+
+def delta_scale(trade):
+    # Only index symbols use the NDX/SPX scripts' hedge multiplier
+    if not trade['symbol'].startswith('^'):
+        return 1
+    return index_delta_scale(trade['call_action_type'], trade['put_action_type'])
+
+
+def find_contracts(chain, strike):
+    '''(call symbol, call last price, put symbol, put last price) at strike, or None.'''
+    if chain is None:
+        return None
+    call = chain.calls[chain.calls['strike'] == strike]
+    put = chain.puts[chain.puts['strike'] == strike]
+    if call.empty or put.empty:
+        return None
+    return call['contractSymbol'].values[0], call['lastPrice'].values[0], put['contractSymbol'].values[0], put['lastPrice'].values[0]
+
+
+def attempt(fn, *args):
+    # One bad symbol or expiry should cost its own positions, not the whole run
+    try:
+        return fn(*args)
+    except Exception as e:
+        print(f"{fn.__name__}{args} failed: {e}")
+        return None
+
+
+def fetch_market_data(trades):
+    '''Downloads everything the book needs, each piece once, and returns it keyed for lookup.'''
+    today = datetime.now().strftime('%Y-%m-%d')
+    first_trade = trades.groupby('symbol')['trade_date'].min()
+
+    tasks = {}
+    for symbol, expiration in trades[['symbol', 'expiration']].drop_duplicates().itertuples(index=False):
+        tasks[('chain', symbol, expiration)] = (attempt, option_chain, symbol, expiration)
+    for symbol, start_date in first_trade.items():
+        tasks[('stock', symbol)] = (attempt, get_stock_price, symbol, start_date, today)
+        tasks[('spot', symbol)] = (attempt, get_realtime_stock_price, symbol)
+    data = fetch_all(tasks)
+
+    # Option bars depend on the contract symbols from the chains, so they go in a second round
+    contract_start = {}
+    for trade in trades.to_dict('records'):
+        contracts = find_contracts(data[('chain', trade['symbol'], trade['expiration'])], trade['strike'])
+        if contracts is None:
+            continue
+        for ticker in (contracts[0], contracts[2]):
+            contract_start[ticker] = min(contract_start.get(ticker, trade['trade_date']), trade['trade_date'])
+    data.update(fetch_all({('bars', ticker): (attempt, get_historical_data, ticker, start_date)
+                           for ticker, start_date in contract_start.items()}))
+    return data
+
+
+def position_rows(trade, data):
+    chain = data[('chain', trade['symbol'], trade['expiration'])]
+    contracts = find_contracts(chain, trade['strike'])
+    if contracts is None:
+        print(f"{trade['name']}: no call/put pair at strike {trade['strike']} for {trade['expiration']}.")
+        return []
+    call_ticker, call_last, put_ticker, put_last = contracts
+    call_data, put_data = data[('bars', call_ticker)], data[('bars', put_ticker)]
+    stock_prices, spot = data[('stock', trade['symbol'])], data[('spot', trade['symbol'])]
+    if any(frame is None or frame.empty for frame in (call_data, put_data, stock_prices)) or spot is None:
+        print(f"{trade['name']}: could not retrieve market data.")
+        return []
+
+    # Bars were downloaded from the earliest trade on each contract; keep this position's window
+    start = datetime.strptime(trade['trade_date'], '%Y-%m-%d').date()
+    call_data = call_data[call_data['date'] >= start]
+    put_data = put_data[put_data['date'] >= start]
+    stock_prices = stock_prices[stock_prices['date'] >= start]
+
+    how = 'inner' if trade['symbol'].startswith('^') else 'outer'
+    history = build_history(call_data, put_data, stock_prices, trade['trade_date'], (call_last, put_last, spot[0]), how=how)
+    history = pnl_frame(history, trade['call_action_type'], trade['put_action_type'],
+                        trade['num_call_contracts'], trade['call_trade_price'],
+                        trade['num_put_contracts'], trade['put_trade_price'],
+                        trade['effective_delta'], trade['stock_trade_price'], delta_scale=delta_scale(trade))
+
+    rows = []
+    for row in history.to_dict('records'):
+        rows.append({
+            'trade_date': row['date'].strftime('%Y-%m-%d'),
+            'symbol': trade['symbol'],
+            'strike': trade['strike'],
+            'expiration': trade['expiration'],
+            'stock_trade_price': trade['stock_trade_price'],
+            'effective_delta': trade['effective_delta'],
+            'call_trade_price': row['call_close_price'],
+            'call_action_type': trade['call_action_type'],
+            'num_call_contracts': trade['num_call_contracts'],
+            'put_trade_price': row['put_close_price'],
+            'put_action_type': trade['put_action_type'],
+            'num_put_contracts': trade['num_put_contracts'],
+            'stock_close_price': round(row['stock_close_price'], 2),
+            'call_close_price': row['call_close_price'],
+            'put_close_price': row['put_close_price'],
+            'daily_pnl': row['daily_pnl'],
+            'change': row['change']
+        })
+    return rows
+
+
+def run(trades, ledger=None):
+    data = fetch_market_data(trades)
+    frames = []
+    for trade in trades.to_dict('records'):
+        rows = position_rows(trade, data)
+        if not rows:
+            continue
+        if ledger is not None:
+            ledger.save(rows)
+        frame = pd.DataFrame(rows, columns=COLUMNS)
+        frame.insert(0, 'name', trade['name'])
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=['name'] + COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Revalue every position in a trades file without the GUI.')
+    parser.add_argument('trades', nargs='?', default=DEFAULT_TRADES, help='CSV or YAML trades file')
+    parser.add_argument('-o', '--output', default='pnl_book.csv', help='where to write the PnL series')
+    parser.add_argument('--ledger', action='store_true', help='also store the rows in trades.db for the PnL apps')
+    args = parser.parse_args(argv)
+
+    trades = load_trades(args.trades)
+    book = run(trades, TradeLedger() if args.ledger else None)
+    book.to_csv(args.output, index=False)
+
+    latest = book.groupby('name', sort=False).tail(1)
+    print(latest[['name', 'trade_date', 'stock_close_price', 'call_close_price', 'put_close_price', 'daily_pnl', 'change']].to_string(index=False))
+    print(f"Wrote {len(book)} rows for {latest['name'].nunique()} of {len(trades)} positions to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,36 +1,33 @@
 import sys
-import pandas as pd
-import yfinance as yf
-import holidays
-import pytz
-import requests
 from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QLabel, QLineEdit, QComboBox, QPushButton, QGridLayout, QFrame, QWidget
 from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QMovie
-import matplotlib.pyplot as plt
-import mplcursors
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
-from datetime import datetime
 
 from tools.stylesheet import stylesheet
+from tools.tracing import note, traced
+from tools.diagnostics import install_diagnostics
 from tools.pnl_creations import pnl_create_input_field as create_input_field, create_combo_box
-from tools.pnl_tools import calculate_pnl, market_open, get_historical_data, get_stock_price, get_ticker, get_pnl, data
+from tools.pnl_tools import pnl_frame, market_open, get_historical_data, get_stock_price, get_ticker, get_pnl, data
+from tools.tradeBook import position_key
+from tools.tradeLedger import shared_book
+from tools.lazy import lazy_import
 
+pd = lazy_import('pandas')
+mplcursors = lazy_import('mplcursors')
 
-trades_df = pd.DataFrame(columns=[
-    'trade_date', 'symbol', 'strike', 'expiration', 'stock_trade_price', 'effective_delta',
-    'call_trade_price', 'call_action_type', 'num_call_contracts', 'put_trade_price',
-    'put_action_type', 'num_put_contracts', 'stock_close_price', 'call_close_price',
-    'put_close_price', 'daily_pnl', 'change'
-])
 
 class OptionPNLApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self.initUI()
+        install_diagnostics(self)
         self.setStyleSheet(stylesheet)
-        self.trades = trades_df.copy()
+        # Rows computed in earlier sessions come back from trades.db
+        self.trades = shared_book()
+        self.update_plot()
     
     def initUI(self):
         self.setWindowTitle("Expired Option PNL Tracker")
@@ -89,7 +86,7 @@ class OptionPNLApp(QMainWindow):
         grid_layout.addWidget(control_panel, 0, 0)
 
         # Right-side plot
-        self.figure = plt.Figure()
+        self.figure = Figure()
         self.canvas = FigureCanvas(self.figure)
         self.canvas.setMinimumSize(800, 600)
         grid_layout.addWidget(self.canvas, 0, 1)
@@ -100,6 +97,7 @@ class OptionPNLApp(QMainWindow):
 
         self.show()
 
+    @traced('pnl_history.add_trade')
     def add_trade(self):
         # Show the loading spinner
         self.loading_spinner.show()
@@ -121,24 +119,24 @@ class OptionPNLApp(QMainWindow):
 
         # Get the ticker symbols for the call and put options
         call_ticker, put_ticker = get_ticker(strike, symbol, expiration)
-        print(f"Call Ticker: {call_ticker}, Put Ticker: {put_ticker}")
+        note("Tickers", call=call_ticker, put=put_ticker)
 
         # Get PnL data
         pnl_data = get_pnl(call_ticker, put_ticker, trade_date, stock_trade_price, effective_delta, call_action_type, num_call_contracts, call_trade_price, put_action_type, num_put_contracts, put_trade_price)
 
         if pnl_data is None or pnl_data.empty:
-            print("No data found or unable to retrieve data.")
+            note("No data found or unable to retrieve data.")
             return
 
         # Proceed with updating trades and calculating PNL
-        for _, row in pnl_data.iterrows():
-            daily_pnl = calculate_pnl(call_action_type, put_action_type,
-                                        num_call_contracts, call_trade_price, row['call_close_price'],
-                                        num_put_contracts, put_trade_price, row['put_close_price'],
-                                        effective_delta, stock_trade_price, row['stock'])
-            daily_pnl = round(daily_pnl, 2)
-            investment = ((num_call_contracts * call_trade_price) + (num_put_contracts * put_trade_price)) * 100
-            change = round(daily_pnl / investment * 100, 2)
+        pnl_data = pnl_frame(pnl_data, call_action_type, put_action_type,
+                             num_call_contracts, call_trade_price,
+                             num_put_contracts, put_trade_price,
+                             effective_delta, stock_trade_price, stock_col='stock')
+        new_trades = []
+        for row in pnl_data.to_dict('records'):
+            daily_pnl = row['daily_pnl']
+            change = row['change']
             new_trade = {
                 'trade_date': row['date'].strftime('%Y-%m-%d'),
                 'symbol': symbol,
@@ -159,36 +157,17 @@ class OptionPNLApp(QMainWindow):
                 'change': change
             }
 
-            # Check if the trade already exists in the DataFrame
-            exists = self.trades[
-                (self.trades['trade_date'] == new_trade['trade_date']) &
-                (self.trades['symbol'] == new_trade['symbol']) &
-                (self.trades['strike'] == new_trade['strike']) &
-                (self.trades['expiration'] == new_trade['expiration']) &
-                (self.trades['stock_trade_price'] == new_trade['stock_trade_price']) &
-                (self.trades['effective_delta'] == new_trade['effective_delta']) &
-                (self.trades['call_trade_price'] == new_trade['call_trade_price']) &
-                (self.trades['call_action_type'] == new_trade['call_action_type']) &
-                (self.trades['num_call_contracts'] == new_trade['num_call_contracts']) &
-                (self.trades['put_trade_price'] == new_trade['put_trade_price']) &
-                (self.trades['put_action_type'] == new_trade['put_action_type']) &
-                (self.trades['num_put_contracts'] == new_trade['num_put_contracts']) 
-            ]
-            
-            if not exists.empty:     
-                self.trades = self.trades.drop(exists.index)
-                print("Trade already exists. Skipping duplicate entry.")
-                continue
-
-            # Add the new trade to the DataFrame
-            new_df = pd.DataFrame([new_trade])
-            self.trades = pd.concat([self.trades, new_df], ignore_index=True)
+            new_trades.append(new_trade)
+        replaced = self.trades.extend(new_trades)
+        if replaced:
+            note(f"Updated {replaced} existing row(s) for this trade.", replaced=replaced)
 
         self.update_plot()
         self.status_label.setText("Trade added successfully!")
         self.loading_spinner.hide()
 
 
+    @traced('pnl_history.update_plot')
     def update_plot(self):
         input_date = self.trade_date_input.input_field.text()
         symbol = self.symbol_input.input_field.text()
@@ -201,18 +180,17 @@ class OptionPNLApp(QMainWindow):
         trade_price = float(self.stock_trade_price_input.input_field.text())
         effective_delta = float(self.effective_delta_input.input_field.text())
 
-        filtered_data = self.trades[
-            (self.trades['symbol'] == symbol) &
-            (self.trades['strike'] == strike) &
-            (self.trades['expiration'] == expiration) &
-            (self.trades['trade_date'] >= input_date) &
-            (self.trades['call_action_type'] == call_action_type) &
-            (self.trades['put_action_type'] == put_action_type) &
-            (self.trades['num_call_contracts'] == num_call_contracts) &
-            (self.trades['num_put_contracts'] == num_put_contracts) &
-            (self.trades['stock_trade_price'] == trade_price) &
-            (self.trades['effective_delta'] == effective_delta)     
-        ]
+        key = position_key({
+            'symbol': symbol, 'strike': strike, 'expiration': expiration,
+            'call_action_type': call_action_type, 'put_action_type': put_action_type,
+            'num_call_contracts': num_call_contracts, 'num_put_contracts': num_put_contracts,
+            'stock_trade_price': trade_price, 'effective_delta': effective_delta,
+        })
+        if not self.trades.dates(key, start_date=input_date):
+            # Nothing stored yet (e.g. the first draw at startup): no need to load pandas for it
+            print("No data to display for selected filters.")
+            return
+        filtered_data = self.trades.series(key, start_date=input_date)
         
         if not filtered_data.empty:
             filtered_data = filtered_data.sort_values(by='trade_date')
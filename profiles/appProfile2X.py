@@ -10,21 +10,27 @@ from PyQt5.QtCore import (Qt, QThread, pyqtSignal)
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
 import numpy as np
 
 from tools.stylesheet import stylesheet
-from tools.AP2Fetch import FetchStockThread, FetchOptionThread
+from tools.tracing import traced
+from tools.diagnostics import install_diagnostics
+from tools.payoffCanvas import PayoffPlot
+from tools.horizonView import HorizonControls
+from tools.recompute import RecomputeScheduler
+from tools.payoff import straddle_legs, evaluate_legs, payoff_grid, region_text
+from tools.AP2Fetch import FetchStockThread, FetchStrikeQuotesThread
 from tools.profile_creations import create_input_field, create_slider
 
 
 class OptionStrategyVisualizer(QMainWindow):
     def __init__(self):
         super().__init__()
+        self.recompute = RecomputeScheduler(self.update_plot, self)
         self.initUI()
+        install_diagnostics(self)
         self.setStyleSheet(stylesheet)
-        self.option_fetch_threads = []  
-        plt.style.use('ggplot')
+        self.option_fetch_threads = set()
 
     def initUI(self):
         self.setWindowTitle("Option Strategy Visualizer")
@@ -187,7 +193,6 @@ class OptionStrategyVisualizer(QMainWindow):
         fetch_layout.addWidget(self.date_input)
         self.fetch_data_button = QPushButton('Fetch Data / Refresh', control_panel)
         self.fetch_data_button.clicked.connect(self.fetch_data)
-        self.fetch_data_button.clicked.connect(self.update_plot)
         fetch_layout.addWidget(self.fetch_data_button)
         grid_layout.addLayout(fetch_layout, 1, 0, 1, 2)  # Spans two columns
 
@@ -209,6 +214,11 @@ class OptionStrategyVisualizer(QMainWindow):
         plot_size_layout.addWidget(self.y_max_input)
         plot_size_layout.addWidget(self.stock_range_input)
         grid_layout.addLayout(plot_size_layout, 3, 0, 1, 2)  # Spans two columns
+
+        # Pre-expiry curves and heatmap
+        self.horizon_controls = HorizonControls("Option Strategy Visualizer")
+        self.horizon_controls.connect(self.recompute.request)
+        grid_layout.addWidget(self.horizon_controls, 4, 0, 1, 2)
         
         # Adjust column stretch factors
         grid_layout.setColumnStretch(0, 20)
@@ -218,54 +228,54 @@ class OptionStrategyVisualizer(QMainWindow):
         # Plotting area
         self.figure = Figure()
         self.canvas = FigureCanvas(self.figure)
+        self.payoff_plot = PayoffPlot(self.figure, self.canvas,
+                                      lines=(('r-', 2, 'Strategy 1 Outcome'), ('m-', 2, 'Strategy 2 Outcome'),
+                                             ('b-', 2, 'Combined Strategy Outcome')), fill=False)
         self.canvas.setMinimumWidth(800)
         grid_layout.addWidget(self.canvas, 0, 2, 4, 1)  
         self.toolbar = NavigationToolbar(self.canvas, self)
         grid_layout.addWidget(self.toolbar, 4, 2)
 
         # connect signals to update method
-        self.x_input.input_field.returnPressed.connect(self.update_plot)
-        self.x2_input.input_field.returnPressed.connect(self.update_plot)
-        self.symbol_input.input_field.returnPressed.connect(self.update_plot)
-        self.date_input.input_field.returnPressed.connect(self.update_plot)
+        self.x_input.input_field.returnPressed.connect(self.recompute.request)
+        self.x2_input.input_field.returnPressed.connect(self.recompute.request)
+        self.symbol_input.input_field.returnPressed.connect(self.recompute.request)
+        self.date_input.input_field.returnPressed.connect(self.recompute.request)
         
-        self.nCall_slider.slider.valueChanged.connect(self.update_plot)
-        self.nPut_slider.slider.valueChanged.connect(self.update_plot)
-        self.deltaCall.input_field.returnPressed.connect(self.update_plot)
-        self.deltaPut.input_field.returnPressed.connect(self.update_plot)
+        self.nCall_slider.slider.valueChanged.connect(self.recompute.request)
+        self.nPut_slider.slider.valueChanged.connect(self.recompute.request)
+        self.deltaCall.input_field.returnPressed.connect(self.recompute.request)
+        self.deltaPut.input_field.returnPressed.connect(self.recompute.request)
         
         
-        self.call_premium_input.input_field.textChanged.connect(self.update_plot)
-        self.put_premium_input.input_field.textChanged.connect(self.update_plot)
-        self.stock_price_input.input_field.textChanged.connect(self.update_plot)
+        self.call_premium_input.input_field.textChanged.connect(self.recompute.request)
+        self.put_premium_input.input_field.textChanged.connect(self.recompute.request)
+        self.stock_price_input.input_field.textChanged.connect(self.recompute.request)
         
-        self.y_min_input.input_field.returnPressed.connect(self.update_plot)
-        self.y_max_input.input_field.returnPressed.connect(self.update_plot)
-        self.stock_range_input.input_field.returnPressed.connect(self.update_plot)
+        self.y_min_input.input_field.returnPressed.connect(self.recompute.request)
+        self.y_max_input.input_field.returnPressed.connect(self.recompute.request)
+        self.stock_range_input.input_field.returnPressed.connect(self.recompute.request)
         
         
-        self.call_premium2_input.input_field.textChanged.connect(self.update_plot)
-        self.put_premium2_input.input_field.textChanged.connect(self.update_plot)
+        self.call_premium2_input.input_field.textChanged.connect(self.recompute.request)
+        self.put_premium2_input.input_field.textChanged.connect(self.recompute.request)
         
-        self.n2Call_slider.slider.valueChanged.connect(self.update_plot)
-        self.n2Put_slider.slider.valueChanged.connect(self.update_plot)
-        self.delta2Call.input_field.returnPressed.connect(self.update_plot)
-        self.delta2Put.input_field.returnPressed.connect(self.update_plot)
+        self.n2Call_slider.slider.valueChanged.connect(self.recompute.request)
+        self.n2Put_slider.slider.valueChanged.connect(self.recompute.request)
+        self.delta2Call.input_field.returnPressed.connect(self.recompute.request)
+        self.delta2Put.input_field.returnPressed.connect(self.recompute.request)
         
-        self.fetch_data_button.clicked.connect(self.update_plot)
-        self.trade_type_combo.currentIndexChanged.connect(self.update_plot)
-        self.right_trade_type_combo.currentIndexChanged.connect(self.update_plot)
+        self.trade_type_combo.currentIndexChanged.connect(self.recompute.request)
+        self.right_trade_type_combo.currentIndexChanged.connect(self.recompute.request)
         
         self.show()
 
 
+    @traced('appProfile2X.update_plot')
     def update_plot(self):
         
         if 'NA'in [self.stock_price_input.input_field.text(), self.call_premium_input.input_field.text(), self.put_premium_input.input_field.text(), self.call_premium2_input.input_field.text(), self.put_premium2_input.input_field.text()]:
-            self.figure.clear()
-            ax = self.figure.add_subplot(111)
-            ax.text(0.5, 0.5, 'Options does not exist. Please input valid parameters', fontsize=16, fontweight='bold', ha='center', va='center')
-            self.canvas.draw()
+            self.payoff_plot.message('Options does not exist. Please input valid parameters')
             return
         
         try:
@@ -291,101 +301,34 @@ class OptionStrategyVisualizer(QMainWindow):
             Y_min = float(self.y_min_input.input_field.text())
             Y_max = float(self.y_max_input.input_field.text())
         except ValueError:
-            self.figure.clear()
-            ax = self.figure.add_subplot(111)
-            ax.text(0.5, 0.5, 'Value Error. Please input valid parameters', fontsize=16, fontweight='bold', ha='center', va='center')
-            self.canvas.draw()
+            self.payoff_plot.message('Value Error. Please input valid parameters')
             return
 
         # Calculate values
         S_min = np.floor(stock_price * (1 - stock_range))
         S_max = np.ceil(stock_price * (1 + stock_range))
-        S_grid = np.arange(S_min, S_max + 1, 1)
-        call1_at_maturity = np.maximum(S_grid - X1, 0)
-        put1_at_maturity = np.maximum(X1 - S_grid, 0)
-        call2_at_maturity = np.maximum(S_grid - X2, 0)
-        put2_at_maturity = np.maximum(X2 - S_grid, 0)
-
-        # Logic for plotting based on trade type
-        trade1_type = self.trade_type_combo.currentText()
-        if trade1_type == 'Buy Call-Buy Put':
-                    y1_option = n1_call*(call1_at_maturity - call1_premium) + n1_put*(put1_at_maturity - put1_premium);
-                    y1_stock  = n1_call*Delta1_call*(stock_price - S_grid) + n1_put*Delta1_put*(stock_price - S_grid);
-                    Effective_Delta1 = -n1_call*Delta1_call - n1_put*Delta1_put; 
-        elif trade1_type =='Buy Call-Sell Put':
-                    y1_option = n1_call*(call1_at_maturity - call1_premium) + n1_put*(put1_premium - put1_at_maturity);
-                    y1_stock  = n1_call*Delta1_call*(stock_price - S_grid) + n1_put*Delta1_put*(S_grid - stock_price);
-                    Effective_Delta1 = -n1_call*Delta1_call + n1_put*Delta1_put; 
-        elif trade1_type == 'Sell Call-Buy Put':
-                    y1_option = n1_call*(call1_premium - call1_at_maturity) + n1_put*(put1_at_maturity - put1_premium);
-                    y1_stock  = n1_call*Delta1_call*(S_grid - stock_price) + n1_put*Delta1_put*(stock_price - S_grid);
-                    Effective_Delta1 = n1_call*Delta1_call - n1_put*Delta1_put;
-        elif trade1_type == 'Sell Call-Sell Put':
-                    y1_option = n1_call*(call1_premium - call1_at_maturity) + n1_put*(put1_premium - put1_at_maturity);
-                    y1_stock  = n1_call*Delta1_call*(S_grid - stock_price) + n1_put*Delta1_put*(S_grid - stock_price);
-                    Effective_Delta1 = n1_call*Delta1_call + n1_put*Delta1_put;
-        
-        trade2_type = self.right_trade_type_combo.currentText()
-        if trade2_type == 'Buy Call-Buy Put':
-                    y2_option = n2_call*(call2_at_maturity - call2_premium) + n2_put*(put2_at_maturity - put2_premium);
-                    y2_stock  = n2_call*Delta2_call*(stock_price - S_grid) + n2_put*Delta2_put*(stock_price - S_grid);
-                    Effective_Delta2 = -n2_call*Delta2_call - n2_put*Delta2_put;
-        elif trade2_type== 'Buy Call-Sell Put':
-                    y2_option = n2_call*(call2_at_maturity - call2_premium) + n2_put*(put2_premium - put2_at_maturity);
-                    y2_stock  = n2_call*Delta2_call*(stock_price - S_grid) + n2_put*Delta2_put*(S_grid - stock_price);
-                    Effective_Delta2 = -n2_call*Delta2_call + n2_put*Delta2_put;
-        elif trade2_type == 'Sell Call-Buy Put':
-                    y2_option = n2_call*(call2_premium - call2_at_maturity) + n2_put*(put2_at_maturity - put2_premium);
-                    y2_stock  = n2_call*Delta2_call*(S_grid - stock_price) + n2_put*Delta2_put*(stock_price - S_grid);
-                    Effective_Delta2 = n2_call*Delta2_call - n2_put*Delta2_put;
-        elif trade2_type == 'Sell Call-Sell Put':
-                    y2_option = n2_call*(call2_premium - call2_at_maturity) + n2_put*(put2_premium - put2_at_maturity);
-                    y2_stock  = n2_call*Delta2_call*(S_grid - stock_price) + n2_put*Delta2_put*(S_grid - stock_price);
-                    Effective_Delta2 = n2_call*Delta2_call + n2_put*Delta2_put;
-        
-        y2 = 100*(y2_option + y2_stock);y1 = 100*(y1_option + y1_stock);
+        legs1 = straddle_legs(self.trade_type_combo.currentText(), X1, n1_call, n1_put,
+                              call1_premium, put1_premium, Delta1_call, Delta1_put)
+        legs2 = straddle_legs(self.right_trade_type_combo.currentText(), X2, n2_call, n2_put,
+                              call2_premium, put2_premium, Delta2_call, Delta2_put)
+        S_grid, profile = payoff_grid(np.vstack([legs1, legs2]), S_min, S_max, stock_price, self.payoff_plot.pixel_width())
+        y1, Effective_Delta1 = evaluate_legs(legs1, S_grid, stock_price)
+        y2, Effective_Delta2 = evaluate_legs(legs2, S_grid, stock_price)
 
         # Plotting logic
         y = y1 + y2
         Effective_Delta = Effective_Delta1 + Effective_Delta2
-        yp = np.maximum(y, 0)
-        y_neg = np.where(yp == 0)[0]
-        y_pos = np.where(yp > 0)[0]
-        if len(y_neg) != 0 and len(y_pos) != 0:
-            if y_neg[0] > 0 and y_neg[-1] < len(S_grid) - 1:
-                pos_str = f'(0, {np.ceil(S_grid[y_neg[0] - 1])}) and ({np.floor(S_grid[y_neg[-1] + 1])}, ∞)'
-            else:
-                pos_range = S_grid[y_pos]
-                if y_pos[0] == 0:
-                    pos_str = f'(0, {np.ceil(pos_range[-1])})'
-                else:
-                    pos_str = f'({np.floor(pos_range[0])}, {np.ceil(pos_range[-1])})'
-        elif len(y_neg) == 0:
-            pos_str = '(0, ∞)'
-        else:
-            pos_str = '∞'
+        pos_str = region_text(profile.regions)
 
         title_str = [f'100Δ_effective = {round(100 * Effective_Delta)}. Make money if S ∈ {pos_str}',
                      f'n1_call = {n1_call}, n1_put = {n1_put}, n2_call = {n2_call}, n2_put = {n2_put}',
                      f'Δ1_call = {Delta1_call:.2f}, Δ1_put = {Delta1_put:.2f}, Δ2_call = {Delta2_call:.2f}, Δ2_put = {Delta2_put:.2f}']
 
-        self.figure.clear()
-        ax = self.figure.add_subplot(111)
-        ax.plot(S_grid, y1, 'r-', label='Strategy 1 Outcome', linewidth=2)
-        ax.plot(S_grid, y2, 'm-', label='Strategy 2 Outcome', linewidth=2)
-        ax.plot(S_grid, y, 'b-', label='Combined Strategy Outcome', linewidth=2)
-
-        ax.set_title("\n".join(title_str), fontsize=16, fontweight='bold')
-        ax.set_xlabel('Stock Price', fontsize=14)
-        ax.set_ylabel('Pay-off at Maturity', fontsize=14)
-        ax.grid(True, which='major', linestyle='--', linewidth='0.5', color='black')
-        ax.legend()
-        ax.axhline(0, color='k', linewidth=1.5)
-        ax.set_ylim([Y_min, Y_max])
-        ax.set_xlim([S_min, S_max])
-        self.canvas.draw()
+        horizons = self.horizon_controls.evaluate(np.vstack([legs1, legs2]), S_grid, stock_price, self.date_input.input_field.text())
+        self.payoff_plot.update(S_grid, [y1, y2, y], "\n".join(title_str), [S_min, S_max], [Y_min, Y_max], horizons)
     
  
+    @traced('appProfile2X.fetch_data')
     def fetch_data(self):
         # Check if symbol, strike_price, and maturity_date fields are filled
         if self.symbol_input.input_field.text() and self.x_input.input_field.text() and self.date_input.input_field.text():
@@ -443,51 +386,33 @@ class OptionStrategyVisualizer(QMainWindow):
         self.price_change_input.input_field.setStyleSheet(f"color: {color};")
         self.percent_change_input.input_field.setStyleSheet(f"color: {color};")
 
-    def start_option_fetch_thread(self, company, date, strike, index):
-        thread = FetchOptionThread(company, date, strike)
-        thread.data_fetched.connect(lambda prices, open_interests, volumes: self.fill_premium_inputs(prices, open_interests, volumes, index))
-        thread.finished.connect(lambda: self.option_fetch_threads.remove(thread))  # Ensure the thread is removed from the list once finished
+    def start_option_fetch_thread(self, company, date, strikes):
+        # One chain download covers both positions' strikes
+        thread = FetchStrikeQuotesThread(company, date, strikes)
+        thread.data_fetched.connect(self.fill_premium_inputs)
+        # Queued, so the slot runs on the GUI thread that owns option_fetch_threads
+        thread.finished.connect(self._fetch_finished, Qt.QueuedConnection)
+        self.option_fetch_threads.add(thread)
         thread.start()
-        self.option_fetch_threads.append(thread) 
+
+    def _fetch_finished(self):
+        self.option_fetch_threads.discard(self.sender())
                 
     def update_option_premiums(self):
         company = self.symbol_input.input_field.text()
         date = self.date_input.input_field.text()
         
-        for i, x_input in enumerate(self.x_inputs):
-            strike = float(x_input.input_field.text())
-            self.start_option_fetch_thread(company, date, strike, i)
-
-    def fill_premium_inputs(self, prices, open_interests, volumes, index):
-        if len(prices) > 0:
-            self.call_premium_inputs[index].input_field.setText(prices[0] if prices[0] is not None else 'NA')
-        else:
-            self.call_premium_inputs[index].input_field.setText('NA')
+        strikes = [float(x_input.input_field.text()) for x_input in self.x_inputs]
+        self.start_option_fetch_thread(company, date, strikes)
 
-        if len(prices) > 1:
-            self.put_premium_inputs[index].input_field.setText(prices[1] if prices[1] is not None else 'NA')
-        else:
-            self.put_premium_inputs[index].input_field.setText('NA')
-
-        if len(open_interests) > 0:
-            self.call_open_interest_inputs[index].input_field.setText(open_interests[0] if open_interests[0] is not None else 'NA')
-        else:
-            self.call_open_interest_inputs[index].input_field.setText('NA')
-
-        if len(open_interests) > 1:
-            self.put_open_interest_inputs[index].input_field.setText(open_interests[1] if open_interests[1] is not None else 'NA')
-        else:
-            self.put_open_interest_inputs[index].input_field.setText('NA')
-
-        if len(volumes) > 0:
-            self.call_volume_inputs[index].input_field.setText(volumes[0] if volumes[0] is not None else 'NA')
-        else:
-            self.call_volume_inputs[index].input_field.setText('NA')
-
-        if len(volumes) > 1:
-            self.put_volume_inputs[index].input_field.setText(volumes[1] if volumes[1] is not None else 'NA')
-        else:
-            self.put_volume_inputs[index].input_field.setText('NA')
+    def fill_premium_inputs(self, quotes):
+        for index in range(len(self.x_inputs)):
+            self.call_premium_inputs[index].input_field.setText(quotes['call']['last'][index])
+            self.put_premium_inputs[index].input_field.setText(quotes['put']['last'][index])
+            self.call_open_interest_inputs[index].input_field.setText(quotes['call']['open_interest'][index])
+            self.put_open_interest_inputs[index].input_field.setText(quotes['put']['open_interest'][index])
+            self.call_volume_inputs[index].input_field.setText(quotes['call']['volume'][index])
+            self.put_volume_inputs[index].input_field.setText(quotes['put']['volume'][index])
 
 
     
@@ -497,7 +422,7 @@ class OptionStrategyVisualizer(QMainWindow):
             self.stock_fetch_thread.wait()
             
         if hasattr(self, 'option_fetch_threads'):
-            for thread in self.option_fetch_threads:
+            for thread in list(self.option_fetch_threads):
                 if thread.isRunning():
                     thread.quit()
                     thread.wait()   
@@ -10,15 +10,22 @@ from PyQt5.QtCore import (Qt, QThread, pyqtSignal)
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
 import numpy as np
 from tools.stylesheet import stylesheet
+from tools.tracing import traced
+from tools.diagnostics import install_diagnostics
+from tools.payoffCanvas import PayoffPlot
+from tools.horizonView import HorizonControls
+from tools.recompute import RecomputeScheduler
+from tools.payoff import straddle_legs, evaluate_payoff
 from tools.APP_creations import create_slider, create_input_field
 
 class OptionStrategyVisualizer(QMainWindow):
     def __init__(self):
         super().__init__()
+        self.recompute = RecomputeScheduler(self.update_plot, self)
         self.initUI()
+        install_diagnostics(self)
         self.setStyleSheet(stylesheet)
         self.update_plot() 
 
@@ -78,10 +85,15 @@ class OptionStrategyVisualizer(QMainWindow):
         control_layout.addLayout(input_layout_4)
         control_layout.addLayout(input_layout_5)
         control_layout.addLayout(input_layout_6)
+
+        self.horizon_controls = HorizonControls("Option Strategy Visualizer(Past)")
+        self.horizon_controls.connect(self.recompute.request)
+        control_layout.addWidget(self.horizon_controls)
         grid_layout.addWidget(control_panel, 0, 0)
 
         self.figure = Figure()
         self.canvas = FigureCanvas(self.figure)
+        self.payoff_plot = PayoffPlot(self.figure, self.canvas, profit_color='#bd1414', loss_color='#007560')
         
         self.canvas.setMinimumWidth(950)  # Make plot area adequately wide
         grid_layout.addWidget(self.canvas, 0, 1)
@@ -93,22 +105,23 @@ class OptionStrategyVisualizer(QMainWindow):
         grid_layout.setColumnStretch(1, 65)  # More stretch for the plot column
 
         # Connect changes in UI to update the plot
-        self.trade_type_combo.currentIndexChanged.connect(self.update_plot)
-        self.nCall_slider.slider.valueChanged.connect(self.update_plot)
-        self.nPut_slider.slider.valueChanged.connect(self.update_plot)
-        self.deltaCall.input_field.returnPressed.connect(self.update_plot)
-        self.deltaPut.input_field.returnPressed.connect(self.update_plot)
-        self.x_input.input_field.returnPressed.connect(self.update_plot)
-        self.call_premium_input.input_field.returnPressed.connect(self.update_plot)
-        self.put_premium_input.input_field.returnPressed.connect(self.update_plot)
-        self.stock_price_input.input_field.returnPressed.connect(self.update_plot)
-        self.stock_range_input.input_field.returnPressed.connect(self.update_plot)
-        self.y_min_input.input_field.returnPressed.connect(self.update_plot)
-        self.y_max_input.input_field.returnPressed.connect(self.update_plot)
+        self.trade_type_combo.currentIndexChanged.connect(self.recompute.request)
+        self.nCall_slider.slider.valueChanged.connect(self.recompute.request)
+        self.nPut_slider.slider.valueChanged.connect(self.recompute.request)
+        self.deltaCall.input_field.returnPressed.connect(self.recompute.request)
+        self.deltaPut.input_field.returnPressed.connect(self.recompute.request)
+        self.x_input.input_field.returnPressed.connect(self.recompute.request)
+        self.call_premium_input.input_field.returnPressed.connect(self.recompute.request)
+        self.put_premium_input.input_field.returnPressed.connect(self.recompute.request)
+        self.stock_price_input.input_field.returnPressed.connect(self.recompute.request)
+        self.stock_range_input.input_field.returnPressed.connect(self.recompute.request)
+        self.y_min_input.input_field.returnPressed.connect(self.recompute.request)
+        self.y_max_input.input_field.returnPressed.connect(self.recompute.request)
 
         self.show()
         
 
+    @traced('appProfilePast.update_plot')
     def update_plot(self):
         # Retrieve values from UI components
         n_call = self.nCall_slider.slider.value()
@@ -126,83 +139,16 @@ class OptionStrategyVisualizer(QMainWindow):
         # Calculate values
         S_min = np.floor(stock_price * (1 - stock_range))
         S_max = np.ceil(stock_price * (1 + stock_range))
-        S_grid = np.arange(S_min, S_max + 1, 0.1)
-        call_at_maturity = np.maximum(S_grid - X, 0)
-        put_at_maturity = np.maximum(X - S_grid, 0)
-
-        # Logic for plotting based on trade type
         trade_type = self.trade_type_combo.currentText()
-        if trade_type == 'Buy Call-Buy Put':
-            y_option = n_call * (call_at_maturity - call_premium) + n_put * (put_at_maturity - put_premium)
-            y_stock  = n_call * delta_call * (stock_price - S_grid) + n_put * delta_put * (stock_price - S_grid)
-            effective_delta = -n_call * delta_call - n_put * delta_put
-        if trade_type == 'Buy Call-Sell Put':
-            y_option = n_call * (call_at_maturity - call_premium) + n_put * (put_premium - put_at_maturity)
-            effective_delta = -n_call * delta_call + n_put * delta_put
-        if trade_type == 'Sell Call-Buy Put':
-            y_option = n_call * (call_premium - call_at_maturity) + n_put * (put_at_maturity - put_premium)
-            y_stock  = n_call * delta_call * (S_grid - stock_price) + n_put * delta_put * (stock_price - S_grid)
-            effective_delta = n_call * delta_call - n_put * delta_put
-        if trade_type == 'Sell Call-Sell Put': 
-            y_option = n_call * (call_premium - call_at_maturity) + n_put * (put_premium - put_at_maturity)
-            y_stock  = n_call * delta_call * (S_grid - stock_price) + n_put * delta_put * (S_grid - stock_price)
-            effective_delta = n_call * delta_call + n_put * delta_put
-
-        # Plotting logic
-        y = 100 * (y_option + y_stock)
-        yp = np.maximum(y, 0)
-        y_neg = np.where(yp == 0)[0]
-        y_pos = np.where(yp > 0)[0]
-
-        if y_neg.size != 0 and y_pos.size != 0:
-            if y_neg[0] > 0 and y_neg[-1] < len(S_grid) - 1:
-                pos_str = f'(0, {np.ceil(S_grid[y_neg[0] - 1])}) and ({np.floor(S_grid[y_neg[-1] + 1])}, ∞)'
-            else:
-                pos_range = S_grid[y_pos]
-                if y_pos[0] == 0:
-                    pos_str = f'(0, {np.ceil(pos_range[-1])})'
-                else:
-                    pos_str = f'({np.floor(pos_range[0])}, {np.ceil(pos_range[-1])})'
-        elif y_neg.size == 0:
-            pos_str = '(0, ∞)'
-        else:
-            pos_str = '∞'
+        legs = straddle_legs(trade_type, X, n_call, n_put, call_premium, put_premium, delta_call, delta_put)
+        S_grid, y, effective_delta, pos_str = evaluate_payoff(legs, S_min, S_max, stock_price, self.payoff_plot.pixel_width())
 
         title_str = [f'100Δ_effective = {round(100 * effective_delta)}. Make money if S ∈ {pos_str}',
                      f'n_call = {n_call}, n_put = {n_put}, Δ_call = {delta_call:.2f}, Δ_put = {delta_put:.2f}']
 
         
-        # Inside your update_plot method, before plotting:
-        with plt.style.context('ggplot'):
-            self.figure.clear()
-            ax = self.figure.add_subplot(111)
-
-            # Plot with a thicker line and use a different color for visibility
-            ax.plot(S_grid, y, 'blue', linewidth=1.5, label='Strategy Profit/Loss')
-
-            # Add a fill between
-            ax.fill_between(S_grid, y, where=(y > 0), color='#bd1414', alpha=0.8, label='Profit')
-            ax.fill_between(S_grid, y, where=(y <= 0), color='#007560', alpha=0.8, label='Loss')
-
-            # Improve title and label aesthetics
-            ax.set_title("\n".join(title_str), fontsize=16, fontweight='bold')
-            ax.set_xlabel('Stock Price', fontsize=14)
-            ax.set_ylabel('Pay-off at Maturity', fontsize=14)
-
-            # Add gridlines
-            ax.grid(True, which='major', linestyle='--', linewidth='0.5', color='black')
-
-            # Add legend
-            ax.legend()
-
-            ax.axhline(0, color='k', linewidth=1.5)
-            ax.set_ylim([Y_min, Y_max])
-            ax.set_xlim([S_min, S_max])
-
-            # Change the transparency of the fill_between
-            ax.collections[0].set_alpha(0.8)
-
-            self.canvas.draw()
+        horizons = self.horizon_controls.evaluate(legs, S_grid, stock_price, self.date_input.input_field.text())
+        self.payoff_plot.update(S_grid, y, "\n".join(title_str), [S_min, S_max], [Y_min, Y_max], horizons)
     
 
 if __name__ == '__main__':
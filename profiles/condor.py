@@ -10,19 +10,26 @@ from PyQt5.QtCore import (Qt, QThread, pyqtSignal)
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
 import numpy as np
 from tools.stylesheet import stylesheet
+from tools.tracing import traced
+from tools.diagnostics import install_diagnostics
+from tools.payoffCanvas import PayoffPlot
+from tools.horizonView import HorizonControls
+from tools.recompute import RecomputeScheduler
+from tools.payoff import condor_legs, evaluate_payoff
 from tools.profile_creations import create_input_field
-from tools.CondorFetch import FetchStockThread, FetchOptionThread
+from tools.CondorFetch import FetchStockThread, FetchStrikeQuotesThread
 
 
 class OptionStrategyVisualizer(QMainWindow):
     def __init__(self):
         super().__init__()
+        self.recompute = RecomputeScheduler(self.update_plot, self)
         self.initUI()
+        install_diagnostics(self)
         self.setStyleSheet(stylesheet)
-        self.option_fetch_threads = []
+        self.option_fetch_threads = set()
 
 
     def initUI(self):
@@ -96,7 +103,6 @@ class OptionStrategyVisualizer(QMainWindow):
        
         self.fetch_data_button = QPushButton('Fetch Data / Refresh', control_panel)
         self.fetch_data_button.clicked.connect(self.fetch_data)  # Connect button click to the fetch_data method
-        self.fetch_data_button.clicked.connect(self.update_plot)
         control_layout.addWidget(self.fetch_data_button)
 
         input_layout_7 = QHBoxLayout()
@@ -117,12 +123,17 @@ class OptionStrategyVisualizer(QMainWindow):
         input_layout_8.addWidget(self.y_max_input)    
         control_layout.addLayout(input_layout_8)
 
+        self.horizon_controls = HorizonControls("Condor")
+        self.horizon_controls.connect(self.recompute.request)
+        control_layout.addWidget(self.horizon_controls)
+
         # Add control panel to grid
         grid_layout.addWidget(control_panel, 0, 0)
 
         # Right-side plot
         self.figure = Figure()
         self.canvas = FigureCanvas(self.figure)
+        self.payoff_plot = PayoffPlot(self.figure, self.canvas)
         self.canvas.setMinimumWidth(800)  # Increase this value to make the plot area wider
         grid_layout.addWidget(self.canvas, 0, 1)
         
@@ -134,29 +145,29 @@ class OptionStrategyVisualizer(QMainWindow):
         grid_layout.setColumnStretch(1, 65)  # More stretch for plot column
 
         # Connect signals to update method
-        self.delta1.input_field.returnPressed.connect(self.update_plot)
-        self.delta2.input_field.returnPressed.connect(self.update_plot)
-        self.delta3.input_field.returnPressed.connect(self.update_plot)
-        self.delta4.input_field.returnPressed.connect(self.update_plot)
+        self.delta1.input_field.returnPressed.connect(self.recompute.request)
+        self.delta2.input_field.returnPressed.connect(self.recompute.request)
+        self.delta3.input_field.returnPressed.connect(self.recompute.request)
+        self.delta4.input_field.returnPressed.connect(self.recompute.request)
         
         # Connecting signals for x_inputs
         for x_input in self.x_inputs:
-            x_input.input_field.returnPressed.connect(self.update_plot)
+            x_input.input_field.returnPressed.connect(self.recompute.request)
 
         # Connecting signals for call_premium_inputs
         for call_input in self.call_premium_inputs:
-            call_input.input_field.textChanged.connect(self.update_plot)
+            call_input.input_field.textChanged.connect(self.recompute.request)
 
         # Connecting signals for put_premium_inputs
         for put_input in self.put_premium_inputs:
-            put_input.input_field.textChanged.connect(self.update_plot)
+            put_input.input_field.textChanged.connect(self.recompute.request)
 
         
-        self.stock_price_input.input_field.textChanged.connect(self.update_plot)
-        self.stock_range_input.input_field.returnPressed.connect(self.update_plot)
-        self.y_min_input.input_field.returnPressed.connect(self.update_plot)
-        self.y_max_input.input_field.returnPressed.connect(self.update_plot)
-        self.condor_type_combo.currentIndexChanged.connect(self.update_plot)
+        self.stock_price_input.input_field.textChanged.connect(self.recompute.request)
+        self.stock_range_input.input_field.returnPressed.connect(self.recompute.request)
+        self.y_min_input.input_field.returnPressed.connect(self.recompute.request)
+        self.y_max_input.input_field.returnPressed.connect(self.recompute.request)
+        self.condor_type_combo.currentIndexChanged.connect(self.recompute.request)
         
         self.date_input.input_field.returnPressed.connect(self.fetch_data)
         self.symbol_input.input_field.returnPressed.connect(self.fetch_data)
@@ -175,7 +186,7 @@ class OptionStrategyVisualizer(QMainWindow):
         # Set default value, adjusted by precision
         slider.setValue(int(default_val / precision))
         slider.valueChanged.connect(lambda value: lbl.setText(f'{label}: {value * precision}'))
-        slider.valueChanged.connect(self.update_plot)  # Connect the slider to the update_plot method
+        slider.valueChanged.connect(self.recompute.request)  # Slider moves go through the recompute scheduler
         layout.addWidget(lbl)
         layout.addWidget(slider)
         container.setLayout(layout)
@@ -197,7 +208,7 @@ class OptionStrategyVisualizer(QMainWindow):
         input_field.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)  # Ensure input field can expand
         input_field.setReadOnly(not editable)
         
-        input_field.returnPressed.connect(self.update_plot)
+        input_field.returnPressed.connect(self.recompute.request)
         
         layout.addWidget(lbl)
         layout.addWidget(input_field)
@@ -205,15 +216,13 @@ class OptionStrategyVisualizer(QMainWindow):
         container.input_field = input_field
         return container
 
+    @traced('condor.update_plot')
     def update_plot(self):
         if 'NA' in [self.stock_price_input.input_field.text(), self.call_premium_inputs[0].input_field.text(), self.put_premium_inputs[0].input_field.text()
                     , self.call_premium_inputs[1].input_field.text(), self.put_premium_inputs[1].input_field.text()
                     , self.call_premium_inputs[2].input_field.text(), self.put_premium_inputs[2].input_field.text()
                     , self.call_premium_inputs[3].input_field.text(), self.put_premium_inputs[3].input_field.text()]:
-            self.figure.clear()
-            ax = self.figure.add_subplot(111)
-            ax.text(0.5, 0.5, 'Options does not exist. Please input valid parameters', fontsize=16, fontweight='bold', ha='center', va='center')
-            self.canvas.draw()
+            self.payoff_plot.message('Options does not exist. Please input valid parameters')
             return
         
         try:
@@ -227,111 +236,24 @@ class OptionStrategyVisualizer(QMainWindow):
             
             S_min = np.floor(stock_price * (1 - stock_range))
             S_max = np.ceil(stock_price * (1 + stock_range))
-            S_grid = np.arange(S_min, S_max + 1, 0.1)
             Y_min = float(self.y_min_input.input_field.text())
             Y_max = float(self.y_max_input.input_field.text())
         except ValueError:
-            self.figure.clear()
-            ax = self.figure.add_subplot(111)
-            ax.text(0.5, 0.5, 'Options does not exist. Please input valid parameters', fontsize=16, fontweight='bold', ha='center', va='center')
-            self.canvas.draw()
+            self.payoff_plot.message('Options does not exist. Please input valid parameters')
             return
         
-        # Calculate at-maturity values for calls and puts
-        C_at_maturity = [np.maximum(S_grid - strike, 0) for strike in X]
-        P_at_maturity = [np.maximum(strike - S_grid, 0) for strike in X]
-
-        # Determine option strategy based on user input
-        condor_type = self.condor_type_combo.currentText()
-        if condor_type == 'Long Call':
-            y_option_1 = C_at_maturity[0] - C[0]
-            y_option_2 = C[1] - C_at_maturity[1]
-            y_option_3 = C[2] - C_at_maturity[2]
-            y_option_4 = C_at_maturity[3] - C[3]
-            Effective_Delta = (Delta[1] + Delta[2]) - (Delta[0] + Delta[3])
-        elif condor_type == 'Short Call':
-            y_option_1 = C[0] - C_at_maturity[0]
-            y_option_2 = C_at_maturity[1] - C[1]
-            y_option_3 = C_at_maturity[2] - C[2]
-            y_option_4 = C[3] - C_at_maturity[3]
-            Effective_Delta = (Delta[0] + Delta[3]) - (Delta[1] + Delta[2])
-        elif condor_type == 'Long Put':
-            y_option_1 = P_at_maturity[0] - P[0]
-            y_option_2 = P[1] - P_at_maturity[1]
-            y_option_3 = P[2] - P_at_maturity[2]
-            y_option_4 = P_at_maturity[3] - P[3]
-            Effective_Delta = -(Delta[0] + Delta[3]) + (Delta[1] + Delta[2])
-        elif condor_type == 'Short Put':
-            y_option_1 = P[0] - P_at_maturity[0]
-            y_option_2 = P_at_maturity[1] - P[1]
-            y_option_3 = P_at_maturity[2] - P[2]
-            y_option_4 = P[3] - P_at_maturity[3]
-            Effective_Delta = -(Delta[1] + Delta[2]) + (Delta[0] + Delta[3])
-        else:
-            # Handle unexpected cases
-            pass
-
-        y_stock = Effective_Delta * (S_grid - stock_price)
-        y = 100 * (y_option_1 + y_option_2 + y_option_3 + y_option_4 + y_stock)
-
-        yp = np.clip(y, 0, None)
-        y_neg = np.where(yp == 0)[0]  
-        y_pos = np.where(yp > 0)[0]   
-
-        if y_neg.size > 0 and y_pos.size > 0:
-            if S_grid[y_neg[0]] > S_min and S_grid[y_neg[-1]] < S_max:
-                pos_str = f'(0, {np.ceil(S_grid[y_neg[0] - 1])}) and ({np.floor(S_grid[y_neg[-1] + 1])}, ∞)'
-            else:
-                pos_range = S_grid[y_pos]
-                if y_pos[0] == 0:
-                    pos_str = f'(0, {np.ceil(pos_range[-1])})'
-                else:
-                    pos_str = f'({np.floor(pos_range[0])}, {np.ceil(pos_range[-1])})'
-        elif y_neg.size == 0:
-            pos_str = "(0,∞)"
-        else:
-            pos_str = "∞"
-
-        # Plot logic adapted from the MATLAB function plot_profile
-        with plt.style.context('ggplot'):
-            self.figure.clear()
-            ax = self.figure.add_subplot(111)
-
-            # Plotting the strategy's profit/loss line
-            ax.plot(S_grid, y, 'blue', linewidth=1.5, label='Strategy Profit/Loss')
-
-            # Adding fill between profit and loss
-            ax.fill_between(S_grid, y, where=(y > 0), color='#007560', alpha=0.8, label='Profit')
-            ax.fill_between(S_grid, y, where=(y <= 0), color='#bd1414', alpha=0.8, label='Loss')
-
-            # Enhancing title, labels, and gridlines for better readability
-            title_str = [
-                f"100Δ_effective = {round(100*Effective_Delta)}. Make money if S ∈ {pos_str}.\n" 
-                f"Δ1 = {Delta[0]:.2f}, Δ2 = {Delta[1]:.2f}, Δ3 = {Delta[2]:.2f}, Δ4 = {Delta[3]:.2f},\n"
-                f"Effective Δ = {Effective_Delta:.2f}"
-            ]
-            ax.set_title("\n".join(title_str), fontsize=16, fontweight='bold')
-            ax.set_xlabel('Stock Price', fontsize=14)
-            ax.set_ylabel('Pay-off at Maturity', fontsize=14)
-            ax.grid(True, which='major', linestyle='--', linewidth='0.5', color='black')
-
-            # Highlighting the zero line for reference
-            ax.axhline(0, color='k', linewidth=1.5)
-
-            # Setting the plot limits based on input
-            ax.set_ylim([Y_min, Y_max])
-            ax.set_xlim([S_min, S_max])
-
-            # Adjusting the transparency for the fill_between sections to enhance visual appeal
-            for collection in ax.collections:
-                collection.set_alpha(0.8)
-
-            # Adding a legend to help identify plot elements
-            ax.legend()
-
-            # Redrawing the canvas to reflect the updated plot
-            self.canvas.draw()
-
+        legs = condor_legs(self.condor_type_combo.currentText(), X, C, P, Delta)
+        S_grid, y, Effective_Delta, pos_str = evaluate_payoff(legs, S_min, S_max, stock_price, self.payoff_plot.pixel_width(), always="(0,∞)")
+
+        title_str = [
+            f"100Δ_effective = {round(100*Effective_Delta)}. Make money if S ∈ {pos_str}.\n" 
+            f"Δ1 = {Delta[0]:.2f}, Δ2 = {Delta[1]:.2f}, Δ3 = {Delta[2]:.2f}, Δ4 = {Delta[3]:.2f},\n"
+            f"Effective Δ = {Effective_Delta:.2f}"
+        ]
+        horizons = self.horizon_controls.evaluate(legs, S_grid, stock_price, self.date_input.input_field.text())
+        self.payoff_plot.update(S_grid, y, "\n".join(title_str), [S_min, S_max], [Y_min, Y_max], horizons)
+
+    @traced('condor.fetch_data')
     def fetch_data(self):
         # Check if the symbol and maturity date fields are filled
         if self.symbol_input.input_field.text() and self.date_input.input_field.text():
@@ -367,12 +289,17 @@ class OptionStrategyVisualizer(QMainWindow):
         self.stock_fetch_thread.data_fetched.connect(self.update_stock_price_input)
         self.stock_fetch_thread.start()
 
-    def start_option_fetch_thread(self, company, date, strike, index):
-        thread = FetchOptionThread(company, date, strike)
-        thread.data_fetched.connect(lambda prices: self.fill_premium_inputs(prices, index))
-        thread.finished.connect(lambda: self.option_fetch_threads.remove(thread))  # Ensure the thread is removed from the list once finished
+    def start_option_fetch_thread(self, company, date, strikes):
+        # One chain download covers every strike
+        thread = FetchStrikeQuotesThread(company, date, strikes)
+        thread.data_fetched.connect(self.fill_premium_inputs)
+        # Queued, so the slot runs on the GUI thread that owns option_fetch_threads
+        thread.finished.connect(self._fetch_finished, Qt.QueuedConnection)
+        self.option_fetch_threads.add(thread)
         thread.start()
-        self.option_fetch_threads.append(thread)  # Keep track of the thread
+
+    def _fetch_finished(self):
+        self.option_fetch_threads.discard(self.sender())
     
     def update_stock_price_input(self, price, price_change, percent_change):
         self.stock_price_input.input_field.setText(price)
@@ -400,20 +327,13 @@ class OptionStrategyVisualizer(QMainWindow):
     def update_option_premiums(self):
         company = self.symbol_input.input_field.text()
         date = self.date_input.input_field.text()
-        for i, x_input in enumerate(self.x_inputs):
-            strike = float(x_input.input_field.text())
-            self.start_option_fetch_thread(company, date, strike, i)
-
-    def fill_premium_inputs(self, prices, index):
-        if prices and len(prices) >= 2:
-            call_price = str(prices[0]) if prices[0] is not None else 'NA'
-            put_price = str(prices[1]) if prices[1] is not None else 'NA'
-        else:
-            call_price = 'NA'
-            put_price = 'NA'
+        strikes = [float(x_input.input_field.text()) for x_input in self.x_inputs]
+        self.start_option_fetch_thread(company, date, strikes)
 
-        self.call_premium_inputs[index].input_field.setText(call_price)
-        self.put_premium_inputs[index].input_field.setText(put_price)
+    def fill_premium_inputs(self, quotes):
+        for index, (call_price, put_price) in enumerate(zip(quotes['call']['last'], quotes['put']['last'])):
+            self.call_premium_inputs[index].input_field.setText(call_price)
+            self.put_premium_inputs[index].input_field.setText(put_price)
 
     def terminate_threads(self):
         if hasattr(self, 'stock_fetch_thread') and self.stock_fetch_thread.isRunning():
@@ -421,7 +341,7 @@ class OptionStrategyVisualizer(QMainWindow):
             self.stock_fetch_thread.wait()
             
         if hasattr(self, 'option_fetch_threads'):
-            for thread in self.option_fetch_threads:
+            for thread in list(self.option_fetch_threads):
                 if thread.isRunning():
                     thread.quit()
                     thread.wait()
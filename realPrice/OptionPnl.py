@@ -1,47 +1,30 @@
-import yfinance as yf
-import pandas as pd
 from datetime import datetime, timedelta
-import requests
-import time
 import numpy as np
-import holidays
 
 from realPrice.realStock import get_realtime_stock_price
+from tools.polygonStore import get_daily_bars
+from realPrice.chainCache import option_chain, expirations
+from realPrice.fetchPool import fetch_all
 from realPrice.realOption import main as get_realtime_option_price
+from realPrice.providers import get_provider
+from tools.tracing import note, traced
+from tools.tradingCalendar import trading_calendar
+from tools.lazy import lazy_import
+
+pd = lazy_import('pandas')
 
 def get_historical_data(ticker, start_date):
-    api_key = 'C6ig1sXku2yKl_XEIvSvc_OWCwB8ILLn'
-    base_url = 'https://api.polygon.io/v2/aggs/ticker/'
-    end_date = datetime.now()  
-
-    ticker = f'O:{ticker}'
-    if isinstance(start_date, datetime):
-        start_date = start_date.strftime('%Y-%m-%d')
-
-    url = f"{base_url}{ticker}/range/1/day/{start_date}/{end_date.strftime('%Y-%m-%d')}?apiKey={api_key}"
-
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        if 'results' in data:
-            df = pd.DataFrame(data['results'])
-            df['t'] = pd.to_datetime(df['t'], unit='ms')
-            df['date'] = df['t'].dt.date  
-            return df[['date', 'c']]
-        else:
-            print("No results found in the data.")
-            return pd.DataFrame()  
-    else:
-        print(f"Failed to retrieve data: {response.status_code}")
-        return None
+    df, error = get_daily_bars(ticker, start_date)
+    if error:
+        note(error, ticker=ticker)
+    return df
 
 def calls_or_puts(company, date, strike):
     options = [] 
-    ticker = yf.Ticker(company)
-    expiration_dates = ticker.options
+    expiration_dates = expirations(company)
 
     if date in expiration_dates:
-        opts = ticker.option_chain(date)
+        opts = option_chain(company, date)
         
         call_option = opts.calls[opts.calls['strike'] == strike]
         put_option = opts.puts[opts.puts['strike'] == strike]
@@ -63,9 +46,9 @@ def calls_or_puts(company, date, strike):
         print(f"No options available for {date}.")
     return options
 
+@traced('network.history')
 def get_stock_price(symbol, start_date, end_date):
-    stock = yf.Ticker(symbol)
-    hist = stock.history(start=start_date, end=end_date)
+    hist = get_provider().history(symbol, start=start_date, end=end_date)
     hist.reset_index(inplace=True)
     hist['date'] = hist['Date'].dt.date
     hist.rename(columns={'Close': 'stock_close_price'}, inplace=True)
@@ -73,89 +56,80 @@ def get_stock_price(symbol, start_date, end_date):
     return hist[['date', 'stock_close_price']]
 
 def initialize_df(trade_date):
-    df = pd.DataFrame(columns=['date', 'call_close_price', 'put_close_price', 'stock_close_price'])
-    
-    today = datetime.now().date()
-    df['date'] = pd.date_range(trade_date, today).strftime('%Y-%m-%d')
+    sessions = trading_calendar().sessions(trade_date, datetime.now().date())
+    return pd.DataFrame({
+        'date': pd.DatetimeIndex(sessions.astype('datetime64[ns]')),
+        'call_close_price': np.nan,
+        'put_close_price': np.nan,
+        'stock_close_price': np.nan,
+    })
+
+def build_history(call_data, put_data, stock_prices, trade_date, current_prices, how='outer'):
+    '''
+    Lines up the call/put daily closes ('c' columns from get_historical_data) with the
+    underlying's closes on every trading day since trade_date, appends today's
+    (call, put, stock) prices and forward-fills the gaps. The inputs are not modified,
+    so one download can be shared by several positions.
+    '''
+    call_data = call_data.rename(columns={'c': 'call_close_price'})
+    put_data = put_data.rename(columns={'c': 'put_close_price'})
+
+    # merge the dataframes keep all the data
+    df = pd.merge(call_data, put_data, on='date', how=how)
     df['date'] = pd.to_datetime(df['date'])
+    # sort data by date
+    df = df.sort_values(by='date')
 
-    df['call_close_price'] = np.nan
-    df['put_close_price'] = np.nan
-    df['stock_close_price'] = np.nan
+    today = datetime.now().date()-timedelta(days=1)
+    allday = pd.DatetimeIndex(trading_calendar().sessions(trade_date, today).astype('datetime64[ns]'))
 
- 
-    df = df[df['date'].dt.weekday < 5]
+    # add the sessions that have no bar for either leg
+    missing_dates = allday[~allday.isin(df['date'])]
+    missing_df = pd.DataFrame({'date': missing_dates, 'call_close_price': np.nan, 'put_close_price': np.nan})
+    df = pd.concat([df, missing_df], ignore_index=True)
+    df = df.sort_values(by='date')
 
-    us_holidays = holidays.US(years=[2024])
-    df = df[~df['date'].isin(us_holidays)]
-    
+    # Ensure 'date' column in stock_prices is datetime format
+    stock_prices = stock_prices.assign(date=pd.to_datetime(stock_prices['date']))
+
+    df = pd.merge(df, stock_prices, on='date', how='left')
+    df['date'] = df['date'].dt.date
+
+    # Add today's stock price, call price and put price
+    current_call_price, current_put_price, current_price = current_prices
+    df.loc[len(df)] = [datetime.now().date(), current_call_price, current_put_price, current_price]
+
+    # for nan values, fill them with the previous day's value
+    df = df.fillna(method='ffill')
     return df
 
 def main(company='ADBE', strike_date='2024-08-16', strike=470, trade_date='2024-06-12'):
     options = calls_or_puts(company, strike_date, strike)
     if options:
+        start_date = datetime.strptime(trade_date, '%Y-%m-%d')
+        end_date = datetime.now()
+
+        # Every request below is independent, so issue them together and join
+        tasks = {f'option_{i}': (get_historical_data, option, trade_date) for i, option in enumerate(options)}
+        tasks['stock'] = (get_stock_price, company, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+        tasks['spot'] = (get_realtime_stock_price, company)
+        tasks['quotes'] = (get_realtime_option_price, company, strike_date, strike)
+        results = fetch_all(tasks)
+
         data_frames = []
         for i, option in enumerate(options):
-            price_data = get_historical_data(option, trade_date)
+            price_data = results[f'option_{i}']
             if price_data is not None:
-                if i == 0:
-                    price_data.rename(columns={'c': 'call_close_price'}, inplace=True)
-                else:    
-                    price_data.rename(columns={'c': 'put_close_price'}, inplace=True)
                 data_frames.append(price_data)
             else:
                 print(f"Failed to retrieve data for option: {option}")
 
         if len(data_frames) == 2:
-            # merge the dataframes keep all the data
-            df = pd.merge(data_frames[0], data_frames[1], on='date', how='outer')
-            df['date'] = pd.to_datetime(df['date'])
-            # sort data by date
-            df = df.sort_values(by='date')
-       
-            today = datetime.now().date()-timedelta(days=1)
-            us_holidays = holidays.US(years=[2024])
-            allday = pd.date_range(trade_date, today).strftime('%Y-%m-%d')
-            allday = [day for day in allday if pd.to_datetime(day).weekday() < 5 and day not in us_holidays ]
-
-            # add dates that are not in the df but in the allday list
-            missing_dates = [day for day in allday if day not in df['date'].dt.strftime('%Y-%m-%d').values]
-            missing_df = pd.DataFrame(missing_dates, columns=['date'])
-            missing_df['date'] = pd.to_datetime(missing_df['date'])
-            missing_df['call_close_price'] = np.nan
-            missing_df['put_close_price'] = np.nan
-            df = pd.concat([df, missing_df], ignore_index=True)
-            df = df.sort_values(by='date')
-
-            # Get the stock price data
-            start_date = datetime.strptime(trade_date, '%Y-%m-%d')
-            end_date = datetime.now()
-            stock_prices = get_stock_price(company, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
-            
-            # Ensure 'date' column in stock_prices is datetime format
-            stock_prices['date'] = pd.to_datetime(stock_prices['date'])
-
-            df = pd.merge(df, stock_prices, on='date', how='left')
-            df['date'] = df['date'].dt.date
-            
-            # Get today's stock price, call price, and put price
-            current_price = get_realtime_stock_price(company)[0]
-            current_call_price = get_realtime_option_price(company, strike_date, strike)[0]
-            current_put_price = get_realtime_option_price(company, strike_date, strike)[1]
-            
-            # Add today's data to the DataFrame if it's not already present else replace it
-            df.loc[len(df)] = [datetime.now().date(), current_call_price, current_put_price, current_price]
-            
-            # for nan values, fill them with the previous day's value
-            df = df.fillna(method='ffill')
-            return df
+            current_prices = (results['quotes'][0], results['quotes'][1], results['spot'][0])
+            return build_history(data_frames[0], data_frames[1], results['stock'], trade_date, current_prices)
         else:
             print("Could not retrieve data for one or more options.")
             return None
     else:
         print("No options found.")
         return None
-
-
-
-
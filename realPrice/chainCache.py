@@ -0,0 +1,109 @@
+'''
+Process-wide snapshot cache for option chains, keyed by (symbol, expiry).
+Every realPrice fetcher reads chains through here so that one refresh costs one
+network round-trip per expiry. Entries expire after `ttl` seconds and the least
+recently used entry is evicted once `maxsize` chains are held. Misses for the same
+key that arrive together share one download (fetchPool.single_flight).
+'''
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from realPrice.fetchPool import single_flight
+from realPrice.providers import get_provider
+from tools.tracing import span
+
+_settings = {
+    'ttl': float(os.environ.get('OPTION_CHAIN_TTL', 15)),
+    'expirations_ttl': float(os.environ.get('OPTION_EXPIRATIONS_TTL', 3600)),
+    'maxsize': int(os.environ.get('OPTION_CHAIN_CACHE_SIZE', 32)),
+}
+_lock = threading.Lock()
+_chains = OrderedDict()
+_expirations = OrderedDict()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def configure(ttl=None, maxsize=None, expirations_ttl=None):
+    with _lock:
+        if ttl is not None:
+            _settings['ttl'] = float(ttl)
+        if expirations_ttl is not None:
+            _settings['expirations_ttl'] = float(expirations_ttl)
+        if maxsize is not None:
+            _settings['maxsize'] = int(maxsize)
+            _evict(_chains)
+            _evict(_expirations)
+
+
+def clear():
+    with _lock:
+        _chains.clear()
+        _expirations.clear()
+
+
+def cache_info():
+    with _lock:
+        return dict(_stats, size=len(_chains), **_settings)
+
+
+def _evict(store):
+    while len(store) > _settings['maxsize']:
+        store.popitem(last=False)
+        _stats['evictions'] += 1
+
+
+def _lookup(store, key, ttl):
+    with _lock:
+        entry = store.get(key)
+        if entry is not None and time.monotonic() - entry[0] < ttl:
+            store.move_to_end(key)
+            _stats['hits'] += 1
+            return True, entry[1]
+        _stats['misses'] += 1
+        return False, None
+
+
+def _store(store, key, value):
+    with _lock:
+        store[key] = (time.monotonic(), value)
+        store.move_to_end(key)
+        _evict(store)
+
+
+@single_flight('chain')
+def _download_chain(symbol, date):
+    with span('network.chain', symbol=symbol, date=date):
+        return get_provider().option_chain(symbol, date)
+
+
+@single_flight('expirations')
+def _download_expirations(symbol):
+    with span('network.expirations', symbol=symbol):
+        return tuple(get_provider().expirations(symbol))
+
+
+def option_chain(symbol, date):
+    '''Cached provider option_chain(symbol, date); same shape as yf.Ticker(symbol).option_chain(date).'''
+    key = (symbol, date)
+    with span('cache.chain', symbol=symbol, date=date) as current:
+        found, chain = _lookup(_chains, key, _settings['ttl'])
+        current.args['hit'] = found
+        if found:
+            return chain
+        chain = _download_chain(symbol, date)
+        _store(_chains, key, chain)
+        return chain
+
+
+def expirations(symbol):
+    '''Cached provider expirations(symbol), like yf.Ticker(symbol).options.'''
+    with span('cache.expirations', symbol=symbol) as current:
+        found, dates = _lookup(_expirations, symbol, _settings['expirations_ttl'])
+        current.args['hit'] = found
+        if found:
+            return dates
+        dates = _download_expirations(symbol)
+        _store(_expirations, symbol, dates)
+        return dates
@@ -0,0 +1,277 @@
+'''
+Shared thread pool and rate limiting for network fetches.
+
+fetch_all() runs a batch of independent requests at the same time and joins
+them, so a trade costs the latency of its slowest request instead of the sum.
+That holds for every caller: the GUI thread, pnl_batch's rounds, and pool jobs
+such as OptionPnl.main/IndexPnl.main started from a window. A pool job that
+calls fetch_all queues the batch like anyone else, and while it waits it runs
+the batch's jobs that no other worker has picked up yet, so the batch fans out
+over the idle workers and cannot deadlock when every worker is waiting.
+Polygon calls go through `polygon_limiter`, a token bucket that replaces the
+fixed time.sleep() pauses between contracts.
+
+Every job runs on one process-wide pool of FETCH_WORKERS threads. Queued jobs
+are started in priority order (HIGH before NORMAL before LOW, FIFO within a
+level) and may carry a CancelToken: a job cancelled while still queued never
+starts, and a running one stops at its next raise_if_cancelled() checkpoint,
+which the multi-request fetchers call between network round-trips.
+
+single_flight(name) wraps a fetcher so that identical calls made at the same
+time (two windows asking for the same chain, several stock threads for one
+symbol) share the first caller's request instead of each starting their own.
+Each caller that joined gets its own copy of the result (DataFrames, also
+inside tuples such as a chain or a (bars, error) pair), so one can modify it
+without the others seeing it.
+dedup_stats() reports how many calls ran and how many joined one in flight.
+
+A job runs under the tracing span that was current when it was submitted, so
+its spans nest under the action that asked for it.
+'''
+import functools
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+
+from tools.tracing import current_span, attach
+
+HIGH, NORMAL, LOW = 0, 1, 2
+
+
+class Cancelled(Exception):
+    pass
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise Cancelled()
+
+
+_local = threading.local()
+
+
+def current_token():
+    '''The CancelToken of the pool job running on this thread, or None.'''
+    return getattr(_local, 'token', None)
+
+
+def raise_if_cancelled():
+    '''Checkpoint for long fetches: raises Cancelled if the calling pool job was cancelled.'''
+    token = current_token()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1):
+        while True:
+            # A cancelled job should not spend the budget (or wait for it)
+            raise_if_cancelled()
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+polygon_limiter = TokenBucket(rate=float(os.environ.get('POLYGON_RATE_PER_SEC', 1)),
+                              capacity=float(os.environ.get('POLYGON_BURST', 2)))
+
+class PriorityPool:
+    '''Fixed number of daemon worker threads, started lazily, fed from a priority queue.'''
+
+    def __init__(self, max_workers, name='fetch'):
+        self.max_workers = max_workers
+        self.name = name
+        self._queue = []
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._workers = []
+        self._idle = 0
+
+    def submit(self, fn, *args, priority=NORMAL, token=None, **kwargs):
+        future = Future()
+        with self._cond:
+            heapq.heappush(self._queue, (priority, next(self._order), future, token, current_span(), fn, args, kwargs))
+            if len(self._queue) > self._idle and len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._work, name=f'{self.name}_{len(self._workers)}', daemon=True)
+                self._workers.append(worker)
+                worker.start()
+            self._cond.notify()
+        return future
+
+    def pending(self):
+        with self._cond:
+            return len(self._queue)
+
+    def in_worker(self):
+        return threading.current_thread() in self._workers
+
+    def run_here(self, future):
+        '''Runs `future`'s job on the calling thread if it is still queued; False if a worker already took it.'''
+        with self._cond:
+            for i, entry in enumerate(self._queue):
+                if entry[2] is future:
+                    break
+            else:
+                return False
+            self._queue[i] = self._queue[-1]
+            self._queue.pop()
+            heapq.heapify(self._queue)
+        self._run(entry)
+        return True
+
+    def _run(self, entry):
+        _, _, future, token, parent, fn, args, kwargs = entry
+        if token is not None and token.cancelled:
+            future.cancel()
+        if not future.set_running_or_notify_cancel():
+            return
+        # Restored afterwards: run_here can run a job inside another one
+        previous = getattr(_local, 'token', None)
+        _local.token = token
+        try:
+            with attach(parent):
+                future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            _local.token = previous
+
+    def _work(self):
+        while True:
+            with self._cond:
+                self._idle += 1
+                while not self._queue:
+                    self._cond.wait()
+                self._idle -= 1
+                entry = heapq.heappop(self._queue)
+            self._run(entry)
+
+
+_pool = PriorityPool(int(os.environ.get('FETCH_WORKERS', 8)))
+
+
+def submit(fn, *args, priority=NORMAL, token=None, **kwargs):
+    return _pool.submit(fn, *args, priority=priority, token=token, **kwargs)
+
+
+def pending():
+    '''Jobs waiting for a free worker.'''
+    return _pool.pending()
+
+
+def fetch_all(tasks, priority=NORMAL):
+    '''
+    tasks maps a name to (fn, *args). All of them are started at once and the
+    results are returned under the same names; the first exception is re-raised.
+    From a pool job the batch inherits the job's CancelToken, and the calling
+    worker runs whatever part of it is still queued instead of blocking.
+    '''
+    token = current_token()
+    futures = {name: _pool.submit(task[0], *task[1:], priority=priority, token=token) for name, task in tasks.items()}
+    if _pool.in_worker():
+        for future in futures.values():
+            _pool.run_here(future)
+    try:
+        return {name: future.result() for name, future in futures.items()}
+    except CancelledError:
+        raise Cancelled()
+
+
+def _copy(value):
+    '''A copy of a shared result for one caller: tuples element by element, anything with .copy() copied.'''
+    if isinstance(value, tuple):
+        items = [_copy(item) for item in value]
+        return type(value)(*items) if hasattr(value, '_fields') else tuple(items)
+    copy = getattr(value, 'copy', None)
+    return copy() if callable(copy) else value
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        '''Runs fn unless a call under `key` is already in flight, in which case a copy of its result is returned.'''
+        name = key[0]
+        while True:
+            with self._lock:
+                stats = self._stats.setdefault(name, {'calls': 0, 'shared': 0})
+                future = self._calls.get(key)
+                leader = future is None
+                if leader:
+                    future = self._calls[key] = Future()
+                    stats['calls'] += 1
+                else:
+                    stats['shared'] += 1
+            if leader:
+                break
+            try:
+                return _copy(future.result())
+            except Cancelled:
+                # The leader's job was cancelled, not ours: take the call over unless we were cancelled too
+                raise_if_cancelled()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self):
+        with self._lock:
+            return {name: dict(counts) for name, counts in self._stats.items()}
+
+
+_flights = SingleFlight()
+
+
+def single_flight(name):
+    '''Decorator: concurrent calls with equal arguments share one in-flight call.'''
+    def wrap(fn):
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            return _flights.do((name, args, tuple(sorted(kwargs.items()))), fn, *args, **kwargs)
+        return call
+    return wrap
+
+
+def dedup_stats():
+    '''{name: {'calls': network calls made, 'shared': calls that joined one already in flight}}'''
+    return _flights.stats()
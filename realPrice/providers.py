@@ -0,0 +1,262 @@
+'''
+Market-data providers behind every realPrice fetcher.
+
+A provider answers five questions, which are the only network calls the apps make:
+
+    expirations(symbol)                      option expiry dates, 'YYYY-MM-DD'
+    option_chain(symbol, date)               OptionChain(calls, puts, underlying) as yfinance returns it
+    history(symbol, start, end, period)      daily OHLCV frame indexed by 'Date', like Ticker.history()
+    info(symbol)                             quote fields (currentPrice, regularMarketPreviousClose, ...)
+    option_aggregates(ticker, start, end)    (Polygon daily bars [{'t', 'o', 'h', 'l', 'c', 'v'}], error)
+
+LiveProvider asks yfinance and Polygon. ReplayProvider reads recorded fixtures
+from a directory and waits a configurable latency per call, so the apps, the
+batch path and the benchmarks run deterministically without a network.
+RecordingProvider wraps another provider and writes everything it returns in
+the replay layout, which is how fixtures are made:
+
+    <dir>/expirations/<symbol>.json
+    <dir>/chains/<symbol>_<date>.json            {"calls": [...], "puts": [...], "underlying": {...}}
+    <dir>/chains/<symbol>_<date>_calls.parquet   (and _puts.parquet) instead of the JSON, if preferred
+    <dir>/history/<symbol>.json | .parquet       records with Date, Open, High, Low, Close, Volume
+    <dir>/info/<symbol>.json
+    <dir>/aggregates/<ticker>.json | .parquet    Polygon bars, 't' in epoch milliseconds
+
+The process-wide provider comes from the environment:
+
+    MARKET_DATA=live | replay        (default live)
+    MARKET_DATA_DIR=<dir>            fixture directory for replay / recording
+    MARKET_DATA_LATENCY=0.05         seconds per replayed call, or a range such as 0.02-0.2
+    MARKET_DATA_SEED=0               seed for the latency range
+    MARKET_DATA_RECORD=<dir>         record live answers into <dir>
+'''
+import json
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, date
+
+from tools.lazy import lazy_import
+
+yf = lazy_import('yfinance')
+pd = lazy_import('pandas')
+requests = lazy_import('requests')
+
+OptionChain = namedtuple('OptionChain', ['calls', 'puts', 'underlying'])
+
+POLYGON_API_KEY = 'C6ig1sXku2yKl_XEIvSvc_OWCwB8ILLn'
+POLYGON_AGGS_URL = 'https://api.polygon.io/v2/aggs/ticker/'
+
+HISTORY_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def _day(value):
+    if value is None or isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+class LiveProvider:
+    def expirations(self, symbol):
+        return tuple(yf.Ticker(symbol).options)
+
+    def option_chain(self, symbol, date):
+        chain = yf.Ticker(symbol).option_chain(date)
+        return OptionChain(chain.calls, chain.puts, chain.underlying)
+
+    def history(self, symbol, start=None, end=None, period=None):
+        ticker = yf.Ticker(symbol)
+        if period is not None:
+            return ticker.history(period=period)
+        return ticker.history(start=start, end=end)
+
+    def info(self, symbol):
+        return yf.Ticker(symbol).info
+
+    def option_aggregates(self, ticker, start, end):
+        url = f"{POLYGON_AGGS_URL}O:{ticker}/range/1/day/{start.isoformat()}/{end.isoformat()}?apiKey={POLYGON_API_KEY}"
+        response = requests.get(url)
+        if response.status_code != 200:
+            return None, f"Failed to retrieve data: {response.status_code}"
+        return response.json().get('results', []), None
+
+
+class ReplayProvider:
+    '''Serves recorded fixtures from `root`; a missing fixture behaves like an empty answer.'''
+
+    def __init__(self, root, latency=0.0, seed=0):
+        self.root = root
+        if isinstance(latency, str):
+            low, _, high = latency.partition('-')
+            latency = (float(low), float(high or low))
+        elif not isinstance(latency, tuple):
+            latency = (float(latency), float(latency))
+        self.latency = latency
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _wait(self):
+        low, high = self.latency
+        if high <= 0:
+            return
+        with self._lock:
+            delay = self._random.uniform(low, high)
+        time.sleep(delay)
+
+    def _path(self, kind, name, suffix):
+        return os.path.join(self.root, kind, f"{name.replace(os.sep, '_')}{suffix}")
+
+    def _json(self, kind, name):
+        path = self._path(kind, name, '.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _frame(self, kind, name):
+        '''Records of a fixture as a DataFrame, from Parquet if present, else JSON; None if neither exists.'''
+        path = self._path(kind, name, '.parquet')
+        if os.path.exists(path):
+            return pd.read_parquet(path)
+        records = self._json(kind, name)
+        return None if records is None else pd.DataFrame(records)
+
+    def expirations(self, symbol):
+        self._wait()
+        return tuple(self._json('expirations', symbol) or ())
+
+    def option_chain(self, symbol, date):
+        self._wait()
+        name = f'{symbol}_{date}'
+        recorded = self._json('chains', name)
+        if recorded is not None:
+            calls, puts = pd.DataFrame(recorded.get('calls', [])), pd.DataFrame(recorded.get('puts', []))
+            underlying = recorded.get('underlying') or {}
+        else:
+            calls, puts = self._frame('chains', f'{name}_calls'), self._frame('chains', f'{name}_puts')
+            underlying = self._json('chains', f'{name}_underlying') or {}
+        if calls is None or puts is None:
+            raise ValueError(f"Expiration `{date}` cannot be found for {symbol} in {self.root}.")
+        return OptionChain(calls, puts, underlying)
+
+    def history(self, symbol, start=None, end=None, period=None):
+        self._wait()
+        frame = self._frame('history', symbol)
+        if frame is None or frame.empty:
+            return pd.DataFrame(columns=HISTORY_COLUMNS, index=pd.DatetimeIndex([], name='Date'))
+        frame = frame.copy()
+        frame['Date'] = pd.to_datetime(frame['Date'])
+        frame = frame.sort_values('Date').set_index('Date')
+        days = frame.index.date
+        if period is not None:
+            # Only '1d' is used: the latest session
+            return frame.iloc[-1:]
+        keep = [(start is None or day >= _day(start)) and (end is None or day < _day(end)) for day in days]
+        return frame[keep]
+
+    def info(self, symbol):
+        self._wait()
+        return self._json('info', symbol) or {}
+
+    def option_aggregates(self, ticker, start, end):
+        self._wait()
+        bars = self._frame('aggregates', ticker)
+        if bars is None:
+            return None, f"No recorded aggregates for O:{ticker}"
+        days = pd.to_datetime(bars['t'], unit='ms').dt.date
+        bars = bars[(days >= _day(start)) & (days <= _day(end))]
+        return bars.to_dict('records'), None
+
+
+class RecordingProvider:
+    '''Passes calls through to `provider` and saves each answer as a JSON fixture under `root`.'''
+
+    def __init__(self, provider, root):
+        self.provider = provider
+        self.root = root
+
+    def _save(self, kind, name, payload):
+        folder = os.path.join(self.root, kind)
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"{name.replace(os.sep, '_')}.json"), 'w') as f:
+            json.dump(payload, f, default=str)
+
+    def expirations(self, symbol):
+        dates = self.provider.expirations(symbol)
+        self._save('expirations', symbol, list(dates))
+        return dates
+
+    def option_chain(self, symbol, date):
+        chain = self.provider.option_chain(symbol, date)
+        self._save('chains', f'{symbol}_{date}', {
+            'calls': json.loads(chain.calls.to_json(orient='records', date_format='iso')),
+            'puts': json.loads(chain.puts.to_json(orient='records', date_format='iso')),
+            'underlying': chain.underlying,
+        })
+        return chain
+
+    def history(self, symbol, start=None, end=None, period=None):
+        hist = self.provider.history(symbol, start=start, end=end, period=period)
+        # Merge with what is already recorded so several windows build up one fixture
+        path = os.path.join(self.root, 'history', f'{symbol}.json')
+        records = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                records = {row['Date'][:10]: row for row in json.load(f)}
+        for day, row in hist[HISTORY_COLUMNS].iterrows():
+            records[day.strftime('%Y-%m-%d')] = dict(row, Date=day.strftime('%Y-%m-%d'))
+        self._save('history', symbol, [records[day] for day in sorted(records)])
+        return hist
+
+    def info(self, symbol):
+        info = self.provider.info(symbol)
+        self._save('info', symbol, info)
+        return info
+
+    def option_aggregates(self, ticker, start, end):
+        bars, error = self.provider.option_aggregates(ticker, start, end)
+        if bars is not None:
+            path = os.path.join(self.root, 'aggregates', f'{ticker}.json')
+            recorded = {}
+            if os.path.exists(path):
+                with open(path) as f:
+                    recorded = {bar['t']: bar for bar in json.load(f)}
+            recorded.update({bar['t']: bar for bar in bars})
+            self._save('aggregates', ticker, [recorded[t] for t in sorted(recorded)])
+        return bars, error
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def provider_from_env(environ=os.environ):
+    kind = environ.get('MARKET_DATA', 'live').lower()
+    if kind == 'replay':
+        root = environ.get('MARKET_DATA_DIR')
+        if not root:
+            raise ValueError('MARKET_DATA=replay needs MARKET_DATA_DIR to point at the fixtures')
+        return ReplayProvider(root, environ.get('MARKET_DATA_LATENCY', '0'), int(environ.get('MARKET_DATA_SEED', 0)))
+    if kind != 'live':
+        raise ValueError(f"Unknown MARKET_DATA provider '{kind}' (expected live or replay)")
+    provider = LiveProvider()
+    if environ.get('MARKET_DATA_RECORD'):
+        provider = RecordingProvider(provider, environ['MARKET_DATA_RECORD'])
+    return provider
+
+
+def get_provider():
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = provider_from_env()
+        return _provider
+
+
+def set_provider(provider):
+    '''Replaces the process-wide provider (benchmarks, tests); None re-reads the environment.'''
+    global _provider
+    with _provider_lock:
+        _provider = provider
@@ -1,8 +1,11 @@
-import yfinance as yf
 from datetime import datetime
-import holidays
-import pytz
+from realPrice.chainCache import option_chain, expirations
+from realPrice.fetchPool import raise_if_cancelled
+from realPrice.realStock import get_realtime_stock_price
+from tools.tracing import note, traced
+from tools.tradingCalendar import trading_calendar
 
+@traced('quote.option')
 def get_realtime_option_price(option_name):
     '''
     This function gets the real-time option price in the US stock market.
@@ -13,14 +16,12 @@ def get_realtime_option_price(option_name):
     bid_price = None
     today = datetime.today()
     company = option_name[:next((i for i, char in enumerate(option_name) if char.isdigit()), None)]
-    comp_info = yf.Ticker(company)
-    
     length = len(company)
     date = option_name[length:length + 6]
     option_date = f"20{date[:2]}-{date[2:4]}-{date[4:]}"
     
     optionType = option_name[length + 6]
-    opt = comp_info.option_chain(option_date)  
+    opt = option_chain(company, option_date)
 
     if optionType.upper() == "C":
         specific_opt = opt.calls[opt.calls.contractSymbol == option_name] 
@@ -28,28 +29,69 @@ def get_realtime_option_price(option_name):
         specific_opt = opt.puts[opt.puts.contractSymbol == option_name]
 
     if specific_opt.empty:
-        print(f"No specific option found for {option_name}.")
+        note(f"No specific option found for {option_name}.", option=option_name)
         return None
 
-    if today.weekday() > 4 or today in holidays.UnitedStates(years=today.year):
+    if not trading_calendar().is_session(today):
         market_status = "weekend" if today.weekday() > 4 else "a holiday"
         last_price = specific_opt["lastPrice"].iloc[0] if not specific_opt.empty else "N/A"
-        print(f"Today is {market_status}, the market is closed. The last recorded transaction price of {option_name} was {last_price}.")
+        note(f"Today is {market_status}, the market is closed.", option=option_name, last=last_price)
     else:
         last_price = specific_opt["lastPrice"].iloc[0]
         ask_price = specific_opt["ask"].iloc[0]
         bid_price = specific_opt["bid"].iloc[0]
-        print(f"Last price: {last_price}, Ask: {ask_price}, Bid: {bid_price}.")
+        note("Quote", option=option_name, last=last_price, ask=ask_price, bid=bid_price)
         
     return last_price, ask_price, bid_price
 
+def get_position_quote(company, date, strike):
+    '''
+    (last, ask, bid) of the call and the put at `strike` plus the underlying price, all
+    read from one option chain snapshot, so re-pricing an open position costs a single
+    request. Returns None if either leg is missing from the chain.
+    '''
+    opt = option_chain(company, date)
+    call = opt.calls[opt.calls['strike'] == strike]
+    put = opt.puts[opt.puts['strike'] == strike]
+    if call.empty or put.empty:
+        note(f"No call/put pair with a strike price of {strike} for {date}.", symbol=company, strike=strike)
+        return None
+
+    underlying = getattr(opt, 'underlying', None) or {}
+    stock_price = underlying.get('regularMarketPrice')
+    if stock_price is None:
+        stock_price = get_realtime_stock_price(company)[0]
+    return {
+        'call': tuple(call[['lastPrice', 'ask', 'bid']].iloc[0]),
+        'put': tuple(put[['lastPrice', 'ask', 'bid']].iloc[0]),
+        'stock': stock_price,
+    }
+
+QUOTE_FIELDS = ['lastPrice', 'bid', 'ask', 'openInterest', 'volume']
+
+def get_strike_quotes(company, date, strikes):
+    '''
+    Quotes for the calls and puts at every strike in `strikes`, read from one option chain
+    snapshot: {'call': frame, 'put': frame}, each frame holding QUOTE_FIELDS with one row per
+    requested strike in the order given (NaN where the chain has no contract). Returns None
+    if `date` is not an expiration of `company`.
+    '''
+    if date not in expirations(company):
+        print(f"No options available for {date}.")
+        return None
+    opt = option_chain(company, date)
+    quotes = {}
+    for side, frame in (('call', opt.calls), ('put', opt.puts)):
+        by_strike = frame.drop_duplicates('strike').set_index('strike')[QUOTE_FIELDS]
+        quotes[side] = by_strike.reindex([float(strike) for strike in strikes])
+    return quotes
+
 def calls_or_puts(company, date, strike):
     options = [] 
-    ticker = yf.Ticker(company)
-    expiration_dates = ticker.options
+    expiration_dates = expirations(company)
 
     if date in expiration_dates:
-        opts = ticker.option_chain(date)
+        opts = option_chain(company, date)
         
         call_option = opts.calls[opts.calls['strike'] == strike]
         put_option = opts.puts[opts.puts['strike'] == strike]
@@ -76,18 +118,18 @@ def main(company='AAPL', date='2024-03-15', strike=100):
     res = []
     if options:
         for option in options:
+            raise_if_cancelled()
             print(f"Current Option is {option}")
             opt = get_realtime_option_price(option)
             res.append(opt[0])
     return res
 
 def getIndexOption(symbol, ticker):
-    info = yf.Ticker(symbol)
     option_syb = ticker[:next((i for i, char in enumerate(ticker) if char.isdigit()), None)]
     length = len(option_syb)
     date = ticker[length:length + 6]
     option_date = f"20{date[:2]}-{date[2:4]}-{date[4:]}"
-    opt = info.option_chain(option_date)
+    opt = option_chain(symbol, option_date)
     optionType = ticker[length + 6]
     if optionType.upper() == "C":
         calls = opt.calls
@@ -101,7 +143,7 @@ def getIndexOption(symbol, ticker):
         return None
     today = datetime.today()
     
-    if today.weekday() > 4 or today in holidays.UnitedStates(years=today.year):
+    if not trading_calendar().is_session(today):
         market_status = "weekend" if today.weekday() > 4 else "a holiday"
         last_price = res["lastPrice"].iloc[0] if not res.empty else "N/A"
         print(f"Today is {market_status}, the market is closed. The last recorded transaction price of {option_name} was {last_price}.")
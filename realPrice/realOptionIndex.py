@@ -1,8 +1,7 @@
-import yfinance as yf
+from realPrice.chainCache import option_chain as cached_option_chain
 
 def get_option_chain(company='SPX', date='2024-05-02', strike=4500):
-    ticker = yf.Ticker(company)
-    option_chain = ticker.option_chain(date)
+    option_chain = cached_option_chain(company, date)
    
     call_data = option_chain.calls[option_chain.calls['strike'] == strike]
     
@@ -13,11 +12,8 @@ def get_option_chain(company='SPX', date='2024-05-02', strike=4500):
     else:
         return None
 def main(company='SPX', date='2024-05-02', strike=4500):
-    # Fetch ticker information
-    ticker = yf.Ticker(company)
-
     try:
-        option_chain = ticker.option_chain(date)
+        option_chain = cached_option_chain(company, date)
     except ValueError as e:
         print(f"Error fetching option chain for {date}: {e}")
         return None
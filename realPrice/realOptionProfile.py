@@ -1,7 +1,7 @@
-import yfinance as yf
 from datetime import datetime
-import holidays
-import pytz
+from realPrice.chainCache import option_chain, expirations
+from realPrice.fetchPool import raise_if_cancelled
+from tools.tradingCalendar import trading_calendar
 
 def get_realtime_option_price(option_name):
     '''
@@ -11,14 +11,12 @@ def get_realtime_option_price(option_name):
     # Process input option name
     today = datetime.today()
     company = option_name[:next((i for i, char in enumerate(option_name) if char.isdigit()), None)]
-    comp_info = yf.Ticker(company)
-    
     length = len(company)
     date = option_name[length:length + 6]
     option_date = f"20{date[:2]}-{date[2:4]}-{date[4:]}"
     
     optionType = option_name[length + 6]
-    opt = comp_info.option_chain(option_date)  
+    opt = option_chain(company, option_date)
 
     if optionType.upper() == "C":
         specific_opt = opt.calls[opt.calls.contractSymbol == option_name] 
@@ -30,22 +28,15 @@ def get_realtime_option_price(option_name):
         return None
 
     # Check if today is a weekend or holiday
-    if today.weekday() > 4 or today in holidays.UnitedStates(years=today.year):
+    if not trading_calendar().is_session(today):
         market_status = "weekend" if today.weekday() > 4 else "a holiday"
         last_price = specific_opt["lastPrice"].iloc[0] if not specific_opt.empty else "N/A"
         open_interest = specific_opt["openInterest"].iloc[0] if not specific_opt.empty else "N/A"
         volume = specific_opt["volume"].iloc[0] if not specific_opt.empty else "N/A"
         print(f"Today is {market_status}, the market is closed. The last recorded transaction price of {option_name} was {last_price}.")
     else:
-        # Define the market hours
-        market_open = datetime.strptime("09:30", "%H:%M").time()
-        market_close = datetime.strptime("16:00", "%H:%M").time()
-
-        # Check if current time is within market hours
-        eastern = pytz.timezone('US/Eastern')
-        current_time_et = datetime.now(eastern).time()
-
-        if market_open <= current_time_et <= market_close:
+        # Check if current time is within market hours (13:00 ET on early-close days)
+        if trading_calendar().is_open():
             last_price = specific_opt["lastPrice"].iloc[0]
             ask_price = specific_opt["ask"].iloc[0]
             bid_price = specific_opt["bid"].iloc[0]
@@ -66,12 +57,11 @@ def get_realtime_option_price(option_name):
 
 def calls_or_puts(company, date, strike):
     options = [] 
-    ticker = yf.Ticker(company)
-    expiration_dates = ticker.options
+    expiration_dates = expirations(company)
 
     if date in expiration_dates:
 
-        opts = ticker.option_chain(date)
+        opts = option_chain(company, date)
         
         call_option = opts.calls[opts.calls['strike'] == strike]
         put_option = opts.puts[opts.puts['strike'] == strike]
@@ -102,6 +92,7 @@ def main(company, date, strike):
     res = [[], [], []]
     if options:
         for option in options:
+            raise_if_cancelled()
             print(f"Current Option is {option}")
             last , open_interest, volume= get_realtime_option_price(option)
             res[0].append(last)
@@ -1,18 +1,22 @@
-import yfinance as yf
 from datetime import datetime
-import holidays
-import pytz
 
+from realPrice.fetchPool import single_flight
+from realPrice.providers import get_provider
+from tools.tracing import traced
+from tools.tradingCalendar import trading_calendar
+
+@single_flight('quote')
+@traced('network.quote')
 def get_realtime_stock_price(stock_name):
-    stock = yf.Ticker(stock_name)
+    provider = get_provider()
     today = datetime.today()
     
     # Check for weekends and holidays
-    if today.weekday() > 4 or today in holidays.UnitedStates(years=today.year):
-        todays_data = stock.history(period="1d")
+    if not trading_calendar().is_session(today):
+        todays_data = provider.history(stock_name, period="1d")
         if not todays_data.empty:
             current_price = todays_data['Close'].iloc[-1]
-            previous_close = stock.info.get('regularMarketPreviousClose', current_price)
+            previous_close = provider.info(stock_name).get('regularMarketPreviousClose', current_price)
             price_change = current_price - previous_close
             percent_change = round((price_change / previous_close) * 100, 2)
             status = "closed"
@@ -21,11 +25,12 @@ def get_realtime_stock_price(stock_name):
     else:
         try:
             # Try getting current price during market hours
-            current_price = stock.info.get("currentPrice")
-            previous_close = stock.info.get('regularMarketPreviousClose', current_price)
+            info = provider.info(stock_name)
+            current_price = info.get("currentPrice")
+            previous_close = info.get('regularMarketPreviousClose', current_price)
             if current_price is None:
                 # Fallback if currentPrice is not available
-                todays_data = stock.history(period="1d")
+                todays_data = provider.history(stock_name, period="1d")
                 if not todays_data.empty:
                     current_price = todays_data['Close'].iloc[-1]
             price_change = current_price - previous_close
@@ -1,7 +1,11 @@
-from PyQt5.QtCore import (Qt, QThread, pyqtSignal)
+from PyQt5.QtCore import (Qt, pyqtSignal)
+from realPrice.fetchPool import HIGH
+from tools.workerPool import PooledFetch
+from tools.ChainFetch import FetchStrikeQuotesThread
 from realPrice.realStock import get_realtime_stock_price
 from realPrice.realOptionProfile import main as get_realtime_option_price
-class FetchStockThread(QThread):
+class FetchStockThread(PooledFetch):
+    priority = HIGH
     # Define a signal to send the fetched data back to the main thread
     data_fetched = pyqtSignal(object, object, object)
 
@@ -23,7 +27,7 @@ class FetchStockThread(QThread):
 
 
 
-class FetchOptionThread(QThread):
+class FetchOptionThread(PooledFetch):
     data_fetched = pyqtSignal(list, list, list)
     
     def __init__(self, company, date, strike):
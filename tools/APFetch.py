@@ -1,7 +1,10 @@
-from PyQt5.QtCore import (Qt, QThread, pyqtSignal)
+from PyQt5.QtCore import (Qt, pyqtSignal)
+from realPrice.fetchPool import HIGH
+from tools.workerPool import PooledFetch
 from realPrice.realStock import get_realtime_stock_price
 from realPrice.realOptionProfile import main as get_option, calls_or_puts
-class FetchStockThread(QThread):
+class FetchStockThread(PooledFetch):
+    priority = HIGH
     data_fetched = pyqtSignal(object, object, object)
 
     def __init__(self, stock_name):
@@ -22,8 +25,10 @@ class FetchStockThread(QThread):
             self.data_fetched.emit(price, price_change, percentage_change)
 
 
-class FetchOptionThread(QThread):
+class FetchOptionThread(PooledFetch):
     data_fetched = pyqtSignal(list, list, list)
+    # No prices: fill_premium_inputs shows 'NA'
+    failed_payload = ([], [], [])
 
     def __init__(self, company, date, strike):
         super().__init__()
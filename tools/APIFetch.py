@@ -1,7 +1,10 @@
 from realPrice.realStock import get_realtime_stock_price
 from realPrice.realOptionIndex import main as get_realtime_option_price
-from PyQt5.QtCore import (Qt, QThread, pyqtSignal)
-class FetchStockThread(QThread):
+from PyQt5.QtCore import (Qt, pyqtSignal)
+from realPrice.fetchPool import HIGH
+from tools.workerPool import PooledFetch
+class FetchStockThread(PooledFetch):
+    priority = HIGH
     data_fetched = pyqtSignal(object, object, object)
 
     def __init__(self, stock_name):
@@ -22,8 +25,10 @@ class FetchStockThread(QThread):
             self.data_fetched.emit(price, price_change, percentage_change)
 
 
-class FetchOptionThread(QThread):
+class FetchOptionThread(PooledFetch):
     data_fetched = pyqtSignal(list, list, list)
+    # fill_premium_inputs shows 'NA' when the first price is 'NA'
+    failed_payload = (['NA', 'NA'], ['NA', 'NA'], ['NA', 'NA'])
 
     def __init__(self, company, date, strike):
         super().__init__()
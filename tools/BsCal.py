@@ -1,54 +1,226 @@
-import QuantLib as ql
+import numpy as np
+from scipy.special import ndtr
+
+from tools.lazy import lazy_import
+from tools.tracing import traced
+
+# Only the reference engine needs QuantLib
+ql = lazy_import('QuantLib')
+
+SQRT_2PI = np.sqrt(2 * np.pi)
+
+
+def _norm_pdf(x):
+    return np.exp(-0.5 * x * x) / SQRT_2PI
+
+
+def _is_call(cp_flag):
+    flags = np.asarray(cp_flag)
+    if flags.dtype == bool:
+        return flags
+    return np.char.lower(flags.astype(str)).astype('U1') == 'c'
+
+
+def _scalar_or_array(values):
+    return float(values) if np.ndim(values) == 0 else values
+
+
+def bs_greeks(cp_flag, S, X, T, r, v, q=0.0):
+    '''
+    Closed-form Black-Scholes-Merton price and first-order Greeks.
+    Every argument broadcasts, so a whole chain (arrays of strikes, flags,
+    vols, ...) is priced in one pass. cp_flag is 'c'/'p' (or an array of
+    them, or a boolean "is call" array). Conventions follow QuantLib's
+    AnalyticEuropeanEngine: vega and rho per unit change, theta per year.
+    '''
+    is_call = _is_call(cp_flag)
+    S, X, T, r, v, q = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (S, X, T, r, v, q)))
+    is_call = np.broadcast_to(is_call, S.shape)
+    sign = np.where(is_call, 1.0, -1.0)
+
+    T_pos = np.maximum(T, 0.0)
+    sqrt_T = np.sqrt(T_pos)
+    vol_T = v * sqrt_T
+    df_r = np.exp(-r * T_pos)
+    df_q = np.exp(-q * T_pos)
+    live = vol_T > 0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        safe_vol_T = np.where(live, vol_T, 1.0)
+        d1 = (np.log(S / X) + (r - q + 0.5 * v * v) * T_pos) / safe_vol_T
+        d2 = d1 - safe_vol_T
+        Nd1 = ndtr(sign * d1)
+        Nd2 = ndtr(sign * d2)
+        pdf_d1 = _norm_pdf(d1)
+
+        price = sign * (S * df_q * Nd1 - X * df_r * Nd2)
+        delta = sign * df_q * Nd1
+        gamma = df_q * pdf_d1 / (S * safe_vol_T)
+        vega = S * df_q * pdf_d1 * sqrt_T
+        theta = (-S * df_q * pdf_d1 * v / (2 * np.where(live, sqrt_T, 1.0))
+                 + sign * (q * S * df_q * Nd1 - r * X * df_r * Nd2))
+        rho = sign * X * T_pos * df_r * Nd2
+
+    # Expired or zero-vol contracts collapse to their discounted forward intrinsic value
+    forward_itm = sign * (S * df_q - X * df_r) > 0
+    price = np.where(live, price, np.maximum(sign * (S * df_q - X * df_r), 0.0))
+    delta = np.where(live, delta, np.where(forward_itm, sign * df_q, 0.0))
+    gamma = np.where(live, gamma, 0.0)
+    vega = np.where(live, vega, 0.0)
+    theta = np.where(live, theta, 0.0)
+    rho = np.where(live, rho, np.where(forward_itm, sign * X * T_pos * df_r, 0.0))
+
+    return {
+        'price': _scalar_or_array(price),
+        'delta': _scalar_or_array(delta),
+        'gamma': _scalar_or_array(gamma),
+        'vega': _scalar_or_array(vega),
+        'theta': _scalar_or_array(theta),
+        'rho': _scalar_or_array(rho),
+    }
+
+
+def bs_implied_vol(cp_flag, S, X, T, r, price, sigma=None, q=0.0, tol=1e-6, max_iterations=100,
+                   vol_lower=1e-4, vol_upper=5.0):
+    '''
+    Array-in/array-out implied volatility. Each element runs a safeguarded
+    Newton iteration: a [vol_lower, vol_upper] bracket is tightened on every
+    step and any Newton step that leaves it (or has a vanishing vega) falls
+    back to bisection, so every row converges or is flagged. Prices outside
+    the no-arbitrage bounds are rejected up front without iterating.
+    Returns a dict with 'iv' (NaN where unsolved), 'converged' and
+    per-row 'iterations'.
+    '''
+    is_call = _is_call(cp_flag)
+    S, X, T, r, price, q = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (S, X, T, r, price, q)))
+    is_call = np.broadcast_to(is_call, S.shape)
+    shape = S.shape
+    S, X, T, r, price, q, is_call = (a.ravel() for a in (S, X, T, r, price, q, is_call))
+
+    df_r = np.exp(-r * np.maximum(T, 0.0))
+    df_q = np.exp(-q * np.maximum(T, 0.0))
+    lower_bound = np.where(is_call, np.maximum(S * df_q - X * df_r, 0.0), np.maximum(X * df_r - S * df_q, 0.0))
+    upper_bound = np.where(is_call, S * df_q, X * df_r)
+    with np.errstate(invalid='ignore'):
+        valid = (T > 0) & (S > 0) & (X > 0) & (price > lower_bound) & (price < upper_bound)
+
+    if sigma is None:
+        # Brenner-Subrahmanyam at-the-money approximation as the starting point
+        with np.errstate(divide='ignore', invalid='ignore'):
+            guess = np.sqrt(2 * np.pi / T) * price / S
+    else:
+        guess = np.broadcast_to(np.asarray(sigma, dtype=float), shape).ravel()
+    vol = np.clip(np.nan_to_num(guess, nan=0.2), vol_lower, vol_upper)
+
+    lo = np.full(vol.shape, vol_lower)
+    hi = np.full(vol.shape, vol_upper)
+    iterations = np.zeros(vol.shape, dtype=int)
+    converged = np.zeros(vol.shape, dtype=bool)
+    active = valid.copy()
+
+    for _ in range(max_iterations):
+        if not active.any():
+            break
+        idx = np.flatnonzero(active)
+        greeks = bs_greeks(is_call[idx], S[idx], X[idx], T[idx], r[idx], vol[idx], q[idx])
+        diff = np.atleast_1d(greeks['price']) - price[idx]
+        vega = np.atleast_1d(greeks['vega'])
+        iterations[idx] += 1
+
+        # Converged once the price error maps to less than tol in vol terms
+        done = (np.abs(diff) < tol * np.minimum(vega, 1.0)) | (hi[idx] - lo[idx] < tol)
+        converged[idx[done]] = True
+        active[idx[done]] = False
+
+        step = ~done
+        idx, diff, vega = idx[step], diff[step], vega[step]
+        too_high = diff > 0
+        hi[idx] = np.where(too_high, vol[idx], hi[idx])
+        lo[idx] = np.where(too_high, lo[idx], vol[idx])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = vol[idx] - diff / vega
+        bisect = (lo[idx] + hi[idx]) / 2
+        use_newton = (vega > 1e-12) & (newton > lo[idx]) & (newton < hi[idx])
+        vol[idx] = np.where(use_newton, newton, bisect)
+
+    iv = np.where(converged, vol, np.nan)
+    return {
+        'iv': _scalar_or_array(iv.reshape(shape)),
+        'converged': converged.reshape(shape) if shape else bool(converged[0]),
+        'iterations': iterations.reshape(shape) if shape else int(iterations[0]),
+    }
+
+
+def chain_implied_vol(chain, S, T, r, cp_flag, price_col='lastPrice', **kwargs):
+    '''
+    Solves implied vol for every row of a yfinance option_chain(...).calls or
+    .puts frame in one batched call. price_col='mid' uses the bid/ask midpoint.
+    Returns a copy of the frame with bs_iv, iv_converged and iv_iterations.
+    '''
+    if price_col == 'mid':
+        prices = (chain['bid'].to_numpy(dtype=float) + chain['ask'].to_numpy(dtype=float)) / 2
+    else:
+        prices = chain[price_col].to_numpy(dtype=float)
+    result = bs_implied_vol(cp_flag, S, chain['strike'].to_numpy(dtype=float), T, r, prices, **kwargs)
+    chain = chain.copy()
+    chain['bs_iv'] = np.atleast_1d(result['iv'])
+    chain['iv_converged'] = np.atleast_1d(result['converged'])
+    chain['iv_iterations'] = np.atleast_1d(result['iterations'])
+    return chain
+
+
 class BlackScholes:
-    def __init__(self):
-        self.calendar = ql.NullCalendar()
-        self.day_count = ql.Actual365Fixed()
+    '''
+    engine='numpy' (default) prices with the vectorized closed form above;
+    engine='quantlib' keeps the original QuantLib object graph as a reference.
+    '''
+    def __init__(self, engine='numpy'):
+        if engine not in ('numpy', 'quantlib'):
+            raise ValueError(f"Unknown pricing engine: {engine}")
+        self.engine = engine
 
+    @traced('pricing.blsprice')
     def blsprice(self, cp_flag, S, X, T, r, v):
-        print(f"Input Parameters: cp_flag={cp_flag}, S={S}, X={X}, T={T}, r={r}, v={v}")
-        evaluation_date = ql.Settings.instance().evaluationDate
-        maturity_date = evaluation_date + int(T * 365)
-        option_type = ql.Option.Call if cp_flag == 'c' else ql.Option.Put
-        payoff = ql.PlainVanillaPayoff(option_type, X)
-        exercise = ql.EuropeanExercise(maturity_date)
-        european_option = ql.VanillaOption(payoff, exercise)
-        underlying = ql.SimpleQuote(S)
-        volatility = ql.BlackConstantVol(evaluation_date, self.calendar, v, self.day_count)
-        dividend_yield = ql.FlatForward(evaluation_date, ql.QuoteHandle(ql.SimpleQuote(0.0)), self.day_count)
-        risk_free_rate = ql.FlatForward(evaluation_date, ql.QuoteHandle(ql.SimpleQuote(r)), self.day_count)
-        bsm_process = ql.BlackScholesMertonProcess(
-            ql.QuoteHandle(underlying),
-            ql.YieldTermStructureHandle(dividend_yield),
-            ql.YieldTermStructureHandle(risk_free_rate),
-            ql.BlackVolTermStructureHandle(volatility)
-        )
-        european_option.setPricingEngine(ql.AnalyticEuropeanEngine(bsm_process))
-        price = european_option.NPV()
-        print(f"Calculated NPV: {price}")
-        return price
+        if self.engine == 'numpy':
+            return bs_greeks(cp_flag, S, X, T, r, v)['price']
+        european_option, _ = self._ql_option(cp_flag, S, X, T, r, v)
+        return european_option.NPV()
 
+    @traced('pricing.blsdelta')
     def blsdelta(self, cp_flag, S, X, T, r, v):
-        evaluation_date = ql.Settings.instance().evaluationDate
-        maturity_date = evaluation_date + int(T * 365)
-        option_type = ql.Option.Call if cp_flag == 'c' else ql.Option.Put
-        payoff = ql.PlainVanillaPayoff(option_type, X)
-        exercise = ql.EuropeanExercise(maturity_date)
-        european_option = ql.VanillaOption(payoff, exercise)
-        underlying = ql.SimpleQuote(S)
-        volatility = ql.BlackConstantVol(evaluation_date, self.calendar, v, self.day_count)
-        dividend_yield = ql.FlatForward(evaluation_date, ql.QuoteHandle(ql.SimpleQuote(0.0)), self.day_count)
-        risk_free_rate = ql.FlatForward(evaluation_date, ql.QuoteHandle(ql.SimpleQuote(r)), self.day_count)
-        bsm_process = ql.BlackScholesMertonProcess(
-            ql.QuoteHandle(underlying),
-            ql.YieldTermStructureHandle(dividend_yield),
-            ql.YieldTermStructureHandle(risk_free_rate),
-            ql.BlackVolTermStructureHandle(volatility)
-        )
-        european_option.setPricingEngine(ql.AnalyticEuropeanEngine(bsm_process))
-        delta = european_option.delta()
-        return delta
+        if self.engine == 'numpy':
+            return bs_greeks(cp_flag, S, X, T, r, v)['delta']
+        european_option, _ = self._ql_option(cp_flag, S, X, T, r, v)
+        return european_option.delta()
 
+    @traced('pricing.blsgreeks')
+    def blsgreeks(self, cp_flag, S, X, T, r, v):
+        if self.engine == 'numpy':
+            return bs_greeks(cp_flag, S, X, T, r, v)
+        european_option, _ = self._ql_option(cp_flag, S, X, T, r, v)
+        return {
+            'price': european_option.NPV(),
+            'delta': european_option.delta(),
+            'gamma': european_option.gamma(),
+            'vega': european_option.vega(),
+            'theta': european_option.theta(),
+            'rho': european_option.rho(),
+        }
+
+    @traced('pricing.blsimpv')
     def blsimpv(self, cp_flag, S, X, T, r, C, sigma, tol=1e-6, max_iterations=100):
+        if self.engine == 'numpy':
+            return bs_implied_vol(cp_flag, S, X, T, r, C, sigma, tol=tol, max_iterations=max_iterations)['iv']
+        european_option, bsm_process = self._ql_option(cp_flag, S, X, T, r, sigma)
+        try:
+            implied_vol = european_option.impliedVolatility(C, bsm_process, tol, max_iterations)
+        except RuntimeError:
+            implied_vol = float('nan')
+        return implied_vol
+
+    def _ql_option(self, cp_flag, S, X, T, r, v):
+        calendar = ql.NullCalendar()
+        day_count = ql.Actual365Fixed()
         evaluation_date = ql.Settings.instance().evaluationDate
         maturity_date = evaluation_date + int(T * 365)
         option_type = ql.Option.Call if cp_flag == 'c' else ql.Option.Put
@@ -56,21 +228,16 @@ class BlackScholes:
         exercise = ql.EuropeanExercise(maturity_date)
         european_option = ql.VanillaOption(payoff, exercise)
         underlying = ql.SimpleQuote(S)
-        volatility = ql.SimpleQuote(sigma)
-        volatility_handle = ql.BlackVolTermStructureHandle(
-            ql.BlackConstantVol(evaluation_date, self.calendar, ql.QuoteHandle(volatility), self.day_count)
+        volatility = ql.BlackVolTermStructureHandle(
+            ql.BlackConstantVol(evaluation_date, calendar, ql.QuoteHandle(ql.SimpleQuote(v)), day_count)
         )
-        dividend_yield = ql.FlatForward(evaluation_date, ql.QuoteHandle(ql.SimpleQuote(0.0)), self.day_count)
-        risk_free_rate = ql.FlatForward(evaluation_date, ql.QuoteHandle(ql.SimpleQuote(r)), self.day_count)
+        dividend_yield = ql.FlatForward(evaluation_date, ql.QuoteHandle(ql.SimpleQuote(0.0)), day_count)
+        risk_free_rate = ql.FlatForward(evaluation_date, ql.QuoteHandle(ql.SimpleQuote(r)), day_count)
         bsm_process = ql.BlackScholesMertonProcess(
             ql.QuoteHandle(underlying),
             ql.YieldTermStructureHandle(dividend_yield),
             ql.YieldTermStructureHandle(risk_free_rate),
-            volatility_handle
+            volatility
         )
         european_option.setPricingEngine(ql.AnalyticEuropeanEngine(bsm_process))
-        try:
-            implied_vol = european_option.impliedVolatility(C, bsm_process, tol, max_iterations)
-        except RuntimeError:
-            implied_vol = float('nan')
-        return implied_vol
+        return european_option, bsm_process
@@ -1,18 +1,19 @@
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QSlider, QWidget, QVBoxLayout,
                              QHBoxLayout, QLabel, QLineEdit, QComboBox, QPushButton,
                              QGridLayout, QFrame, QSizePolicy, QDateEdit)
-from PyQt5.QtCore import (Qt, QThread, pyqtSignal, QDate)
+from PyQt5.QtCore import (Qt, pyqtSignal, QDate)
+from realPrice.fetchPool import HIGH
+from tools.workerPool import PooledFetch
 from PyQt5.QtGui import QFont
-from datetime import date, datetime
-from scipy.stats import norm
-import numpy as np
+from datetime import datetime
 import pytz
-import holidays
 
 from realPrice.realStock import get_realtime_stock_price
 from realPrice.realOption import get_realtime_option_price, calls_or_puts
+from tools.tradingCalendar import trading_calendar
 
-class FetchStockThread(QThread):
+class FetchStockThread(PooledFetch):
+    priority = HIGH
     data_fetched = pyqtSignal(float, float, float)
 
     def __init__(self, stock_name):
@@ -23,8 +24,9 @@ class FetchStockThread(QThread):
         price, price_change, percentage_change = get_realtime_stock_price(self.stock_name)
         self.data_fetched.emit(round(price, 2), round(price_change, 2), round(percentage_change, 2))
 
-class FetchOptionThread(QThread):
+class FetchOptionThread(PooledFetch):
     data_fetched = pyqtSignal(list, list, list)
+    failed_payload = (['NA', 'NA'], ['NA', 'NA'], ['NA', 'NA'])
 
     def __init__(self, company, date, strike):
         super().__init__()
@@ -34,15 +36,7 @@ class FetchOptionThread(QThread):
     
     def market_open(self):
         eastern = pytz.timezone('US/Eastern')
-        now = datetime.now(eastern)
-        market_open = datetime.strptime("09:30", "%H:%M").time()
-        market_close = datetime.strptime("16:00", "%H:%M").time()
-        us_holidays = holidays.US()
-        if now.date() in us_holidays or now.weekday() >= 5:
-            return False
-        # if market_open <= now.time() <= market_close:
-        #     return True
-        return True
+        return trading_calendar().is_session(datetime.now(eastern).date())
 
     def run(self):
         prices, ask_prices, bid_prices = ['NA', 'NA'], ['NA', 'NA'], ['NA', 'NA']   
@@ -50,6 +44,7 @@ class FetchOptionThread(QThread):
         options = calls_or_puts(self.company, self.date, self.strike)
         if options and len(options) == 2:
             prices[0], ask_prices[0], bid_prices[0] = get_realtime_option_price(options[0])
+            self.token.raise_if_cancelled()
             prices[1], ask_prices[1], bid_prices[1] = get_realtime_option_price(options[1])
 
         self.data_fetched.emit(prices, ask_prices, bid_prices)
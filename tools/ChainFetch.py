@@ -0,0 +1,50 @@
+'''
+One-download premium fetch for the multi-strike profile windows.
+
+FetchStrikeQuotesThread reads every strike of a strategy from a single option
+chain snapshot (realOption.get_strike_quotes) and emits them together, so a
+condor refresh costs one chain download instead of one per strike.
+'''
+import math
+from PyQt5.QtCore import pyqtSignal
+from realPrice.fetchPool import Cancelled
+from tools.workerPool import PooledFetch
+from realPrice.realOption import get_strike_quotes
+
+QUOTE_KEYS = {'lastPrice': 'last', 'bid': 'bid', 'ask': 'ask', 'openInterest': 'open_interest', 'volume': 'volume'}
+COUNT_KEYS = ('open_interest', 'volume')
+
+
+def quote_text(value, count=False):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return 'NA'
+    return str(int(value)) if count else str(value)
+
+
+def empty_quotes(n):
+    return {side: {key: ['NA'] * n for key in QUOTE_KEYS.values()} for side in ('call', 'put')}
+
+
+class FetchStrikeQuotesThread(PooledFetch):
+    # {'call': {'last': [...], 'bid': [...], ...}, 'put': {...}}, one string per strike, 'NA' when missing
+    data_fetched = pyqtSignal(dict)
+
+    def __init__(self, company, date, strikes):
+        super().__init__()
+        self.company = company
+        self.date = date
+        self.strikes = list(strikes)
+
+    def run(self):
+        result = empty_quotes(len(self.strikes))
+        try:
+            quotes = get_strike_quotes(self.company, self.date, self.strikes)
+            if quotes is not None:
+                for side, frame in quotes.items():
+                    for column, key in QUOTE_KEYS.items():
+                        result[side][key] = [quote_text(v, key in COUNT_KEYS) for v in frame[column].tolist()]
+        except Cancelled:
+            return
+        except Exception as e:
+            print(f"Fetching {self.company} {self.date} quotes failed: {e}")
+        self.data_fetched.emit(result)
@@ -1,8 +1,12 @@
 from realPrice.realStock import get_realtime_stock_price
 from realPrice.realOption import main as get_realtime_option_price
-from PyQt5.QtCore import (Qt, QThread, pyqtSignal)
+from PyQt5.QtCore import (Qt, pyqtSignal)
+from realPrice.fetchPool import HIGH
+from tools.workerPool import PooledFetch
+from tools.ChainFetch import FetchStrikeQuotesThread
 
-class FetchStockThread(QThread):
+class FetchStockThread(PooledFetch):
+    priority = HIGH
     # Define a signal to send the fetched data back to the main thread
     data_fetched = pyqtSignal(str, str, str)
 
@@ -20,7 +24,7 @@ class FetchStockThread(QThread):
         except Exception as e:
             self.data_fetched.emit('NA', 'NA', 'NA')
 
-class FetchOptionThread(QThread):
+class FetchOptionThread(PooledFetch):
     data_fetched = pyqtSignal(list)
 
     def __init__(self, company, date, strike):
@@ -0,0 +1,165 @@
+'''
+Diagnostics dock for the timing spans of tools/tracing.py.
+
+install_diagnostics(window) gives a QMainWindow a Ctrl+Shift+D shortcut that
+shows or hides the dock (built on first use). The Actions tab lists the recent
+user actions newest first, each expandable into the spans it caused,
+including the ones that ran on fetch workers, with their notes. An action's
+time runs until its last span ended, so it covers the background fetches it
+started. The Totals tab aggregates every span name. Below the tabs are the
+option chain cache, in-flight dedup, fetch queue and recompute counters, and
+a button that saves everything as a Chrome trace.
+'''
+from PyQt5.QtWidgets import (QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QTabWidget, QTreeWidget, QTreeWidgetItem,
+                             QTableWidget, QTableWidgetItem, QLabel, QPushButton, QFileDialog, QShortcut)
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QKeySequence
+
+from tools import tracing
+from realPrice.chainCache import cache_info
+from realPrice.fetchPool import dedup_stats, pending
+
+MAX_ACTIONS = 50
+
+
+def ms(seconds):
+    return f"{seconds * 1000:.1f}"
+
+
+def details(args):
+    return ', '.join(f"{key}={value}" for key, value in args.items())
+
+
+class DiagnosticsDock(QDockWidget):
+    def __init__(self, parent=None):
+        super().__init__("Diagnostics", parent)
+        self.setObjectName("diagnostics")
+        self.seen = None
+
+        body = QWidget(self)
+        layout = QVBoxLayout(body)
+        tabs = QTabWidget(body)
+
+        self.actions_tree = QTreeWidget()
+        self.actions_tree.setHeaderLabels(["Span", "ms", "Thread", "Details"])
+        self.actions_tree.setColumnWidth(0, 260)
+        tabs.addTab(self.actions_tree, "Actions")
+
+        self.totals_table = QTableWidget(0, 5)
+        self.totals_table.setHorizontalHeaderLabels(["Span", "Calls", "Total ms", "Mean ms", "Max ms"])
+        self.totals_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        tabs.addTab(self.totals_table, "Totals")
+        layout.addWidget(tabs)
+
+        self.counters_label = QLabel()
+        self.counters_label.setWordWrap(True)
+        layout.addWidget(self.counters_label)
+
+        buttons = QHBoxLayout()
+        export_button = QPushButton("Export Chrome Trace")
+        export_button.clicked.connect(self.export_trace)
+        clear_button = QPushButton("Clear")
+        clear_button.clicked.connect(self.clear)
+        buttons.addWidget(export_button)
+        buttons.addWidget(clear_button)
+        buttons.addStretch()
+        layout.addLayout(buttons)
+        self.setWidget(body)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+        self.update_counters()
+        if tracing.generation() == self.seen:
+            return
+        self.seen = tracing.generation()
+        recorded = tracing.events()
+        self.update_actions(recorded)
+        self.update_totals(recorded)
+
+    def update_actions(self, recorded):
+        spans = [event for event in recorded if isinstance(event, tracing.Span)]
+        known = {event.id for event in spans}
+        children = {}
+        for event in recorded:
+            parent = event.parent.id if event.parent is not None and event.parent.id in known else None
+            children.setdefault(parent, []).append(event)
+
+        def last_end(event):
+            ends = [last_end(child) for child in children.get(event.id, ()) if isinstance(child, tracing.Span)]
+            return max(ends + [event.end])
+
+        def item(event):
+            if isinstance(event, tracing.Note):
+                node = QTreeWidgetItem([event.message, '', event.thread, details(event.args)])
+                node.setForeground(0, Qt.darkGray)
+                return node
+            node = QTreeWidgetItem([event.name, ms(last_end(event) - event.start), event.thread, details(event.args)])
+            for child in sorted(children.get(event.id, ()), key=lambda child: child.start):
+                node.addChild(item(child))
+            return node
+
+        roots = sorted(children.get(None, ()), key=lambda event: event.start, reverse=True)[:MAX_ACTIONS]
+        self.actions_tree.clear()
+        self.actions_tree.addTopLevelItems([item(event) for event in roots])
+
+    def update_totals(self, recorded):
+        totals = sorted(tracing.summary(recorded).items(), key=lambda entry: entry[1]['total'], reverse=True)
+        self.totals_table.setRowCount(len(totals))
+        for row, (name, entry) in enumerate(totals):
+            cells = [name, str(entry['count']), ms(entry['total']), ms(entry['mean']), ms(entry['max'])]
+            for column, text in enumerate(cells):
+                cell = QTableWidgetItem(text)
+                if column:
+                    cell.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.totals_table.setItem(row, column, cell)
+        self.totals_table.resizeColumnsToContents()
+
+    def update_counters(self):
+        cache = cache_info()
+        lines = [f"Chain cache: {cache['hits']} hits, {cache['misses']} misses, {cache['size']} held",
+                 f"Fetch queue: {pending()} waiting"]
+        shared = ', '.join(f"{name} {counts['calls']} calls / {counts['shared']} shared"
+                           for name, counts in sorted(dedup_stats().items()))
+        if shared:
+            lines.append(f"In-flight dedup: {shared}")
+        recompute = getattr(self.parent(), 'recompute', None)
+        if recompute is not None:
+            lines.append(f"Recompute: {recompute.summary()}")
+        self.counters_label.setText('\n'.join(lines))
+
+    def export_trace(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Chrome Trace", "trace.json", "Trace (*.json)")
+        if path:
+            tracing.export_chrome_trace(path)
+
+    def clear(self):
+        tracing.clear()
+        self.refresh()
+
+
+def toggle_diagnostics(window):
+    dock = getattr(window, 'diagnostics', None)
+    if dock is None:
+        dock = window.diagnostics = DiagnosticsDock(window)
+        window.addDockWidget(Qt.BottomDockWidgetArea, dock)
+        dock.show()
+    else:
+        dock.setVisible(not dock.isVisible())
+    return dock
+
+
+def install_diagnostics(window, shortcut='Ctrl+Shift+D'):
+    '''Binds `shortcut` on a QMainWindow to show/hide its diagnostics dock.'''
+    window.diagnostics = None
+    window.diagnostics_shortcut = QShortcut(QKeySequence(shortcut), window)
+    window.diagnostics_shortcut.activated.connect(lambda: toggle_diagnostics(window))
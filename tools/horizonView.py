@@ -0,0 +1,149 @@
+'''
+Pre-expiry views for the profile windows.
+
+HorizonControls is a small panel (r, σ, "T+n curves", "Heatmap") that a
+profile window adds under its inputs. From update_plot the window passes its
+leg matrix to evaluate(), which returns the today and T/2 mark-to-model curves
+to draw next to the expiry payoff and, while the heatmap window is open,
+re-renders the spot x days-to-expiry map. Both come from one broadcast
+Black-Scholes evaluation (tools.payoff.horizon_payoff).
+'''
+from datetime import datetime
+import numpy as np
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtWidgets import QWidget, QHBoxLayout, QCheckBox, QMainWindow
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+
+from tools.profile_creations import create_input_field
+from tools.payoff import horizon_payoff
+from tools.tradingCalendar import trading_calendar
+
+HEATMAP_ROWS = 60
+HEATMAP_COLUMNS = 240
+
+
+def days_to_expiry(maturity_date):
+    '''Calendar days left to a 'YYYY-MM-DD' maturity, as blackScholes.py counts them (TradingCalendar.days_to_expiry), or None.'''
+    try:
+        maturity = datetime.strptime(maturity_date.strip(), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+    return trading_calendar().days_to_expiry(maturity)
+
+
+class HeatmapWindow(QMainWindow):
+    closed = pyqtSignal()
+
+    def __init__(self, title, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f'{title} - PnL by spot and days to expiry')
+        self.figure = Figure()
+        self.canvas = FigureCanvas(self.figure)
+        self.setCentralWidget(self.canvas)
+        self.resize(900, 600)
+
+        # Same blitting scheme as PayoffPlot: only the image and title change between full draws
+        self.background = None
+        self.ax = self.figure.add_subplot(111)
+        self.image = self.ax.imshow(np.zeros((2, 2)), aspect='auto', origin='lower', cmap='RdYlGn',
+                                    interpolation='nearest', animated=True)
+        self.colorbar = self.figure.colorbar(self.image, ax=self.ax, label='PnL')
+        self.ax.set_xlabel('Stock Price', fontsize=14)
+        self.ax.set_ylabel('Days to Expiry', fontsize=14)
+        self.ax.set_title('', fontsize=14, fontweight='bold')
+        self.ax.title.set_animated(True)
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.figure.draw_artist(self.image)
+        self.figure.draw_artist(self.ax.title)
+
+    def update(self, S_grid, days, values, title):
+        self.image.set_data(values)
+        self.ax.title.set_text(title)
+        extent = [S_grid[0], S_grid[-1], days[0], days[-1]]
+        # Symmetric limits keep break-even at the middle colour. They only move when the
+        # PnL outgrows them or shrinks well inside, so dragging a slider mostly just blits.
+        limit = max(float(np.abs(values).max()), 1.0)
+        low, high = self.image.get_clim()
+        redraw = self.background is None or list(self.image.get_extent()) != extent
+        if limit > high or limit < high / 2:
+            self.image.set_clim(-1.25 * limit, 1.25 * limit)
+            redraw = True
+        if redraw:
+            self.image.set_extent(extent)
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self.figure.draw_artist(self.image)
+        self.figure.draw_artist(self.ax.title)
+        self.canvas.blit(self.figure.bbox)
+
+    def closeEvent(self, event):
+        self.closed.emit()
+        super().closeEvent(event)
+
+
+class HorizonControls(QWidget):
+    def __init__(self, title, parent=None):
+        super().__init__(parent)
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.interest_input = create_input_field('r', '0.05')
+        self.volatility_input = create_input_field('σ', '0.2')
+        self.curves_check = QCheckBox('T+n curves')
+        self.heatmap_check = QCheckBox('Heatmap')
+        layout.addWidget(self.interest_input)
+        layout.addWidget(self.volatility_input)
+        layout.addWidget(self.curves_check)
+        layout.addWidget(self.heatmap_check)
+
+        # The heatmap figure is only built the first time it is asked for
+        self.title = title
+        self.heatmap = None
+        self.heatmap_check.toggled.connect(self.show_heatmap)
+
+    def show_heatmap(self, checked):
+        if self.heatmap is None:
+            if not checked:
+                return
+            self.heatmap = HeatmapWindow(self.title, self)
+            self.heatmap.closed.connect(lambda: self.heatmap_check.setChecked(False))
+        self.heatmap.setVisible(checked)
+
+    def connect(self, slot):
+        '''Connects every control to the window's recompute slot.'''
+        self.interest_input.input_field.returnPressed.connect(slot)
+        self.volatility_input.input_field.returnPressed.connect(slot)
+        self.curves_check.toggled.connect(slot)
+        self.heatmap_check.toggled.connect(slot)
+
+    def evaluate(self, legs, S_grid, stock_price, maturity_date):
+        '''
+        [(label, curve), ...] for the today and T/2 horizons, empty when the curves
+        are off or the inputs are not usable. Refreshes the heatmap if it is open.
+        '''
+        wants_heatmap = self.heatmap is not None and self.heatmap.isVisible()
+        if not (self.curves_check.isChecked() or wants_heatmap):
+            return []
+        days_left = days_to_expiry(maturity_date)
+        try:
+            r = float(self.interest_input.input_field.text())
+            sigma = float(self.volatility_input.input_field.text())
+        except ValueError:
+            return []
+        if days_left is None or days_left <= 0 or sigma <= 0:
+            return []
+
+        if wants_heatmap:
+            spots = np.linspace(S_grid[0], S_grid[-1], HEATMAP_COLUMNS)
+            remaining = np.linspace(0, days_left, HEATMAP_ROWS)
+            values = horizon_payoff(legs, spots, stock_price, days_left, days_left - remaining, r, sigma)
+            self.heatmap.update(spots, remaining, values, f'r = {r}, σ = {sigma}, {days_left} days to expiry')
+
+        if not self.curves_check.isChecked():
+            return []
+        today, half = horizon_payoff(legs, S_grid, stock_price, days_left, [0, days_left / 2], r, sigma)
+        return [('Today', today), (f'T+{days_left / 2:g}d', half)]
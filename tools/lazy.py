@@ -0,0 +1,33 @@
+'''
+Deferred imports for heavy libraries.
+
+    yf = lazy_import('yfinance')
+
+binds a placeholder that imports the real module on its first attribute
+access (yf.Ticker(...)), so yfinance, pandas, QuantLib or mplcursors load
+when a fetch or calculation first needs them, usually on a fetch worker
+thread, instead of before the first window can be shown.
+'''
+import importlib
+
+
+class LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
@@ -0,0 +1,203 @@
+'''
+Vectorized payoff engine for the profile windows.
+
+A strategy is a leg matrix with one row per option leg and the columns
+(type, strike, quantity, sign, premium, delta): type is CALL or PUT, sign is +1
+for a bought leg and -1 for a sold one, and delta is the leg's signed delta.
+The windows let a put delta be typed either as -0.4 or as its magnitude 0.4,
+so leg_matrix stores every put delta as -abs(delta) and every builder below
+goes through it; callers never flip the sign themselves. Every leg is evaluated against the whole price grid in one
+broadcast, and the legs are summed with a single matrix product. A ratio
+spread or a 12-leg structure costs the same as a straddle.
+
+The hedge is the stock position that neutralises the legs' delta:
+effective_delta = -sum(sign * quantity * delta), held from the current price.
+'''
+from collections import namedtuple
+import numpy as np
+
+from tools.BsCal import bs_greeks
+
+CALL, PUT = 1.0, -1.0
+TYPE, STRIKE, QUANTITY, SIGN, PREMIUM, DELTA = range(6)
+
+
+def leg_matrix(rows):
+    '''Leg matrix from rows of (type, strike, quantity, sign, premium, delta); type may be 'call'/'put'.'''
+    legs = [[CALL, strike, quantity, sign, premium, delta] if kind in ('call', CALL)
+            else [PUT, strike, quantity, sign, premium, -abs(delta)]
+            for kind, strike, quantity, sign, premium, delta in rows]
+    return np.array(legs, dtype=float).reshape(-1, 6)
+
+
+def straddle_legs(trade_type, X, n_call, n_put, call_premium, put_premium, delta_call, delta_put):
+    '''appProfile-style trade types such as 'Buy Call-Sell Put' on a single strike.'''
+    call_side, put_side = trade_type.split('-')
+    return leg_matrix([
+        ('call', X, n_call, 1 if call_side.startswith('Buy') else -1, call_premium, delta_call),
+        ('put', X, n_put, 1 if put_side.startswith('Buy') else -1, put_premium, delta_put),
+    ])
+
+
+BUTTERFLY_LEGS = ((1, 1), (2, -1), (1, 1))  # (quantity, sign) at X1, X2, X3
+
+
+def butterfly_legs(butterfly_type, X, C, P, Delta):
+    kind, premiums = ('call', C) if butterfly_type == 'Call' else ('put', P)
+    return leg_matrix((kind, X[i], q, s, premiums[i], Delta[i]) for i, (q, s) in enumerate(BUTTERFLY_LEGS))
+
+
+CONDOR_SIGNS = {
+    'Long Call': ('call', (1, -1, -1, 1)),
+    'Short Call': ('call', (-1, 1, 1, -1)),
+    'Long Put': ('put', (1, -1, -1, 1)),
+    'Short Put': ('put', (-1, 1, 1, -1)),
+}
+
+
+def condor_legs(condor_type, X, C, P, Delta):
+    kind, signs = CONDOR_SIGNS[condor_type]
+    premiums = C if kind == 'call' else P
+    return leg_matrix((kind, X[i], 1, s, premiums[i], Delta[i]) for i, s in enumerate(signs))
+
+
+SPREAD_SIGNS = {
+    'Long Call Bull': ('call', (1, -1)),
+    'Long Call Bear': ('call', (-1, 1)),
+    'Long Put Bull': ('put', (1, -1)),
+    'Long Put Bear': ('put', (-1, 1)),
+}
+
+
+def spread_legs(spread_type, X, C, P, Num, Delta):
+    kind, signs = SPREAD_SIGNS[spread_type]
+    premiums = C if kind == 'call' else P
+    return leg_matrix((kind, X[i], Num[i], s, premiums[i], Delta[i]) for i, s in enumerate(signs))
+
+
+PayoffProfile = namedtuple('PayoffProfile', 'breakevens regions max_profit max_profit_at max_loss max_loss_at')
+
+
+def solve_payoff(legs, stock_price, scale=100):
+    '''
+    Exact shape of the hedged expiry payoff on S > 0. The payoff is linear
+    between strikes, so it is enough to know its value at 0, the slope on the
+    first segment and the slope change at each strike (the summed sign * quantity
+    of the legs struck there). Returns breakevens, the profit regions as
+    (low, high) pairs (high may be inf), and the max profit/loss with their
+    locations; an unbounded side is reported as +/-inf at S = inf.
+    '''
+    legs = np.asarray(legs, dtype=float).reshape(-1, 6)
+    weight = legs[:, SIGN] * legs[:, QUANTITY]
+    strike = legs[:, STRIKE]
+    puts = legs[:, TYPE] == PUT
+    effective_delta = -weight @ legs[:, DELTA]
+
+    knots, at_knot = np.unique(strike, return_inverse=True)
+    x = np.r_[0.0, knots]
+    # slopes[j] holds on [x[j], x[j+1]], the last one beyond the highest strike
+    slopes = scale * (effective_delta - weight[puts].sum() + np.r_[0.0, np.cumsum(np.bincount(at_knot, weights=weight))])
+    start = scale * (weight[puts] @ strike[puts] - weight @ legs[:, PREMIUM] - effective_delta * stock_price)
+    values = start + np.r_[0.0, np.cumsum(slopes[:-1] * np.diff(x))]
+
+    def payoff_at(s):
+        j = min(np.searchsorted(x, s, side='right') - 1, len(x) - 1)
+        return values[j] + slopes[j] * (s - x[j])
+
+    # Candidate region boundaries: the strikes and every sign change in between or beyond them
+    points = list(x)
+    for j in range(len(x)):
+        if slopes[j] != 0:
+            root = x[j] - values[j] / slopes[j]
+            end = x[j + 1] if j + 1 < len(x) else np.inf
+            if x[j] < root < end:
+                points.append(root)
+    points = sorted(set(points))
+
+    regions = []
+    for low, high in zip(points, points[1:] + [np.inf]):
+        middle = low + 1 if high == np.inf else (low + high) / 2
+        if payoff_at(middle) <= 0:
+            continue
+        if regions and regions[-1][1] == low:
+            regions[-1] = (regions[-1][0], high)
+        else:
+            regions.append((low, high))
+    breakevens = [bound for region in regions for bound in region if 0 < bound < np.inf]
+
+    best, worst = np.argmax(values), np.argmin(values)
+    max_profit, max_profit_at = values[best], x[best]
+    max_loss, max_loss_at = values[worst], x[worst]
+    if slopes[-1] > 0:
+        max_profit, max_profit_at = np.inf, np.inf
+    elif slopes[-1] < 0:
+        max_loss, max_loss_at = -np.inf, np.inf
+    return PayoffProfile(breakevens, regions, max_profit, max_profit_at, max_loss, max_loss_at)
+
+
+def region_text(regions, always='(0, ∞)'):
+    '''Profit regions in the title format of the profile windows.'''
+    if not regions:
+        return '∞'
+    if regions == [(0, np.inf)]:
+        return always
+
+    def bound(value):
+        if value == np.inf:
+            return '∞'
+        return '0' if value == 0 else f'{round(value, 2)}'
+    return ' and '.join(f'({bound(low)}, {bound(high)})' for low, high in regions)
+
+
+def evaluate_legs(legs, S_grid, stock_price, scale=100):
+    '''(payoff over S_grid, effective delta) of a leg matrix, in dollars per `scale` shares.'''
+    legs = np.asarray(legs, dtype=float).reshape(-1, 6)
+    weight = legs[:, SIGN] * legs[:, QUANTITY]
+    # (legs x grid) intrinsic values; calls and puts differ only by the sign of S - K
+    intrinsic = np.maximum(legs[:, TYPE, None] * (S_grid[None, :] - legs[:, STRIKE, None]), 0)
+    effective_delta = -weight @ legs[:, DELTA]
+    y = scale * (weight @ intrinsic - weight @ legs[:, PREMIUM] + effective_delta * (S_grid - stock_price))
+    return y, effective_delta
+
+
+def price_grid(S_min, S_max, kinks=(), pixels=800):
+    '''
+    Plot grid over [S_min, S_max] with about one point per horizontal pixel plus
+    the exact `kinks` (strikes, breakevens) inside the range, so its size does
+    not depend on the price level.
+    '''
+    grid = np.linspace(S_min, S_max, max(int(pixels), 2))
+    kinks = np.asarray(kinks, dtype=float)
+    return np.union1d(grid, kinks[(kinks > S_min) & (kinks < S_max)])
+
+
+def payoff_grid(legs, S_min, S_max, stock_price, pixels=800, scale=100):
+    '''(price grid through the strikes and breakevens, solve_payoff result) for a leg matrix.'''
+    legs = np.asarray(legs, dtype=float).reshape(-1, 6)
+    profile = solve_payoff(legs, stock_price, scale)
+    return price_grid(S_min, S_max, np.r_[legs[:, STRIKE], profile.breakevens], pixels), profile
+
+
+def evaluate_payoff(legs, S_min, S_max, stock_price, pixels=800, scale=100, always='(0, ∞)'):
+    '''(S_grid, payoff, effective delta, exact profit region text) of a leg matrix over [S_min, S_max].'''
+    S_grid, profile = payoff_grid(legs, S_min, S_max, stock_price, pixels, scale)
+    y, effective_delta = evaluate_legs(legs, S_grid, stock_price, scale)
+    return S_grid, y, effective_delta, region_text(profile.regions, always)
+
+
+def horizon_payoff(legs, S_grid, stock_price, days_left, elapsed, r, sigma, scale=100):
+    '''
+    Mark-to-model PnL of the hedged legs `elapsed` days from now (one row per
+    entry of `elapsed`, one column per price in S_grid). Every leg, horizon and
+    price is priced with Black-Scholes in a single broadcast over
+    legs x horizons x grid at flat r and sigma; horizons at or past expiry
+    come out at intrinsic value, i.e. the expiry payoff.
+    '''
+    legs = np.asarray(legs, dtype=float).reshape(-1, 6)
+    weight = legs[:, SIGN] * legs[:, QUANTITY]
+    T = np.maximum(days_left - np.atleast_1d(np.asarray(elapsed, dtype=float)), 0) / 365.0
+    prices = bs_greeks(legs[:, TYPE, None, None] == CALL, S_grid[None, None, :], legs[:, STRIKE, None, None],
+                       T[None, :, None], r, sigma)['price']
+    effective_delta = -weight @ legs[:, DELTA]
+    return scale * (np.tensordot(weight, prices, axes=1) - weight @ legs[:, PREMIUM]
+                    + effective_delta * (S_grid - stock_price))
@@ -0,0 +1,145 @@
+'''
+Persistent payoff chart for the profile windows.
+
+The axes, grid, zero line, labels and legend are built once. An update only
+moves the curves, the profit/loss fills and the title; those are animated
+artists blitted over a cached background of everything else, with the legend
+pasted back on top from its last full draw, so dragging a slider does not
+re-layout the figure. A full redraw happens only when the axis
+limits change, after an error message, or when the canvas itself redraws
+(resize, toolbar zoom), which also refreshes the cached background.
+'''
+from contextlib import nullcontext
+import numpy as np
+from matplotlib import style as mplstyle
+from matplotlib.collections import PolyCollection
+
+PAYOFF_LINE = (('blue', 1.5, 'Strategy Profit/Loss'),)
+HORIZON_STYLES = ('--', ':')
+
+
+def fill_verts(x, y, where):
+    '''The polygons fill_between(x, y, where=where) draws: one per contiguous run of `where`.'''
+    idx = np.flatnonzero(where)
+    if idx.size == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(idx) > 1)
+    starts = np.r_[idx[0], idx[breaks + 1]]
+    ends = np.r_[idx[breaks], idx[-1]] + 1
+    verts = []
+    for start, end in zip(starts, ends):
+        xs, ys = x[start:end], y[start:end]
+        verts.append(np.column_stack([np.r_[xs, xs[::-1]], np.r_[ys, np.zeros(len(xs))]]))
+    return verts
+
+
+class PayoffPlot:
+    def __init__(self, figure, canvas, lines=PAYOFF_LINE, fill=True,
+                 profit_color='#007560', loss_color='#bd1414', style='ggplot'):
+        self.figure = figure
+        self.canvas = canvas
+        self.background = None
+
+        figure.clear()
+        with mplstyle.context(style) if style else nullcontext():
+            self.ax = figure.add_subplot(111)
+            self.lines = [self.ax.plot([], [], fmt, linewidth=width, label=label, animated=True)[0]
+                          for fmt, width, label in lines]
+            # Pre-expiry (T+n) curves, shown only when update() is given some
+            self.horizons = [self.ax.plot([], [], dashes, color='dimgray', linewidth=1.5, animated=True, visible=False)[0]
+                             for dashes in HORIZON_STYLES]
+            self.fills = []
+            if fill:
+                for color, label in ((profit_color, 'Profit'), (loss_color, 'Loss')):
+                    collection = PolyCollection([], color=color, alpha=0.8, label=label, animated=True)
+                    self.ax.add_collection(collection, autolim=False)
+                    self.fills.append(collection)
+            self.ax.set_title('', fontsize=16, fontweight='bold')
+            self.ax.title.set_animated(True)
+            self.ax.set_xlabel('Stock Price', fontsize=14)
+            self.ax.set_ylabel('Pay-off at Maturity', fontsize=14)
+            self.ax.grid(True, which='major', linestyle='--', linewidth='0.5', color='black')
+            self.ax.axhline(0, color='k', linewidth=1.5)
+            self._legend()
+
+        # Error screens keep the plain look they always had
+        self.message_ax = figure.add_subplot(111)
+        self.message_text = self.message_ax.text(0.5, 0.5, '', fontsize=16, fontweight='bold', ha='center', va='center')
+        self.message_ax.set_visible(False)
+
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _legend(self):
+        # 'best' placement depends on the curves, so the legend is redrawn with them
+        handles = self.lines + [line for line in self.horizons if line.get_visible()] + self.fills
+        self.ax.legend(handles=handles).set_animated(True)
+        self.background = None
+
+    def _animated(self):
+        # Same stacking as a full draw: fills under the curves, title above
+        return self.fills + self.horizons + self.lines + [self.ax.title]
+
+    def _on_draw(self, event):
+        if not self.ax.get_visible():
+            self.background = None
+            return
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        for artist in self._animated():
+            self.figure.draw_artist(artist)
+        # The legend is laid out ('best' spot, text) only here; blits paste these pixels back on top
+        legend = self.ax.get_legend()
+        self.figure.draw_artist(legend)
+        self.legend_image = self.canvas.copy_from_bbox(legend.get_window_extent())
+
+    def pixel_width(self):
+        '''Width of the plot area in device pixels, the resolution price grids need.'''
+        return int(self.ax.bbox.width)
+
+    def update(self, x, curves, title, xlim, ylim, horizons=()):
+        '''
+        Shows `curves` (one array per line, or a single array) over x. The fills
+        follow the last curve, which is the combined payoff. `horizons` is a list
+        of (label, curve) pre-expiry curves drawn dashed alongside.
+        '''
+        if isinstance(curves, np.ndarray):
+            curves = [curves]
+        for line, y in zip(self.lines, curves):
+            line.set_data(x, y)
+        if self.fills:
+            y = np.asarray(curves[-1])
+            self.fills[0].set_verts(fill_verts(x, y, y > 0))
+            self.fills[1].set_verts(fill_verts(x, y, y <= 0))
+        self.ax.title.set_text(title)
+
+        labels = [line.get_label() if line.get_visible() else None for line in self.horizons]
+        for i, line in enumerate(self.horizons):
+            if i < len(horizons):
+                label, y = horizons[i]
+                line.set_data(x, y)
+                line.set_label(label)
+            line.set_visible(i < len(horizons))
+        if labels != [line.get_label() if line.get_visible() else None for line in self.horizons]:
+            self._legend()
+
+        redraw = self.background is None or not self.ax.get_visible()
+        if self.ax.get_xlim() != tuple(xlim) or self.ax.get_ylim() != tuple(ylim):
+            self.ax.set_xlim(xlim)
+            self.ax.set_ylim(ylim)
+            redraw = True
+        if redraw:
+            self.message_ax.set_visible(False)
+            self.ax.set_visible(True)
+            # _on_draw caches the new background and draws the animated artists on it
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        for artist in self._animated():
+            self.figure.draw_artist(artist)
+        self.canvas.restore_region(self.legend_image)
+        self.canvas.blit(self.figure.bbox)
+
+    def message(self, text):
+        self.ax.set_visible(False)
+        self.message_text.set_text(text)
+        self.message_ax.set_visible(True)
+        self.canvas.draw()
@@ -1,14 +1,14 @@
 from datetime import datetime
-import pytz
-import pandas as pd
-import yfinance as yf
-import holidays
-import pytz
-import requests
+import numpy as np
 
+from tools.polygonStore import get_daily_bars
+from realPrice.providers import get_provider
+from tools.tracing import note, traced
+from tools.tradingCalendar import trading_calendar
+from tools.lazy import lazy_import
+
+pd = lazy_import('pandas')
 
-api_key = 'C6ig1sXku2yKl_XEIvSvc_OWCwB8ILLn'
-base_url = 'https://api.polygon.io/v2/aggs/ticker/'
 def calculate_pnl(call_action, put_action, NC, C_0, C_t, NP, P_0, P_t, effectice_delta, trade_price, current_price):
         if call_action == "sell" and put_action == "sell":
             return (NC * (C_0 - C_t) + NP * (P_0 - P_t) + effectice_delta * (current_price - trade_price)) * 100
@@ -21,44 +21,132 @@ def calculate_pnl(call_action, put_action, NC, C_0, C_t, NP, P_0, P_t, effectice
         else:
             return 0  
 
+ACTION_SIGNS = {'buy': 1.0, 'sell': -1.0}
+
+
+def action_sign(action):
+    '''+1 for "buy", -1 for "sell" and 0 for anything else; scalars or arrays of actions.'''
+    if isinstance(action, str):
+        return ACTION_SIGNS.get(action, 0.0)
+    return pd.Series(np.asarray(action, dtype=object).ravel()).map(ACTION_SIGNS).fillna(0.0).to_numpy().reshape(np.shape(action))
+
+
+def index_delta_scale(call_action, put_action):
+    '''Hedge multiplier of an index straddle: the NDX/SPX trade scripts scale the hedge by 100 when both legs are sold.'''
+    return 100 if call_action == 'sell' and put_action == 'sell' else 1
+
+
+def position_pnl(signs, quantities, entry_prices, marks, effective_delta=0.0, trade_price=0.0, current_price=0.0, delta_scale=1.0):
+    '''
+    PnL of any number of option legs plus a stock hedge, in dollars (x100 multiplier).
+    signs, quantities and entry_prices have one entry per leg along the last axis and
+    marks is (..., legs), so a day, a whole history (days x legs) or a book of trades
+    (trades x days x legs) is one array expression. The hedge terms broadcast
+    against marks without the leg axis.
+    '''
+    marks = np.asarray(marks, dtype=float)
+    legs = np.sum(np.asarray(signs, dtype=float) * np.asarray(quantities, dtype=float)
+                  * (marks - np.asarray(entry_prices, dtype=float)), axis=-1)
+    hedge = np.asarray(delta_scale, dtype=float) * np.asarray(effective_delta, dtype=float) \
+        * (np.asarray(current_price, dtype=float) - np.asarray(trade_price, dtype=float))
+    return (legs + hedge) * 100
+
+
+def straddle_pnl(call_action, put_action, NC, C_0, C_t, NP, P_0, P_t, effective_delta, trade_price, current_price, delta_scale=1.0):
+    '''
+    Vectorized calculate_pnl: every argument broadcasts, so C_t/P_t/current_price can be
+    whole columns and the actions/quantities can be per-trade arrays. Rows with an
+    action other than buy/sell are 0, as in calculate_pnl.
+    '''
+    call_sign, put_sign = action_sign(call_action), action_sign(put_action)
+    C_t, P_t = np.asarray(C_t, dtype=float), np.asarray(P_t, dtype=float)
+    C_t, P_t = np.broadcast_arrays(C_t, P_t)
+    marks = np.stack([C_t, P_t], axis=-1)
+    signs = np.stack(np.broadcast_arrays(call_sign, put_sign), axis=-1)
+    quantities = np.stack(np.broadcast_arrays(np.asarray(NC, dtype=float), np.asarray(NP, dtype=float)), axis=-1)
+    entry_prices = np.stack(np.broadcast_arrays(np.asarray(C_0, dtype=float), np.asarray(P_0, dtype=float)), axis=-1)
+    pnl = position_pnl(signs, quantities, entry_prices, marks, effective_delta, trade_price, current_price, delta_scale)
+    return np.where((np.asarray(call_sign) != 0) & (np.asarray(put_sign) != 0), pnl, 0.0)
+
+
+def pnl_frame(option_data, call_action, put_action, NC, C_0, NP, P_0, effective_delta, trade_price,
+              stock_col='stock_close_price', delta_scale=1.0):
+    '''
+    Adds daily_pnl and change (% of the premium paid/received) to a copy of a
+    [call_close_price, put_close_price, <stock_col>] history in one pass.
+    '''
+    option_data = option_data.copy()
+    daily_pnl = straddle_pnl(call_action, put_action, NC, C_0, option_data['call_close_price'].to_numpy(dtype=float),
+                             NP, P_0, option_data['put_close_price'].to_numpy(dtype=float),
+                             effective_delta, trade_price, option_data[stock_col].to_numpy(dtype=float), delta_scale)
+    investment = ((NC * C_0) + (NP * P_0)) * 100
+    option_data['daily_pnl'] = np.round(daily_pnl, 2)
+    option_data['change'] = np.round(option_data['daily_pnl'].to_numpy() / investment * 100, 2)
+    return option_data
+
+def stored_history(book, key, trade_date):
+    '''
+    The closes already held in a TradeBook for position `key`, as a
+    [date, call_close_price, put_close_price, stock_close_price] frame, if they run
+    from trade_date to a row for today; None if a full fetch is needed.
+
+    The last row is a live mark (update_latest) that is written to the ledger
+    too, so a book whose last row is from an earlier day may hold a mark for a
+    session that has closed since. That needs the full fetch, which replaces it
+    with the settled close; only rows before today's mark are taken as closes.
+    '''
+    series = book.series(key, start_date=trade_date)
+    if series.empty:
+        return None
+    first_session = str(trading_calendar().roll_forward(trade_date))
+    today = datetime.now().date().isoformat()
+    if series['trade_date'].iloc[0] > first_session or series['trade_date'].iloc[-1] != today:
+        return None
+    return pd.DataFrame({
+        'date': pd.to_datetime(series['trade_date']).dt.date,
+        'call_close_price': series['call_close_price'],
+        'put_close_price': series['put_close_price'],
+        'stock_close_price': series['stock_close_price'],
+    })
+
+def update_latest(history, quote, call_action, put_action, live=False):
+    '''
+    Replaces (or appends) today's row of a history with a quote from
+    realOption.get_position_quote. While the market is live each leg is marked where
+    it would be closed (ask when short, bid when long), as add_trade does.
+    '''
+    def mark(leg, action):
+        last_price, ask_price, bid_price = leg
+        price = ask_price if action == "sell" else bid_price
+        return price if live and price and not pd.isna(price) else last_price
+
+    today = datetime.now().date()
+    history = history[history['date'] != today]
+    latest = pd.DataFrame([{
+        'date': today,
+        'call_close_price': mark(quote['call'], call_action),
+        'put_close_price': mark(quote['put'], put_action),
+        'stock_close_price': quote['stock'],
+    }])
+    return pd.concat([history, latest], ignore_index=True)
+
 def market_open():
-    today = datetime.now()  
-    eastern = pytz.timezone('US/Eastern')
-    current_time_et = datetime.now(eastern).time()
-    market_open = datetime.strptime("09:30", "%H:%M").time()
-    market_close = datetime.strptime("16:00", "%H:%M").time()
-    return market_open <= current_time_et <= market_close and today.weekday() < 5 and today not in holidays.US() 
+    return trading_calendar().is_open()
 
 def get_historical_data(ticker, start_date):
-    end_date = datetime.now()
-    ticker = f'O:{ticker}'
-    if isinstance(start_date, datetime):
-        start_date = start_date.strftime('%Y-%m-%d')
-
-    url = f"{base_url}{ticker}/range/1/day/{start_date}/{end_date.strftime('%Y-%m-%d')}?apiKey={api_key}"
-    response = requests.get(url)
-    
-    if response.status_code == 200:
-        data = response.json()
-        if 'results' in data:
-            df = pd.DataFrame(data['results'])
-            df['t'] = pd.to_datetime(df['t'], unit='ms')
-            df['date'] = df['t'].dt.date
-            print(f"Retrieved historical data for {ticker}: {df.head()}")
-            return df[['date', 'c']], None
-        else:
-            return pd.DataFrame(), "No results found in the data."
-    else:
-        return None, f"Failed to retrieve data: {response.status_code}"
+    df, error = get_daily_bars(ticker, start_date)
+    if error is None:
+        note(f"Retrieved historical data for O:{ticker}", ticker=ticker, rows=len(df))
+    return df, error
 
+@traced('network.history')
 def get_stock_price(symbol, start_date, end_date):
-    stock = yf.Ticker(symbol)
-    hist = stock.history(start=start_date, end=end_date)
+    hist = get_provider().history(symbol, start=start_date, end=end_date)
     hist.reset_index(inplace=True)
     hist['date'] = hist['Date'].dt.date
     hist.rename(columns={'Close': 'stock_close_price'}, inplace=True)
     hist['stock'] = hist['stock_close_price'].round(2)
-    print(f"Retrieved stock price data for {symbol}: {hist.head()}")
+    note(f"Retrieved stock price data for {symbol}", symbol=symbol, rows=len(hist))
     return hist[['date', 'stock']]
 
 
@@ -77,7 +165,7 @@ def get_pnl(call_ticker, put_ticker, trade_date, stock_trade_price, effective_de
         print("No data available for the given parameters.")
         return pd.DataFrame()
 
-    pnl_data['pnl'] = pnl_data.apply(lambda x: calculate_pnl(call_action, put_action, NC, C_0, x['call_close_price'], NP, P_0, x['put_close_price'], effective_delta, stock_trade_price, x['stock']), axis=1)
+    pnl_data['pnl'] = straddle_pnl(call_action, put_action, NC, C_0, pnl_data['call_close_price'], NP, P_0, pnl_data['put_close_price'], effective_delta, stock_trade_price, pnl_data['stock'])
     return pnl_data
 
 def data(call_ticker, put_ticker, trade_date):
@@ -95,8 +183,8 @@ def data(call_ticker, put_ticker, trade_date):
         print("Call or put data is empty")  # Debugging statement
         return pd.DataFrame()
     
-    call_data.rename(columns={'c': 'call_close_price'}, inplace=True)
-    put_data.rename(columns={'c': 'put_close_price'}, inplace=True)
+    call_data = call_data.rename(columns={'c': 'call_close_price'})
+    put_data = put_data.rename(columns={'c': 'put_close_price'})
     
     data = pd.merge(call_data, put_data, on='date', how='inner')
     
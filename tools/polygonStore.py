@@ -0,0 +1,130 @@
+'''
+On-disk cache of Polygon daily option aggregates.
+
+Daily bars for past sessions never change, so each contract's bars are kept in
+SQLite together with the date range already downloaded. A request only hits
+/range/1/day for the part of [start_date, today] that is not on disk yet
+(normally just the tail since the last stored session); today's bar is always
+re-fetched because it is still forming.
+'''
+import threading
+from datetime import datetime, date, timedelta
+
+from tools.storage import connect
+from tools.lazy import lazy_import
+from realPrice.fetchPool import Cancelled, polygon_limiter, single_flight
+from realPrice.providers import get_provider
+from tools.tracing import note, span, traced
+
+pd = lazy_import('pandas')
+
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+
+def _open():
+    conn = connect()
+    key = conn.execute('PRAGMA database_list').fetchone()[2]
+    with _schema_lock:
+        if key not in _schema_ready:
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS option_daily_bars (
+                    ticker TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    o REAL, h REAL, l REAL, c REAL, v REAL,
+                    PRIMARY KEY (ticker, date)
+                );
+                CREATE TABLE IF NOT EXISTS option_bar_coverage (
+                    ticker TEXT PRIMARY KEY,
+                    start_date TEXT NOT NULL,
+                    end_date TEXT NOT NULL
+                );
+            ''')
+            _schema_ready.add(key)
+    return conn
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _download(ticker, start, end):
+    with span('network.polygon.rate_limit', ticker=ticker):
+        polygon_limiter.acquire()
+    with span('network.polygon', ticker=ticker, start=start.isoformat(), end=end.isoformat()):
+        results, error = get_provider().option_aggregates(ticker, start, end)
+    if error:
+        return None, error
+    rows = []
+    for bar in results:
+        day = pd.to_datetime(bar['t'], unit='ms').date().isoformat()
+        rows.append((ticker, day, bar.get('o'), bar.get('h'), bar.get('l'), bar.get('c'), bar.get('v')))
+    return rows, None
+
+
+def missing_ranges(coverage, start, today):
+    '''Date ranges of [start, today] that still have to be downloaded.'''
+    if coverage is None:
+        return [(start, today)]
+    covered_start, covered_end = coverage
+    ranges = []
+    if start < covered_start:
+        ranges.append((start, covered_start - timedelta(days=1)))
+    # The tail always starts right after the stored range so coverage stays contiguous
+    ranges.append((covered_end + timedelta(days=1), today))
+    return [(lo, hi) for lo, hi in ranges if lo <= hi]
+
+
+@single_flight('polygon')
+@traced('cache.polygon_bars')
+def get_daily_bars(ticker, start_date, end_date=None):
+    '''
+    Returns (DataFrame[date, c], error) for option `ticker` (without the
+    'O:' prefix) from start_date onwards, downloading only what is missing.
+    A failed download skips its range; the stored bars are still returned.
+    '''
+    start = _as_date(start_date)
+    today = _as_date(end_date) if end_date is not None else datetime.now().date()
+
+    conn = _open()
+    try:
+        row = conn.execute('SELECT start_date, end_date FROM option_bar_coverage WHERE ticker = ?', (ticker,)).fetchone()
+        coverage = (_as_date(row[0]), _as_date(row[1])) if row else None
+
+        download_error = None
+        for lo, hi in missing_ranges(coverage, start, today):
+            try:
+                rows, error = _download(ticker, lo, hi)
+            except Cancelled:
+                raise
+            except Exception as e:
+                rows, error = None, str(e)
+            if error:
+                note(f"Polygon download of {ticker} {lo} to {hi} failed: {error}", ticker=ticker)
+                download_error = error
+                continue
+            with conn:
+                conn.executemany('INSERT OR REPLACE INTO option_daily_bars VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+                # Bars before today are final; today's stays uncovered so it is refreshed next time
+                settled_end = min(hi, datetime.now().date() - timedelta(days=1))
+                new_start = min(lo, coverage[0]) if coverage else lo
+                new_end = max(settled_end, coverage[1]) if coverage else settled_end
+                if new_end >= new_start:
+                    conn.execute('INSERT OR REPLACE INTO option_bar_coverage VALUES (?, ?, ?)',
+                                 (ticker, new_start.isoformat(), new_end.isoformat()))
+                    coverage = (new_start, new_end)
+
+        df = pd.read_sql_query(
+            'SELECT date, c FROM option_daily_bars WHERE ticker = ? AND date >= ? AND date <= ? ORDER BY date',
+            conn, params=(ticker, start.isoformat(), today.isoformat()))
+    finally:
+        conn.close()
+
+    if df.empty:
+        return pd.DataFrame(), download_error or "No results found in the data."
+    df['date'] = pd.to_datetime(df['date']).dt.date
+    return df, None
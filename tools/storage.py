@@ -0,0 +1,18 @@
+import os
+import sqlite3
+
+# Local SQLite database shared by the apps. The Docker instructions mount it
+# at /app/trades.db; set TRADES_DB to point elsewhere.
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'trades.db')
+
+
+def db_path():
+    return os.environ.get('TRADES_DB', DEFAULT_DB_PATH)
+
+
+def connect(path=None, check_same_thread=True):
+    conn = sqlite3.connect(path or db_path(), timeout=30, check_same_thread=check_same_thread)
+    # WAL lets one writer and any number of readers use the file at the same time
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
@@ -0,0 +1,240 @@
+'''
+Timing spans for the hot paths.
+
+    with span('network.chain', symbol=symbol, date=date):
+        ...
+
+    @traced('pnl.add_trade')
+    def add_trade(self): ...
+
+record how long a block took, on which thread, and inside which span it ran.
+A span opened while no other span is open starts a new *action* (Fetch Data,
+Add Trade, a refresh tick); the spans below it carry that action's id,
+including the ones run for it on the fetch pool, which re-attaches the span
+that was current when the job was submitted. So one action can be followed
+from the click through the workers to the redraw. note() records a point
+event (what used to be a print) under the current span.
+
+Finished spans are kept in a ring buffer of TRACE_BUFFER events (20000).
+tools/diagnostics.py shows them in a dock; export_chrome_trace(path) writes
+them as Chrome trace-event JSON for chrome://tracing or ui.perfetto.dev.
+
+    TRACE=0              record nothing
+    TRACE_FILE=<path>    write the Chrome trace when the process exits
+    TRACE_ECHO=1         also print every note() to stderr
+'''
+import atexit
+import contextlib
+import functools
+import inspect
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+_enabled = os.environ.get('TRACE', '1') != '0'
+_echo = bool(os.environ.get('TRACE_ECHO'))
+_events = deque(maxlen=int(os.environ.get('TRACE_BUFFER', 20000)))
+_ids = itertools.count(1)
+_local = threading.local()
+_origin = time.perf_counter()
+# Bumped on every recorded event so viewers can skip redraws when nothing happened
+_generation = [0]
+
+
+class Span:
+    __slots__ = ('id', 'name', 'cat', 'args', 'parent', 'action', 'thread', 'tid', 'start', 'end')
+
+    def __init__(self, name, cat, args, parent):
+        self.id = next(_ids)
+        self.name = name
+        self.cat = cat or name.split('.')[0]
+        self.args = args
+        self.parent = parent
+        self.action = parent.action if parent is not None else self.id
+        thread = threading.current_thread()
+        self.thread = thread.name
+        self.tid = thread.ident
+        self.start = time.perf_counter()
+        self.end = None
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+class Note:
+    __slots__ = ('message', 'args', 'parent', 'action', 'thread', 'tid', 'start')
+
+    def __init__(self, message, args, parent):
+        self.message = message
+        self.args = args
+        self.parent = parent
+        self.action = parent.action if parent is not None else None
+        thread = threading.current_thread()
+        self.thread = thread.name
+        self.tid = thread.ident
+        self.start = time.perf_counter()
+
+
+def _record(event):
+    _events.append(event)
+    _generation[0] += 1
+
+
+def enabled():
+    return _enabled
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = on
+
+
+def current_span():
+    return getattr(_local, 'span', None)
+
+
+class _Unrecorded:
+    '''Stands in for the Span while recording is off, so callers can still set args.'''
+    __slots__ = ('args',)
+
+    def __init__(self, args):
+        self.args = args
+
+
+@contextlib.contextmanager
+def span(name, cat=None, **args):
+    '''Times the block as a child of the current span; args show up in the dock and the trace.'''
+    if not _enabled:
+        yield _Unrecorded(args)
+        return
+    parent = current_span()
+    current = Span(name, cat, args, parent)
+    _local.span = current
+    try:
+        yield current
+    except BaseException as e:
+        current.args['error'] = type(e).__name__
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _local.span = parent
+        _record(current)
+
+
+@contextlib.contextmanager
+def attach(parent):
+    '''Makes `parent` (a span from another thread) the current span, so work done for it nests under it.'''
+    previous = current_span()
+    _local.span = parent
+    try:
+        yield
+    finally:
+        _local.span = previous
+
+
+def traced(name, cat=None):
+    '''
+    Decorator form of span(). Like a Qt slot, the wrapped function drops
+    surplus positional arguments, so a method connected to clicked(bool) or
+    valueChanged(int) keeps working.
+    '''
+    def wrap(fn):
+        parameters = inspect.signature(fn).parameters.values()
+        if any(p.kind == p.VAR_POSITIONAL for p in parameters):
+            limit = None
+        else:
+            limit = sum(p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD) for p in parameters)
+
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            with span(name, cat):
+                return fn(*args[:limit], **kwargs)
+        return call
+    return wrap
+
+
+def note(message, **args):
+    '''Point event under the current span, for messages that used to be printed.'''
+    if _echo:
+        print(message, file=sys.stderr)
+    if _enabled:
+        _record(Note(message, args, current_span()))
+
+
+def events():
+    return list(_events)
+
+
+def generation():
+    return _generation[0]
+
+
+def clear():
+    _events.clear()
+    _generation[0] += 1
+
+
+def summary(recorded=None):
+    '''{span name: {'count', 'total', 'mean', 'max'}} in seconds, over the recorded spans.'''
+    totals = {}
+    for event in events() if recorded is None else recorded:
+        if isinstance(event, Span):
+            entry = totals.setdefault(event.name, {'count': 0, 'total': 0.0, 'max': 0.0})
+            entry['count'] += 1
+            entry['total'] += event.duration
+            entry['max'] = max(entry['max'], event.duration)
+    for entry in totals.values():
+        entry['mean'] = entry['total'] / entry['count']
+    return totals
+
+
+def _us(seconds):
+    return round((seconds - _origin) * 1e6, 1)
+
+
+def _plain(args):
+    return {key: value if isinstance(value, (int, float, str, bool)) or value is None else str(value)
+            for key, value in args.items()}
+
+
+def chrome_trace(recorded=None):
+    '''The recorded events as a Chrome trace-event document (one track per thread).'''
+    pid = os.getpid()
+    trace = []
+    threads = {}
+    for event in events() if recorded is None else recorded:
+        threads[event.tid] = event.thread
+        if isinstance(event, Note):
+            trace.append({'name': event.message, 'ph': 'i', 's': 't', 'ts': _us(event.start),
+                          'pid': pid, 'tid': event.tid, 'args': _plain(event.args)})
+            continue
+        args = _plain(event.args)
+        args.update(span_id=event.id, action=event.action)
+        if event.parent is not None:
+            args['parent'] = event.parent.id
+        trace.append({'name': event.name, 'cat': event.cat, 'ph': 'X', 'ts': _us(event.start),
+                      'dur': round(event.duration * 1e6, 1), 'pid': pid, 'tid': event.tid, 'args': args})
+        if event.parent is not None and event.parent.tid != event.tid:
+            # Flow arrow from the submitting span to the work it started on a pool thread
+            trace.append({'name': 'submit', 'cat': 'flow', 'ph': 's', 'id': event.id, 'ts': _us(event.start),
+                          'pid': pid, 'tid': event.parent.tid})
+            trace.append({'name': 'submit', 'cat': 'flow', 'ph': 'f', 'bp': 'e', 'id': event.id,
+                          'ts': _us(event.start), 'pid': pid, 'tid': event.tid})
+    for tid, name in threads.items():
+        trace.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}})
+    return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+
+def export_chrome_trace(path):
+    with open(path, 'w') as f:
+        json.dump(chrome_trace(), f)
+    return path
+
+
+if os.environ.get('TRACE_FILE'):
+    atexit.register(export_chrome_trace, os.environ['TRACE_FILE'])
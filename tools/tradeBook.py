@@ -0,0 +1,116 @@
+'''
+In-memory trade book for the PnL apps.
+
+Rows are grouped by position (the fields update_plot filters on) and then by
+trade date, so adding a day is a dict upsert and a position's time series is a
+single lookup instead of a boolean mask over every stored row. With a ledger
+(tools/tradeLedger.py) the book starts from what is on disk and every batch of
+upserts is written through in one transaction.
+
+One book can be shared by several windows (tools/tradeLedger.shared_book) and
+read from fetch pool jobs, so every operation holds the book's lock.
+'''
+import threading
+
+from tools.lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+COLUMNS = [
+    'trade_date', 'symbol', 'strike', 'expiration', 'stock_trade_price', 'effective_delta',
+    'call_trade_price', 'call_action_type', 'num_call_contracts', 'put_trade_price',
+    'put_action_type', 'num_put_contracts', 'stock_close_price', 'call_close_price',
+    'put_close_price', 'daily_pnl', 'change'
+]
+
+POSITION_FIELDS = (
+    'symbol', 'strike', 'expiration', 'call_action_type', 'put_action_type',
+    'num_call_contracts', 'num_put_contracts', 'stock_trade_price', 'effective_delta'
+)
+
+
+def position_key(trade):
+    '''Hashable identity of a position, from a trade row or any mapping with POSITION_FIELDS.'''
+    return (
+        trade['symbol'], float(trade['strike']), trade['expiration'],
+        trade['call_action_type'], trade['put_action_type'],
+        int(trade['num_call_contracts']), int(trade['num_put_contracts']),
+        float(trade['stock_trade_price']), float(trade['effective_delta']),
+    )
+
+
+class TradeBook:
+    def __init__(self, trades=None, ledger=None):
+        # position key -> {'YYYY-MM-DD': row}
+        self._positions = {}
+        self._lock = threading.RLock()
+        self.ledger = ledger
+        if ledger is not None:
+            for trade in ledger.load():
+                self._put(trade)
+        if trades is not None:
+            self.extend(trades)
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(series) for series in self._positions.values())
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._positions
+
+    def positions(self):
+        with self._lock:
+            return list(self._positions)
+
+    def _put(self, trade):
+        series = self._positions.setdefault(position_key(trade), {})
+        replaced = trade['trade_date'] in series
+        series[trade['trade_date']] = dict(trade)
+        return replaced
+
+    def upsert(self, trade):
+        '''Stores one daily row, replacing any row for the same position and date. Returns True if it replaced one.'''
+        with self._lock:
+            replaced = self._put(trade)
+            if self.ledger is not None:
+                self.ledger.save([trade])
+        return replaced
+
+    def extend(self, trades):
+        '''Bulk upsert of an iterable of rows or a DataFrame. Returns the number of rows replaced.'''
+        if isinstance(trades, pd.DataFrame):
+            trades = trades.to_dict('records')
+        trades = list(trades)
+        with self._lock:
+            replaced = sum(self._put(trade) for trade in trades)
+            if self.ledger is not None:
+                self.ledger.save(trades)
+        return replaced
+
+    def get(self, key, trade_date):
+        with self._lock:
+            return self._positions.get(key, {}).get(trade_date)
+
+    def remove(self, key):
+        with self._lock:
+            if self.ledger is not None:
+                self.ledger.delete_position(key)
+            return self._positions.pop(key, None) is not None
+
+    def dates(self, key, start_date=None):
+        '''Sorted trade dates of one position (optionally from start_date on).'''
+        with self._lock:
+            return sorted(date for date in self._positions.get(key, {}) if start_date is None or date >= start_date)
+
+    def series(self, key, start_date=None):
+        '''Date-ordered rows of one position (optionally from start_date on) as a DataFrame.'''
+        with self._lock:
+            series = self._positions.get(key, {})
+            rows = [series[date] for date in self.dates(key, start_date)]
+        return pd.DataFrame(rows, columns=COLUMNS)
+
+    def to_frame(self):
+        with self._lock:
+            rows = [row for series in self._positions.values() for row in series.values()]
+        return pd.DataFrame(rows, columns=COLUMNS)
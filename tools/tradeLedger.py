@@ -0,0 +1,95 @@
+'''
+SQLite ledger behind the PnL apps' TradeBook.
+
+Every daily row the apps compute is written to the `trades` table of the shared
+trades.db (tools/storage.py), one transaction per batch, and loaded back on
+startup so history survives a restart without being fetched again.
+shared_book() hands every PnL window in a process the same book and ledger.
+'''
+import os
+import threading
+
+from tools.storage import connect, db_path
+from tools.tradeBook import COLUMNS, POSITION_FIELDS, TradeBook
+
+_schema_lock = threading.Lock()
+_schema_ready = set()
+_books_lock = threading.Lock()
+_books = {}
+
+_TYPES = {
+    'trade_date': 'TEXT NOT NULL', 'symbol': 'TEXT NOT NULL', 'strike': 'REAL NOT NULL',
+    'expiration': 'TEXT NOT NULL', 'call_action_type': 'TEXT NOT NULL', 'put_action_type': 'TEXT NOT NULL',
+    'num_call_contracts': 'INTEGER NOT NULL', 'num_put_contracts': 'INTEGER NOT NULL',
+    'stock_trade_price': 'REAL NOT NULL', 'effective_delta': 'REAL NOT NULL',
+}
+
+
+class TradeLedger:
+    def __init__(self, path=None):
+        self.path = path
+        # One connection shared by every window in the process; _lock serializes its use from any thread
+        self.conn = connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._create_schema()
+
+    def _create_schema(self):
+        key = self.conn.execute('PRAGMA database_list').fetchone()[2]
+        with _schema_lock:
+            if key in _schema_ready:
+                return
+            columns = ',\n'.join(f'{name} {_TYPES.get(name, "REAL")}' for name in COLUMNS)
+            primary_key = ', '.join(POSITION_FIELDS + ('trade_date',))
+            self.conn.executescript(f'''
+                CREATE TABLE IF NOT EXISTS trades (
+                    {columns},
+                    PRIMARY KEY ({primary_key})
+                );
+                CREATE INDEX IF NOT EXISTS idx_trades_contract ON trades (symbol, expiration, strike, trade_date);
+            ''')
+            _schema_ready.add(key)
+
+    def save(self, trades):
+        '''Upserts an iterable of trade rows in a single transaction.'''
+        rows = [tuple(trade[name] for name in COLUMNS) for trade in trades]
+        if not rows:
+            return 0
+        placeholders = ', '.join('?' for _ in COLUMNS)
+        with self._lock, self.conn:
+            self.conn.executemany(f'INSERT OR REPLACE INTO trades ({", ".join(COLUMNS)}) VALUES ({placeholders})', rows)
+        return len(rows)
+
+    def load(self, symbol=None):
+        '''All stored rows (or one symbol's) as dicts, ordered by contract and date.'''
+        query = f'SELECT {", ".join(COLUMNS)} FROM trades'
+        params = ()
+        if symbol is not None:
+            query += ' WHERE symbol = ?'
+            params = (symbol,)
+        query += ' ORDER BY symbol, expiration, strike, trade_date'
+        with self._lock:
+            cursor = self.conn.execute(query, params)
+            return [dict(zip(COLUMNS, row)) for row in cursor.fetchall()]
+
+    def delete_position(self, key):
+        where = ' AND '.join(f'{name} = ?' for name in POSITION_FIELDS)
+        with self._lock, self.conn:
+            return self.conn.execute(f'DELETE FROM trades WHERE {where}', key).rowcount
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def shared_book(path=None):
+    '''
+    The process-wide TradeBook over the ledger at `path`, loaded on first use.
+    Windows opened side by side (launcher.py) read and extend the same rows
+    instead of each holding its own copy of trades.db.
+    '''
+    # None, $TRADES_DB and a relative or absolute spelling of one file all share a book
+    path = os.path.abspath(path or db_path())
+    with _books_lock:
+        if path not in _books:
+            _books[path] = TradeBook(ledger=TradeLedger(path))
+        return _books[path]
@@ -0,0 +1,163 @@
+'''
+NYSE trading calendar shared by the PnL date alignment, the market-hours checks
+and time to expiry.
+
+Sessions are the weekdays that are not NYSE holidays. The holidays come from
+holidays.NYSE, the exchange's own schedule: Good Friday is closed, Columbus and
+Veterans Day are not, unlike holidays.US. Sessions close at 16:00 ET, or at
+13:00 ET on the early-close days: July 3 when Independence Day falls on
+Tuesday to Friday, the day after Thanksgiving, and Christmas Eve on Monday to
+Thursday.
+
+The holiday table is built once, for a window of years around today, and is
+only rebuilt when a date outside it is asked for. A trade that spans a year
+boundary is therefore covered without rebuilding per call. Ranges, counts and
+open/closed checks are single numpy busday calls, and accept arrays of dates.
+
+    cal = trading_calendar()
+    cal.sessions('2024-06-12', '2024-08-16')     # datetime64[D] array of session dates
+    cal.session_count('2024-06-12', '2024-08-16')
+    cal.is_session(dates), cal.is_open(), cal.days_to_expiry('2024-08-16')
+'''
+import threading
+from datetime import date, datetime, time, timedelta
+import numpy as np
+import holidays
+import pytz
+
+EASTERN = pytz.timezone('US/Eastern')
+OPEN = time(9, 30)
+CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+
+# Years on each side of the current one covered up front
+YEARS_BACK = 10
+YEARS_AHEAD = 5
+
+
+def _day(value):
+    '''A date, datetime, 'YYYY-MM-DD' string or datetime64 as numpy datetime64[D].'''
+    if isinstance(value, datetime):
+        value = value.date()
+    return np.datetime64(value, 'D') if not isinstance(value, str) else np.datetime64(value[:10], 'D')
+
+
+def _days(values):
+    if np.ndim(values) == 0:
+        return _day(values)
+    return np.asarray(values, dtype='datetime64[D]')
+
+
+def early_closes(year, closed):
+    '''13:00 ET closes of `year` that are not full holidays (`closed`).'''
+    days = []
+    july_3 = date(year, 7, 3)
+    if july_3.weekday() <= 3:
+        days.append(july_3)
+    thanksgiving = next(day for day in (date(year, 11, 22) + timedelta(days=i) for i in range(7)) if day.weekday() == 3)
+    days.append(thanksgiving + timedelta(days=1))
+    christmas_eve = date(year, 12, 24)
+    if christmas_eve.weekday() <= 3:
+        days.append(christmas_eve)
+    return [day for day in days if day not in closed]
+
+
+class TradingCalendar:
+    def __init__(self, first_year=None, last_year=None):
+        this_year = datetime.now(EASTERN).year
+        self._lock = threading.Lock()
+        self.first_year = None
+        self.last_year = None
+        self._build(first_year or this_year - YEARS_BACK, last_year or this_year + YEARS_AHEAD)
+
+    def _build(self, first_year, last_year):
+        years = range(first_year, last_year + 1)
+        closed = holidays.NYSE(years=years)
+        self.holidays = np.array(sorted(closed), dtype='datetime64[D]')
+        self.early_closes = np.array(sorted(day for year in years for day in early_closes(year, closed)),
+                                     dtype='datetime64[D]')
+        self.busdays = np.busdaycalendar(weekmask='1111100', holidays=self.holidays)
+        self.first_year, self.last_year = first_year, last_year
+
+    def _cover(self, *days):
+        '''Extends the holiday table so that every date in `days` falls inside it.'''
+        days = [day for day in days if np.size(day)]
+        if not days:
+            return
+        years = [int(str(np.min(day))[:4]) for day in days] + [int(str(np.max(day))[:4]) for day in days]
+        first, last = min(years), max(years)
+        if first < self.first_year or last > self.last_year:
+            with self._lock:
+                if first < self.first_year or last > self.last_year:
+                    self._build(min(first, self.first_year), max(last, self.last_year))
+
+    def is_session(self, days):
+        '''True where a date is a trading day; scalar in, bool out, array in, array out.'''
+        days = _days(days)
+        self._cover(days)
+        return np.is_busday(days, busdaycal=self.busdays)
+
+    def sessions(self, start, end):
+        '''Every session date in [start, end], as datetime64[D].'''
+        start, end = _day(start), _day(end)
+        if end < start:
+            return np.array([], dtype='datetime64[D]')
+        self._cover(start, end)
+        days = np.arange(start, end + 1, dtype='datetime64[D]')
+        return days[np.is_busday(days, busdaycal=self.busdays)]
+
+    def session_count(self, start, end):
+        '''Number of sessions in [start, end] (0 if end < start); broadcasts over arrays of dates.'''
+        start, end = _days(start), _days(end)
+        self._cover(start, end)
+        return np.maximum(np.busday_count(start, end + 1, busdaycal=self.busdays), 0)
+
+    def roll_forward(self, day):
+        '''The session on or after `day`.'''
+        day = _day(day)
+        self._cover(day, day + 14)
+        return np.busday_offset(day, 0, roll='forward', busdaycal=self.busdays)
+
+    def previous_session(self, day):
+        '''The last session strictly before `day`.'''
+        day = _day(day)
+        self._cover(day - 14, day)
+        return np.busday_offset(day, -1, roll='forward', busdaycal=self.busdays)
+
+    def close_time(self, day):
+        '''16:00 or 13:00 ET on a session, None when the market does not open that day.'''
+        day = _day(day)
+        if not self.is_session(day):
+            return None
+        return EARLY_CLOSE if day in self.early_closes else CLOSE
+
+    def is_open(self, now=None):
+        '''Whether the regular session is running at `now` (default: the current time, taken in ET).'''
+        now = now.astimezone(EASTERN) if now is not None else datetime.now(EASTERN)
+        close = self.close_time(now.date())
+        return close is not None and OPEN <= now.time() <= close
+
+    def days_to_expiry(self, maturity, now=None):
+        '''
+        Calendar days from today (ET) to `maturity`, less one once today's
+        session has closed, since its remaining hours no longer carry time value.
+        '''
+        now = now.astimezone(EASTERN) if now is not None else datetime.now(EASTERN)
+        days = int((_day(maturity) - _day(now.date())).astype(int))
+        close = self.close_time(now.date())
+        if close is not None and now.time() >= close:
+            days -= 1
+        return days
+
+
+_calendar = None
+_calendar_lock = threading.Lock()
+
+
+def trading_calendar():
+    '''The process-wide NYSE calendar.'''
+    global _calendar
+    with _calendar_lock:
+        if _calendar is None:
+            _calendar = TradingCalendar()
+        return _calendar
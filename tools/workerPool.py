@@ -0,0 +1,107 @@
+'''
+GUI side of the shared fetch pool.
+
+PooledFetch is a drop-in base for the Fetch*Thread classes: it keeps the QThread
+calls the windows already make (start, isRunning, quit, wait, terminate, the
+`finished` signal) and the subclass still just implements run() and emits its
+data_fetched signal, but start() queues run() on realPrice.fetchPool's bounded
+worker pool instead of creating a thread. Signals emitted from the worker reach
+slots in the GUI thread through Qt's queued connections.
+
+Cancelling (quit, terminate or cancel) is cooperative: a job still in the queue
+is dropped, a running one stops at its next raise_if_cancelled() checkpoint,
+and either way its signals are blocked so a superseded result never reaches
+the window. Only `finished` is still emitted, so callers can drop the object.
+
+An exception escaping run() is noted on the fetch span with its traceback
+(TRACE_ECHO=1 prints it), and if the subclass sets `failed_payload` that tuple is emitted on
+data_fetched, so the window shows 'NA' instead of keeping stale inputs.
+'''
+import traceback
+from concurrent import futures
+from PyQt5.QtCore import QObject, pyqtSignal
+from realPrice.fetchPool import NORMAL, CancelToken, Cancelled, submit
+from tools.tracing import attach, note, span
+
+# Jobs between start() and finished; the pool thread may outlive the window's reference
+_active = set()
+
+
+class PooledFetch(QObject):
+    finished = pyqtSignal()
+    priority = NORMAL
+    # data_fetched arguments to emit when run() raises; None emits nothing
+    failed_payload = None
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.token = CancelToken()
+        self.future = None
+        self.span = None
+
+    def run(self):
+        raise NotImplementedError
+
+    def start(self, priority=None):
+        _active.add(self)
+        self.future = submit(self._execute, priority=self.priority if priority is None else priority, token=self.token)
+        self.future.add_done_callback(self._done)
+
+    def _execute(self):
+        try:
+            with span(f'fetch.{type(self).__name__}') as current:
+                self.span = current
+                self.run()
+        except Cancelled:
+            pass
+
+    def _done(self, future):
+        error = None if future.cancelled() else future.exception()
+        if error is not None:
+            self.report(error)
+        self.blockSignals(False)
+        self.finished.emit()
+        _active.discard(self)
+
+    def report(self, error):
+        '''Logs an exception from run() and emits `failed_payload`, unless the job was cancelled meanwhile.'''
+        with attach(self.span):
+            note(f"{type(self).__name__} failed: {error!r}", error=type(error).__name__,
+                 traceback=''.join(traceback.format_exception(type(error), error, error.__traceback__)))
+        if self.failed_payload is not None and not self.token.cancelled:
+            self.data_fetched.emit(*self.failed_payload)
+
+    def cancel(self):
+        self.blockSignals(True)
+        # The worker drops the job when it reaches it, so `finished` always comes from the pool
+        self.token.cancel()
+
+    quit = terminate = cancel
+
+    def isRunning(self):
+        return self.future is not None and not self.future.done()
+
+    def isFinished(self):
+        return self.future is not None and self.future.done()
+
+    def wait(self, msecs=None):
+        '''Blocks until run() returns; a cancelled job is abandoned, so this returns at once.'''
+        if self.future is None or self.token.cancelled:
+            return True
+        try:
+            self.future.exception(None if msecs is None else msecs / 1000)
+        except futures.TimeoutError:
+            return False
+        return True
+
+
+class PooledCall(PooledFetch):
+    '''Runs `fn()` on the pool and emits its result, for one-off jobs that need no Fetch class of their own.'''
+    data_fetched = pyqtSignal(object)
+
+    def __init__(self, fn, parent=None):
+        super().__init__(parent)
+        self.fn = fn
+
+    def run(self):
+        self.data_fetched.emit(self.fn())